@@ -1,236 +1,324 @@
-import matplotlib.pyplot as plt
+"""
+Requests 提交记录分析：读取 → 统计 → 渲染
+
+既可直接运行（python analyze_commits.py），也可作为库导入，导入本身不读文件、不建目录、不导入 matplotlib：
+    from analyze_commits import aggregate, build_specs, render
+    window_counters, latest_year, changed = aggregate("requests_commits.csv")   # 只用标准库
+    render(build_specs(window_counters, latest_year, changed))                # 此时才导入 matplotlib
+只需要统计数字的调用方（定时任务、健康检查）调用 aggregate() 即可。
+"""
+
 from collections import Counter
 from pathlib import Path
-from datetime import datetime
+from author_identity import identity_map, merge_author_counter
+from commit_stream import aggregate_file, aggregate_incremental, aggregate_windows, window_years
+from figure_render import bar_spec, line_spec, render_all
 
-# 配置文件路径和输出目录
+# 配置文件路径和输出目录（输出目录在渲染时才创建）
 file_path = "requests_commits.csv"
 output_dir = Path("analyze_commits_figures")
-output_dir.mkdir(exist_ok=True)
-
-# 读取提交数据
-commits = []
-with open(file_path, "r", encoding="utf-8") as f:
-    header = f.readline() 
-    for line in f:
-        line = line.strip()
-        if not line:
-            continue
-        parts = line.split(",", 3)
-        if len(parts) < 4:
-            continue
-        commits.append({
-            "author": parts[1].strip(),
-            "time": parts[2].strip(),
-            "message": parts[3].strip()
-        })
+
+# 直接读取本地 git 仓库（如 "../requests"）：设置后不再读取 file_path，也不需要先导出 CSV
+GIT_REPO = None
+
+# 时间窗口配置：(名称, 范围)，名称同时用作图片文件名后缀
+# 范围为 None 表示全时段，整数 n 表示最近 n 年，也可写固定区间如 ("2015_2019", (2015, 2019))
+WINDOWS = [("all", None), ("5years", 5), ("2years", 2)]
+
+# 是否使用 .commit_cache/ 磁盘缓存（CSV 未变时跳过解析和分类）
+USE_CACHE = True
+
+# 增量模式：按 commit_id 只折叠新增提交，并且只重画数字有变化的窗口图表
+INCREMENTAL = False
+
+# 合并同一作者的不同写法（"☿ Kenneth Reitz" -> "Kenneth Reitz"），规则见 author_identity.py
+MERGE_AUTHOR_ALIASES = True
+# git 格式的 mailmap 路径；None 表示使用数据源旁边的 .mailmap（不存在则只按名字规则合并）
+MAILMAP = None
+
+# 存储后端："memory" 流式统计（默认）；"sqlite" 导入 .commit_cache/ 中的 SQLite 库，统计用带索引的 GROUP BY 完成
+# （数据比内存大时使用；CSV 未变时再次运行不读 CSV，见 commit_store.py）
+STORAGE = "memory"
+
+# 渲染进程数：None 表示使用全部 CPU 核心，1 表示串行渲染
+RENDER_WORKERS = None
 
 # -------------------------- 封装可复用函数 --------------------------
-def plot_top_contributors(commits_data, title, save_name):
+def needs_render(window_name, changed_windows, *save_names, out_dir=output_dir):
+    """
+    判断某个窗口的图表是否需要重画
+
+    参数:
+        window_name (str): 窗口名称
+        changed_windows (set): 数字有变化的窗口名称
+        save_names (str): 该窗口对应的图片文件名
+        out_dir (Path): 图片目录
+
+    返回:
+        bool: 窗口数字有变化，或图片文件缺失时为 True
     """
-    绘制Top10贡献者柱状图
-    
+    if window_name in changed_windows:
+        return True
+    return not all((Path(out_dir)/name).exists() for name in save_names)
+
+def top_contributors_spec(author_counter, title, save_name, out_dir=output_dir):
+    """
+    生成Top10贡献者柱状图的描述
+
     参数:
-        commits_data (list): 提交数据列表，每个元素是包含author、time、message的字典
+        author_counter (Counter): 作者 -> 提交次数 的计数器
         title (str): 图表标题
         save_name (str): 保存的文件名
-    
-    功能:
-        统计提交次数最多的10位作者，生成柱状图并保存到文件
+        out_dir (Path): 图片目录
+
+    返回:
+        FigureSpec | None: 图表描述，无数据时返回 None
     """
-    author_counter = Counter(c["author"] for c in commits_data)
     top_authors = author_counter.most_common(10)
     if not top_authors:  # 处理空数据
         print(f"警告：{title} 无数据可展示")
-        return
-    
+        return None
+
     authors = [a for a, _ in top_authors]
     author_counts = [c for _, c in top_authors]
+    return bar_spec(authors, author_counts, title, Path(out_dir)/save_name,
+                    xlabel="Author", ylabel="Number of Commits", rotation=45)
+
+def analyze_commit_types(counters):
+    """
+    返回提交类型列表和对应数量
 
-    plt.figure()
-    bars = plt.bar(authors, author_counts)
-    plt.xticks(rotation=45, ha="right")
-    plt.xlabel("Author")
-    plt.ylabel("Number of Commits")
-    plt.title(title)
-    for bar, count in zip(bars, author_counts):
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2, height + 0.5,
-                 str(count), ha='center', va='bottom', fontsize=10)
-    plt.tight_layout()
-    plt.savefig(output_dir/save_name, dpi=300)
-    plt.close()
-
-def analyze_commit_types(commits_data):
-    """
-    分析提交类型并返回类型列表和对应数量
-    
     参数:
-        commits_data (list): 提交数据列表
-    
+        counters (CommitCounters): 单遍统计得到的计数结果
+
     返回:
         tuple: (类型列表, 类型数量列表)
-    
+
     功能:
-        根据提交信息的关键词对提交进行自动分类，统计各类别的数量
-    """
-    merge = dependency = bugfix = feature = 0
-    refactor = docs = test = release = maintenance = other = 0
-
-    for c in commits_data:
-        msg = c["message"].lower()
-        if msg.startswith("merge pull request"):
-            merge += 1
-        elif "bump" in msg or "dependabot" in msg:
-            dependency += 1
-        elif "release" in msg or msg.startswith("v"):
-            release += 1
-        elif "fix" in msg or "bug" in msg or "error" in msg:
-            bugfix += 1
-        elif "add" in msg or "feature" in msg or "support" in msg or "implement" in msg:
-            feature += 1
-        elif "refactor" in msg or "cleanup" in msg or "restructure" in msg:
-            refactor += 1
-        elif "doc" in msg or "docs" in msg or "readme" in msg:
-            docs += 1
-        elif "test" in msg or "ci" in msg or "workflow" in msg:
-            test += 1
-        elif any(k in msg for k in [
-            "update", "improve", "change", "adjust", "remove",
-            "minor", "tweak", "simplify", "optimize", "handle", "use"
-        ]):
-            maintenance += 1
-        else:
-            other += 1
-
-    types = [
-        "Merge PR", "Dependency", "Release", "Bug Fix", "Feature",
-        "Refactor", "Docs", "Test", "Maintenance", "Other"
-    ]
-    type_counts = [merge, dependency, release, bugfix, feature,
-                   refactor, docs, test, maintenance, other]
-    return types, type_counts
-
-def plot_commit_types(commits_data, title, save_name):
-    """
-    绘制提交类型分布柱状图
-    
+        分类在读取时已由 commit_classifier 完成，这里只按固定顺序取出数量
+    """
+    return counters.type_counts()
+
+def commit_types_spec(counters, title, save_name, out_dir=output_dir):
+    """
+    生成提交类型分布柱状图的描述
+
     参数:
-        commits_data (list): 提交数据列表
+        counters (CommitCounters): 单遍统计得到的计数结果
         title (str): 图表标题
         save_name (str): 保存的文件名
-    
-    功能:
-        可视化不同提交类型的分布情况，生成柱状图并保存
+        out_dir (Path): 图片目录
+
+    返回:
+        FigureSpec | None: 图表描述，无数据时返回 None
     """
-    types, type_counts = analyze_commit_types(commits_data)
+    types, type_counts = analyze_commit_types(counters)
     if sum(type_counts) == 0:  # 处理空数据
         print(f"警告：{title} 无数据可展示")
-        return
-    
-    plt.figure()
-    bars = plt.bar(types, type_counts)
-    plt.xlabel("Commit Type")
-    plt.ylabel("Number of Commits")
-    plt.title(title)
-    plt.xticks(rotation=30, ha="right")
-    for bar, count in zip(bars, type_counts):
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2, height + 0.5,
-                 str(count), ha='center', va='bottom', fontsize=10)
-    plt.tight_layout()
-    plt.savefig(output_dir/save_name, dpi=300)
-    plt.close()
-
-# -------------------------- 原有功能 --------------------------
-# 1. 全部数据 - Top10贡献者
-plot_top_contributors(
-    commits,
-    title="Top 10 Contributors by Commit Count (All Time)",
-    save_name="top_10_contributors.png"
-)
-
-# 2. 全部数据 - 提交类型分布
-plot_commit_types(
-    commits,
-    title="Fine-grained Commit Type Distribution (All Time)",
-    save_name="commit_type.png"
-)
-
-# 3. 年度提交统计
-yearly_counter = Counter()
-for c in commits:
-    year = c["time"][:4]
-    yearly_counter[year] += 1
-
-years = sorted(yearly_counter.keys())
-year_counts = [yearly_counter[y] for y in years]
-
-plt.figure()
-plt.plot(years, year_counts, marker="o")
-plt.xticks(rotation=45, ha="right")
-plt.xlabel("Year")
-plt.ylabel("Number of Commits")
-plt.title("Yearly Commit Activity (All Time)")
-for i, (x, y) in enumerate(zip(years, year_counts)):
-    plt.text(x, y + 10.5, str(y), ha='center', va='bottom', fontsize=9)
-plt.tight_layout()
-plt.savefig(output_dir/"yearly_commit.png", dpi=300)
-plt.close()
-
-# -------------------------- 新增：近五年/近两年数据分析 --------------------------
-# 提取所有提交的年份
-for c in commits:
-    # 确保时间格式有效（兼容常见的YYYY-MM-DD等格式）
-    try:
-        c["year_int"] = int(c["time"][:4])
-    except (ValueError, IndexError):
-        c["year_int"] = None
-
-# 过滤掉无效年份的数据
-valid_commits = [c for c in commits if c["year_int"] is not None]
-if not valid_commits:
-    print("错误：无有效时间的提交数据，无法分析近五年/近两年数据")
-else:
-    # 获取最新年份
-    latest_year = max(c["year_int"] for c in valid_commits)
-    
-    # 1. 近五年数据筛选（latest_year-4 ~ latest_year）
-    five_years_range = range(latest_year - 4, latest_year + 1)
-    five_years_commits = [c for c in valid_commits if c["year_int"] in five_years_range]
-    
-    # 2. 近两年数据筛选（latest_year-1 ~ latest_year）
-    two_years_range = range(latest_year - 1, latest_year + 1)
-    two_years_commits = [c for c in valid_commits if c["year_int"] in two_years_range]
-
-    # -------------------------- 近五年分析 --------------------------
-    # 近五年 - Top10贡献者
-    plot_top_contributors(
-        five_years_commits,
-        title=f"Top 10 Contributors ({latest_year-4} - {latest_year})",
-        save_name=f"top_10_contributors_5years.png"
-    )
-    
-    # 近五年 - 提交类型分布
-    plot_commit_types(
-        five_years_commits,
-        title=f"Commit Type Distribution ({latest_year-4} - {latest_year})",
-        save_name=f"commit_type_5years.png"
-    )
-
-    # -------------------------- 近两年分析 --------------------------
-    # 近两年 - Top10贡献者
-    plot_top_contributors(
-        two_years_commits,
-        title=f"Top 10 Contributors ({latest_year-1} - {latest_year})",
-        save_name=f"top_10_contributors_2years.png"
-    )
-    
-    # 近两年 - 提交类型分布
-    plot_commit_types(
-        two_years_commits,
-        title=f"Commit Type Distribution ({latest_year-1} - {latest_year})",
-        save_name=f"commit_type_2years.png"
-    )
-
-print("分析完成！所有图表已保存至:", output_dir.absolute())
+        return None
+    return bar_spec(types, type_counts, title, Path(out_dir)/save_name,
+                    xlabel="Commit Type", ylabel="Number of Commits", rotation=30)
+
+def yearly_commit_spec(yearly_counter, title, save_name, out_dir=output_dir):
+    """
+    生成年度提交折线图的描述
+
+    参数:
+        yearly_counter (Counter): 年份 -> 提交次数 的计数器
+        title (str): 图表标题
+        save_name (str): 保存的文件名
+        out_dir (Path): 图片目录
+
+    返回:
+        FigureSpec: 图表描述
+    """
+    years = sorted(yearly_counter.keys())
+    year_counts = [yearly_counter[y] for y in years]
+    return line_spec(years, year_counts, title, Path(out_dir)/save_name,
+                     xlabel="Year", ylabel="Number of Commits")
+
+def merge_window_authors(window_counters, source_path, mailmap_path=MAILMAP, use_cache=USE_CACHE):
+    """
+    把各窗口的作者计数按身份映射合并（就地修改）
+
+    参数:
+        window_counters (dict): {窗口名称: CommitCounters}
+        source_path (str | Path): CSV 路径或 git 仓库目录（用于映射缓存和查找 .mailmap）
+        mailmap_path (str | Path | None): 指定 mailmap
+        use_cache (bool): 是否读写 .commit_cache/ 中的映射缓存
+
+    返回:
+        bool: 映射是否重新计算（规则、mailmap 或数据变化）
+    """
+    # 各窗口作者的并集（取各自最大的计数），映射只计算一次
+    all_authors = Counter()
+    for counters in window_counters.values():
+        all_authors |= counters.authors
+    mapping, rebuilt = identity_map(all_authors, source_path, mailmap_path, use_cache=use_cache)
+    for counters in window_counters.values():
+        counters.authors = merge_author_counter(counters.authors, mapping)
+    return rebuilt
+
+
+def aggregate(csv_path=file_path, windows=WINDOWS, git_repo=GIT_REPO,
+              incremental=INCREMENTAL, use_cache=USE_CACHE,
+              merge_aliases=MERGE_AUTHOR_ALIASES, mailmap_path=MAILMAP, storage=STORAGE, stats=None):
+    """
+    读取并统计（只依赖标准库）
+
+    参数:
+        csv_path (str | Path): 提交记录 CSV 路径
+        windows (list): 时间窗口配置
+        git_repo (str | None): 给出时直接读取本地 git 仓库，忽略 csv_path
+        incremental (bool): 增量模式，只折叠新增提交
+        use_cache (bool): 是否使用 .commit_cache/ 磁盘缓存
+        merge_aliases (bool): 是否合并同一作者的不同写法
+        mailmap_path (str | Path | None): 指定 mailmap，默认使用数据源旁边的 .mailmap
+        storage (str): "memory" 或 "sqlite"（只对 CSV 生效，增量模式由库的失效规则代替）
+        stats (dict | None): 传入时累加 stats["rejected"]（CSV 中格式错误被拒绝的行数）
+
+    返回:
+        tuple: ({窗口名称: CommitCounters}, 最新年份或 None, 数字有变化的窗口名称集合)
+    """
+    if storage == "sqlite" and not git_repo:
+        from commit_store import CommitStore
+        # 库中的 author 列已按合并设置写好，不再重复合并
+        with CommitStore.open(csv_path, merge_aliases, mailmap_path, stats=stats) as store:
+            window_counters, latest_year = store.window_counters(windows)
+        return window_counters, latest_year, {name for name, _ in windows}
+
+    # 单遍读取：流式遍历一次（或直接读缓存），同时得到所有时间窗口的贡献者 / 类型 / 年度计数
+    if git_repo:
+        from git_log_source import iter_git_log
+        window_counters, latest_year = aggregate_windows(iter_git_log(git_repo), windows)
+        changed_windows = {name for name, _ in windows}
+    elif incremental:
+        window_counters, latest_year, changed_windows = aggregate_incremental(csv_path, windows, stats=stats)
+    else:
+        window_counters, latest_year = aggregate_file(csv_path, windows, use_cache=use_cache, stats=stats)
+        changed_windows = {name for name, _ in windows}
+    if merge_aliases and window_counters:
+        # 映射变化（如编辑了 .mailmap）时计数不变也要重画
+        if merge_window_authors(window_counters, git_repo or csv_path, mailmap_path, use_cache):
+            changed_windows = {name for name, _ in windows}
+    return window_counters, latest_year, changed_windows
+
+
+def build_specs(window_counters, latest_year, changed_windows, windows=WINDOWS, out_dir=output_dir):
+    """
+    由统计结果生成全部图表描述（不绘图）
+
+    参数:
+        window_counters (dict): aggregate() 返回的 {窗口名称: CommitCounters}
+        latest_year (int | None): 最新年份
+        changed_windows (set): 数字有变化的窗口名称；未变化且图片仍在的窗口跳过
+        windows (list): 时间窗口配置
+        out_dir (Path): 图片目录
+
+    返回:
+        list: FigureSpec 列表
+    """
+    all_time = window_counters["all"]
+
+    # 先收集全部图表描述，最后统一并行渲染
+    specs = []
+
+    # -------------------------- 原有功能 --------------------------
+    if needs_render("all", changed_windows,
+                    "top_10_contributors.png", "commit_type.png", "yearly_commit.png", out_dir=out_dir):
+        # 1. 全部数据 - Top10贡献者
+        specs.append(top_contributors_spec(
+            all_time.authors,
+            title="Top 10 Contributors by Commit Count (All Time)",
+            save_name="top_10_contributors.png",
+            out_dir=out_dir
+        ))
+
+        # 2. 全部数据 - 提交类型分布
+        specs.append(commit_types_spec(
+            all_time,
+            title="Fine-grained Commit Type Distribution (All Time)",
+            save_name="commit_type.png",
+            out_dir=out_dir
+        ))
+
+        # 3. 年度提交统计（年度计数器已在读取时累加）
+        specs.append(yearly_commit_spec(
+            all_time.years,
+            title="Yearly Commit Activity (All Time)",
+            save_name="yearly_commit.png",
+            out_dir=out_dir
+        ))
+
+    # -------------------------- 新增：近五年/近两年数据分析 --------------------------
+    if latest_year is None:
+        print("错误：无有效时间的提交数据，无法分析近五年/近两年数据")
+    else:
+        # 各窗口的计数已由 aggregate_windows 合并好，这里只负责生成图表描述
+        for name, span in windows:
+            if span is None:
+                continue
+            if not needs_render(name, changed_windows,
+                                f"top_10_contributors_{name}.png", f"commit_type_{name}.png",
+                                out_dir=out_dir):
+                continue
+            start_year, end_year = window_years(span, latest_year)
+            counters = window_counters[name]
+
+            # Top10贡献者
+            specs.append(top_contributors_spec(
+                counters.authors,
+                title=f"Top 10 Contributors ({start_year} - {end_year})",
+                save_name=f"top_10_contributors_{name}.png",
+                out_dir=out_dir
+            ))
+
+            # 提交类型分布
+            specs.append(commit_types_spec(
+                counters,
+                title=f"Commit Type Distribution ({start_year} - {end_year})",
+                save_name=f"commit_type_{name}.png",
+                out_dir=out_dir
+            ))
+
+    return [spec for spec in specs if spec is not None]
+
+
+def render(specs, workers=RENDER_WORKERS):
+    """
+    渲染图表（此时才导入 matplotlib），输入哈希未变的图表直接跳过
+
+    参数:
+        specs (list): FigureSpec 列表
+        workers (int | None): 渲染进程数
+
+    返回:
+        list: 实际重新渲染的图片路径
+    """
+    for directory in {Path(spec.path).parent for spec in specs}:
+        directory.mkdir(parents=True, exist_ok=True)
+    return render_all(specs, workers=workers)
+
+
+def main(csv_path=file_path):
+    """
+    统计并绘制全部图表
+
+    参数:
+        csv_path (str | Path): 提交记录 CSV 路径，默认 file_path（多仓库批量统计见 batch_analyze.py）
+    """
+    stats = {}
+    window_counters, latest_year, changed_windows = aggregate(
+        csv_path, WINDOWS, git_repo=GIT_REPO, incremental=INCREMENTAL, use_cache=USE_CACHE, storage=STORAGE,
+        stats=stats)
+    if not GIT_REPO:
+        print(f"成功加载真实数据：{csv_path}（共{window_counters['all'].total}条提交记录，"
+              f"拒绝{stats.get('rejected', 0)}行格式错误的记录）")
+    specs = build_specs(window_counters, latest_year, changed_windows, WINDOWS, out_dir=output_dir)
+    rendered = render(specs, workers=RENDER_WORKERS)
+    print(f"重新渲染 {len(rendered)} 张图表，其余图表输入未变化")
+    print("分析完成！所有图表已保存至:", output_dir.absolute())
+
+# 进程池在 spawn 模式（Windows / macOS）下会重新导入本模块，入口必须放在 main 保护之下
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""
+作者身份合并：把同一个人的不同写法（大小写、附加符号、中间名、姓名缩写、邮箱）归并为一个贡献者
+
+用法:
+    from author_identity import identity_map, merge_author_counter
+    mapping, _ = identity_map(authors_counter, source_path="requests_commits.csv")   # 原始写法 -> 规范名
+    merged = merge_author_counter(authors_counter, mapping)
+
+功能:
+    Counter(author) / value_counts() 把 "Kenneth Reitz" 和 "☿ Kenneth Reitz"、"Ian Cordasco" 和
+    "Ian Stapleton Cordasco" 当成不同的人。这里按以下规则合并：
+    1. mailmap（git 的 .mailmap 格式）：命中的写法直接映射到其中给出的规范名
+    2. 分块（blocking）：每个名字按若干键分到块里，只在同一块内比较，不做两两比较：
+       - 规范化全名（去掉重音和符号、统一大小写）相同：直接合并
+       - 名 + 姓相同：中间名互相兼容（一方没有，或互为缩写）时合并
+       - 首字母 + 姓相同：缩写（如 "K. Reitz"）只在块内全名唯一时并入该全名
+       - 邮箱相同；同一邮箱域（公共邮箱除外）下首字母 + 姓相同（仅在提供邮箱时使用）
+       超过 MAX_BLOCK_SIZE 的模糊块（常见姓名）跳过，避免误合并和平方级比较
+    3. 并查集求连通分量；规范名优先取 mailmap 的名字，否则取提交最多的写法
+    结果按 CSV 缓存在 .commit_cache/<CSV 文件名>.authors/（随 CSV、规则版本和 mailmap 内容失效），
+    之后的运行直接读取映射，对计数器 / Categorical 做一次整体映射即可。
+    只依赖标准库。
+"""
+
+import hashlib
+import unicodedata
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from commit_cache import ColumnCacheWriter, file_sha256, load_columns
+
+# 合并规则版本，规则变化时修改，旧缓存自动失效
+IDENTITY_RULES_VERSION = "identity-v1"
+IDENTITY_CACHE_NAMESPACE = "authors"
+MAILMAP_FILE_NAME = ".mailmap"
+# 模糊块（名 + 姓、首字母 + 姓、邮箱域）超过该大小时不在块内合并
+MAX_BLOCK_SIZE = 50
+# 多人署名的连接词
+CO_AUTHOR_WORDS = frozenset({"and", "und", "et"})
+# 公共邮箱域名不能说明两个人属于同一组织
+PUBLIC_EMAIL_DOMAINS = frozenset({
+    "gmail.com", "googlemail.com", "hotmail.com", "outlook.com", "live.com", "yahoo.com",
+    "icloud.com", "me.com", "qq.com", "163.com", "126.com", "foxmail.com", "protonmail.com",
+    "users.noreply.github.com",
+})
+
+
+def name_tokens(name):
+    """
+    名字规范化后的词列表
+
+    参数:
+        name (str): 原始作者名
+
+    返回:
+        list: 小写、去重音、去符号后的词（非 ASCII 字母保留），如 "☿ Kenneth Reitz" -> ["kenneth", "reitz"]
+    """
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    tokens = []
+    for raw in text.replace("&", " and ").replace("-", " ").replace(".", " ").replace("_", " ").split():
+        token = "".join(ch for ch in raw if ch.isalnum())
+        if token:
+            tokens.append(token)
+    return tokens
+
+
+def normalize_name(name):
+    """规范化全名（词直接拼接），"Ben" / "ben" / "B E N" 得到同一个键"""
+    return "".join(name_tokens(name))
+
+
+# -------------------------- mailmap --------------------------
+def _split_mailmap_line(line):
+    """把一行拆成 [(名字, 邮箱)]，名字可为空"""
+    parts = []
+    rest = line
+    while "<" in rest:
+        name, _, tail = rest.partition("<")
+        email, _, rest = tail.partition(">")
+        parts.append((name.strip(), email.strip().lower()))
+    return parts
+
+
+def parse_mailmap(path):
+    """
+    读取 git mailmap
+
+    参数:
+        path (str | Path): .mailmap 路径
+
+    返回:
+        list: [(规范名, 规范邮箱, 提交名, 提交邮箱)]，缺省的字段为空字符串
+
+    功能:
+        支持 git 的四种写法：
+            Proper Name <commit@email>
+            <proper@email> <commit@email>
+            Proper Name <proper@email> <commit@email>
+            Proper Name <proper@email> Commit Name <commit@email>
+        CSV 里没有邮箱（视为空），因此按名字合并时写成
+            Kenneth Reitz <> ☿ Kenneth Reitz <>
+    """
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            parts = _split_mailmap_line(line)
+            if len(parts) == 1:
+                proper_name, email = parts[0]
+                entries.append((proper_name, "", "", email))
+            elif len(parts) == 2:
+                (proper_name, proper_email), (commit_name, commit_email) = parts
+                entries.append((proper_name, proper_email, commit_name, commit_email))
+    return entries
+
+
+class _Mailmap:
+    """mailmap 查找：(提交名, 提交邮箱) 精确匹配优先，其次只按提交邮箱匹配"""
+
+    def __init__(self, entries):
+        self.by_name_email = {}
+        self.by_email = {}
+        for proper_name, _, commit_name, commit_email in entries:
+            if commit_name:
+                self.by_name_email[(commit_name.casefold(), commit_email)] = proper_name
+            else:
+                self.by_email[commit_email] = proper_name
+
+    def lookup(self, name, email=""):
+        email = (email or "").lower()
+        proper = self.by_name_email.get((name.casefold(), email))
+        if proper is None and email:
+            proper = self.by_email.get(email)
+        return proper or None
+
+
+def find_mailmap(source_path):
+    """
+    查找数据源旁边的 .mailmap
+
+    参数:
+        source_path (str | Path): CSV 路径或本地 git 仓库目录
+
+    返回:
+        Path | None: 存在时返回路径
+    """
+    source_path = Path(source_path)
+    folder = source_path if source_path.is_dir() else source_path.parent
+    path = folder / MAILMAP_FILE_NAME
+    return path if path.exists() else None
+
+
+# -------------------------- 分块合并 --------------------------
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def _middles_compatible(a, b):
+    """中间名兼容：一方为空，或逐个词相同 / 互为首字母"""
+    if not a or not b:
+        return True
+    if len(a) != len(b):
+        return False
+    return all(x == y or (len(x) == 1 and y.startswith(x)) or (len(y) == 1 and x.startswith(y))
+               for x, y in zip(a, b))
+
+
+def _blocking_keys(tokens, email):
+    """一个名字所属的模糊块（"Ian Ross and Ian Cordasco" 这类多人署名不参与模糊合并）"""
+    keys = []
+    if len(tokens) >= 2 and not CO_AUTHOR_WORDS.intersection(tokens[1:-1]):
+        first, last = tokens[0], tokens[-1]
+        keys.append(("first_last", first, last))
+        keys.append(("initial_last", first[0], last))
+        if email and "@" in email:
+            domain = email.rsplit("@", 1)[1]
+            if domain not in PUBLIC_EMAIL_DOMAINS:
+                keys.append(("domain", domain, first[0], last))
+    return keys
+
+
+def _merge_block(kind, members, tokens, uf):
+    """在一个模糊块内合并"""
+    if kind == "first_last":
+        # 中间名两两兼容才合并；块内出现两个不同的非空中间名时，没有中间名的写法无法判断归属
+        middles = {tuple(tokens[i][1:-1]) for i in members} - {()}
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                ma, mb = tokens[a][1:-1], tokens[b][1:-1]
+                if (ma and mb) or len(middles) <= 1:
+                    if _middles_compatible(ma, mb):
+                        uf.union(a, b)
+    elif kind == "initial_last":
+        # 缩写名（首词只有一个字母）只在块内恰好有一个完整的名时并入
+        full_firsts = {tokens[i][0] for i in members if len(tokens[i][0]) > 1}
+        if len(full_firsts) != 1:
+            return
+        anchor = next(i for i in members if len(tokens[i][0]) > 1)
+        for i in members:
+            if len(tokens[i][0]) == 1:
+                uf.union(anchor, i)
+    else:
+        for i in members[1:]:
+            uf.union(members[0], i)
+
+
+def resolve_identities(author_counts, emails=None, mailmap_entries=()):
+    """
+    计算作者写法到规范名的映射
+
+    参数:
+        author_counts (dict): 作者写法 -> 提交数（Counter 即可）
+        emails (dict | None): 作者写法 -> 邮箱；没有邮箱的数据源传 None
+        mailmap_entries (list): parse_mailmap() 的结果
+
+    返回:
+        dict: {作者写法: 规范名}，包含全部作者（没有别名的映射到自己）
+    """
+    emails = emails or {}
+    names = sorted(author_counts)
+    mailmap = _Mailmap(mailmap_entries)
+    uf = _UnionFind(len(names))
+    tokens = [name_tokens(name) for name in names]
+
+    exact_blocks = defaultdict(list)
+    fuzzy_blocks = defaultdict(list)
+    proper_of = {}
+    for i, name in enumerate(names):
+        email = (emails.get(name) or "").lower()
+        proper = mailmap.lookup(name, email)
+        if proper:
+            proper_of[i] = proper
+            exact_blocks[("mailmap", proper)].append(i)
+        key = "".join(tokens[i])
+        if key:
+            exact_blocks[("name", key)].append(i)
+        if email:
+            exact_blocks[("email", email)].append(i)
+        for block_key in _blocking_keys(tokens[i], email):
+            fuzzy_blocks[block_key].append(i)
+
+    for members in exact_blocks.values():
+        for i in members[1:]:
+            uf.union(members[0], i)
+    for block_key, members in fuzzy_blocks.items():
+        if 1 < len(members) <= MAX_BLOCK_SIZE:
+            _merge_block(block_key[0], members, tokens, uf)
+
+    groups = defaultdict(list)
+    for i in range(len(names)):
+        groups[uf.find(i)].append(i)
+    mapping = {}
+    for members in groups.values():
+        proper = next((proper_of[i] for i in members if i in proper_of), None)
+        if proper is None:
+            # 提交最多的写法作为规范名，同数时取名字排序靠前的
+            proper = names[min(members, key=lambda i: (-author_counts[names[i]], names[i]))]
+        for i in members:
+            mapping[names[i]] = proper
+    return mapping
+
+
+# -------------------------- 缓存与应用 --------------------------
+def identity_schema(mailmap_path=None):
+    """映射缓存的 schema：规则版本 + 合并参数 + mailmap 内容摘要"""
+    mailmap_digest = file_sha256(mailmap_path)[:16] if mailmap_path else "none"
+    return f"{IDENTITY_RULES_VERSION}:{MAX_BLOCK_SIZE}:{mailmap_digest}"
+
+
+def mapping_digest(mapping):
+    """
+    映射内容的摘要（只含被改名的写法），用于让依赖作者名的增量状态在映射变化时失效
+
+    参数:
+        mapping (dict): resolve_identities() 的结果
+
+    返回:
+        str: 16 位十六进制摘要
+    """
+    digest = hashlib.sha256(IDENTITY_RULES_VERSION.encode("utf-8"))
+    for raw, canonical in sorted(mapping.items()):
+        if raw != canonical:
+            digest.update(f"{raw}\0{canonical}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def identity_map(author_counts, source_path=None, mailmap_path=None, emails=None, use_cache=True):
+    """
+    取作者映射：CSV 未变且缓存覆盖全部作者时直接读取，否则重新计算并写入缓存
+
+    参数:
+        author_counts (dict): 作者写法 -> 提交数
+        source_path (str | Path | None): CSV 路径（用于缓存和查找 .mailmap）；git 仓库目录只查找 .mailmap
+        mailmap_path (str | Path | None): 指定 mailmap，默认使用数据源旁边的 .mailmap
+        emails (dict | None): 作者写法 -> 邮箱
+        use_cache (bool): 是否读写 .commit_cache/
+
+    返回:
+        tuple: ({作者写法: 规范名}, 本次是否重新计算（缓存未命中）)
+    """
+    if mailmap_path is None and source_path is not None:
+        mailmap_path = find_mailmap(source_path)
+    schema = identity_schema(mailmap_path)
+    cacheable = use_cache and source_path is not None and Path(source_path).is_file()
+
+    if cacheable:
+        columns = load_columns(source_path, IDENTITY_CACHE_NAMESPACE, schema)
+        if columns is not None:
+            mapping = dict(zip(columns["raw"], columns["canonical"]))
+            if all(name in mapping for name in author_counts):
+                return mapping, False
+
+    entries = parse_mailmap(mailmap_path) if mailmap_path else ()
+    mapping = resolve_identities(author_counts, emails, entries)
+    if cacheable:
+        try:
+            writer = ColumnCacheWriter(source_path, IDENTITY_CACHE_NAMESPACE, schema)
+        except OSError as e:
+            print(f"警告：无法写入作者映射缓存（{e}）")
+        else:
+            writer.append_strings("raw", mapping.keys())
+            writer.append_strings("canonical", mapping.values())
+            writer.commit(len(mapping))
+    return mapping, True
+
+
+def merge_author_counter(author_counter, mapping):
+    """
+    按映射合并作者计数
+
+    参数:
+        author_counter (Counter): 作者写法 -> 提交数
+        mapping (dict): 作者写法 -> 规范名（不在映射中的作者保持原样）
+
+    返回:
+        Counter: 规范名 -> 提交数
+    """
+    merged = Counter()
+    for name, count in author_counter.items():
+        merged[mapping.get(name, name)] += count
+    return merged
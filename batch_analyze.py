@@ -0,0 +1,235 @@
+"""
+多仓库批量统计：把一批提交 CSV 分发到进程池并行统计，再汇总为跨仓库结果
+
+用法:
+    python batch_analyze.py <CSV目录 或 清单文件> [--workers N] [--no-cache] [--output batch_summary.json]
+
+功能:
+    - 目录：递归查找其中所有 .csv（跳过 .commit_cache/）
+    - 清单文件：每行一个 CSV 路径，空行和 # 开头的行忽略，相对路径相对清单所在目录
+    每个仓库在独立进程中调用 commit_stream.aggregate_file（同样读写各自的 .commit_cache/），
+    返回可合并的 CommitCounters；主进程按窗口 merge 得到跨仓库汇总，并报告每个仓库的耗时与总吞吐量。
+    注意：近 n 年窗口按各仓库自己的最新年份计算，跨仓库汇总是各仓库同名窗口之和。
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from commit_stream import DEFAULT_WINDOWS, CommitCounters, aggregate_file
+
+# 单个仓库的统计结果（必须能被 pickle，才能从工作进程返回）
+#   name        (str): 仓库名（相对输入目录的路径，不含扩展名）
+#   path        (str): CSV 路径
+#   windows     (dict): {窗口名称: CommitCounters}
+#   latest_year (int | None): 最新年份
+#   size        (int): CSV 字节数
+#   seconds     (float): 统计耗时
+#   error       (str | None): 失败原因，成功时为 None
+#   rejected    (int): 格式错误被拒绝的行数
+RepoResult = namedtuple("RepoResult",
+                        ["name", "path", "windows", "latest_year", "size", "seconds", "error", "rejected"])
+
+
+def find_commit_csvs(source):
+    """
+    收集待统计的 CSV
+
+    参数:
+        source (str | Path): CSV 目录，或每行一个路径的清单文件
+
+    返回:
+        list: [(仓库名, CSV 路径), ...]
+    """
+    source = Path(source)
+    if source.is_dir():
+        paths = sorted(p for p in source.rglob("*.csv") if ".commit_cache" not in p.parts)
+        return [(p.relative_to(source).with_suffix("").as_posix(), p) for p in paths]
+
+    entries = []
+    with open(source, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            path = Path(line)
+            if not path.is_absolute():
+                path = source.parent / path
+            entries.append((Path(line).with_suffix("").as_posix(), path))
+    return entries
+
+
+def analyze_repo(name, path, windows=DEFAULT_WINDOWS, use_cache=True):
+    """
+    统计单个仓库（在工作进程中执行）
+
+    参数:
+        name (str): 仓库名
+        path (str | Path): CSV 路径
+        windows (list): 时间窗口配置
+        use_cache (bool): 是否使用 .commit_cache/ 缓存
+
+    返回:
+        RepoResult: 统计结果；文件缺失、无法解码或没有一条有效记录时 error 记录原因，不中断整批任务
+    """
+    start = time.perf_counter()
+    stats = {}
+    try:
+        size = os.path.getsize(path)
+        counters, latest_year = aggregate_file(path, windows, use_cache=use_cache, stats=stats)
+    except (OSError, UnicodeDecodeError) as e:
+        return RepoResult(name, str(path), {}, None, 0, time.perf_counter() - start, str(e),
+                          stats.get("rejected", 0))
+    rejected = stats.get("rejected", 0)
+    if not any(c.total for c in counters.values()):
+        return RepoResult(name, str(path), {}, None, 0, time.perf_counter() - start,
+                          f"没有有效的提交记录（拒绝{rejected}行格式错误的记录）", rejected)
+    return RepoResult(name, str(path), counters, latest_year, size, time.perf_counter() - start, None, rejected)
+
+
+def merge_results(results, windows=DEFAULT_WINDOWS):
+    """
+    把各仓库的计数按窗口合并
+
+    参数:
+        results (list): RepoResult 列表
+        windows (list): 时间窗口配置
+
+    返回:
+        dict: {窗口名称: CommitCounters}
+    """
+    merged = {name: CommitCounters() for name, _ in windows}
+    for result in results:
+        for name, counters in result.windows.items():
+            merged[name].merge(counters)
+    return merged
+
+
+def run_batch(entries, windows=DEFAULT_WINDOWS, workers=None, use_cache=True):
+    """
+    并行统计一批仓库
+
+    参数:
+        entries (list): find_commit_csvs() 的结果
+        windows (list): 时间窗口配置
+        workers (int | None): 进程数；None 表示使用全部 CPU 核心，1 表示在当前进程中串行
+        use_cache (bool): 是否使用 .commit_cache/ 缓存
+
+    返回:
+        tuple: (RepoResult 列表（顺序同 entries）, 总耗时秒数)
+
+    功能:
+        按文件大小从大到小提交任务，大仓库先开始，避免最后只剩一个大仓库在跑
+    """
+    start = time.perf_counter()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(entries)))
+    order = sorted(range(len(entries)), key=lambda i: _file_size(entries[i][1]), reverse=True)
+    results = [None] * len(entries)
+
+    if workers <= 1:
+        for i in order:
+            results[i] = analyze_repo(*entries[i], windows=windows, use_cache=use_cache)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(analyze_repo, *entries[i], windows=windows, use_cache=use_cache): i
+                for i in order
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+    return results, time.perf_counter() - start
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def build_summary(results, merged, elapsed, top_n=20):
+    """
+    生成可写入 JSON 的汇总
+
+    参数:
+        results (list): RepoResult 列表
+        merged (dict): merge_results() 的结果
+        elapsed (float): 总耗时秒数
+        top_n (int): 跨仓库贡献者排行保留的人数
+
+    返回:
+        dict: 汇总（每个仓库的提交数、拒绝行数与耗时，总吞吐量，各窗口的跨仓库计数）
+    """
+    ok = [r for r in results if r.error is None]
+    total_commits = sum(r.windows["all"].total for r in ok if "all" in r.windows)
+    total_bytes = sum(r.size for r in ok)
+    return {
+        "repos": [{
+            "name": r.name,
+            "path": r.path,
+            "commits": r.windows["all"].total if "all" in r.windows else None,
+            "rejected": r.rejected,
+            "latest_year": r.latest_year,
+            "seconds": round(r.seconds, 4),
+            "error": r.error,
+        } for r in results],
+        "throughput": {
+            "repos": len(ok),
+            "failed": len(results) - len(ok),
+            "commits": total_commits,
+            "rejected": sum(r.rejected for r in results),
+            "seconds": round(elapsed, 4),
+            "commits_per_second": round(total_commits / elapsed, 1) if elapsed else None,
+            "mb_per_second": round(total_bytes / 1e6 / elapsed, 2) if elapsed else None,
+        },
+        "windows": {
+            name: {
+                "total": counters.total,
+                "top_authors": counters.authors.most_common(top_n),
+                "types": dict(zip(*counters.type_counts())),
+                "years": dict(sorted(counters.years.items())),
+            }
+            for name, counters in merged.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多仓库提交记录批量统计")
+    parser.add_argument("source", help="CSV 目录，或每行一个 CSV 路径的清单文件")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认使用全部 CPU 核心")
+    parser.add_argument("--no-cache", action="store_true", help="不读写 .commit_cache/ 缓存")
+    parser.add_argument("--output", default="batch_summary.json", help="汇总结果保存路径")
+    args = parser.parse_args()
+
+    entries = find_commit_csvs(args.source)
+    if not entries:
+        print(f"错误：{args.source} 中没有找到 CSV 文件")
+        return
+    results, elapsed = run_batch(entries, workers=args.workers, use_cache=not args.no_cache)
+    merged = merge_results(results)
+    summary = build_summary(results, merged, elapsed)
+
+    for repo in summary["repos"]:
+        if repo["error"]:
+            print(f"  [失败] {repo['name']}: {repo['error']}")
+        else:
+            print(f"  {repo['name']}: {repo['commits']} 条提交，拒绝 {repo['rejected']} 行，{repo['seconds']:.3f} 秒")
+    stats = summary["throughput"]
+    print(f"共统计 {stats['repos']} 个仓库、{stats['commits']} 条提交（拒绝 {stats['rejected']} 行），耗时 {stats['seconds']:.3f} 秒"
+          f"（{stats['commits_per_second']} 条/秒，{stats['mb_per_second']} MB/秒）")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    print("跨仓库汇总已保存至:", Path(args.output).absolute())
+
+
+# 进程池在 spawn 模式（Windows / macOS）下会重新导入本模块，入口必须放在 main 保护之下
+if __name__ == "__main__":
+    main()
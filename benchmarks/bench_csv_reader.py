@@ -0,0 +1,107 @@
+"""
+CSV 读取基准：统一读取器 commit_csv 与原有两种读取方式的对比
+
+用法:
+    python benchmarks/bench_csv_reader.py [行数，默认 10000000] [--keep]
+
+功能:
+    以 requests_commits.csv 为样本（不存在时用内置样本）循环生成指定行数的合成 CSV，
+    commit_id 依次编号，说明列原样保留（含逗号、引号），然后分别计时：
+    - split: 原 analyze_commits.py 的逐行 line.split(",", 3)（不解析日期）
+    - pandas_skip: 原 CommitAnalyzer 的 read_csv(on_bad_lines='skip') + to_datetime
+    - commit_csv_python / commit_csv_pyarrow: 统一读取器的两种引擎（含日期解析）
+    输出每种方式的耗时、吞吐量和得到的行数（pandas_skip 行数偏少即为被静默丢弃的行）。
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from commit_csv import HAS_PYARROW, read_commit_table
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SAMPLE_CSV = os.path.join(REPO_ROOT, "requests_commits.csv")
+FALLBACK_SAMPLE = [
+    "70298332,Nate Prewitt,2025-10-15 20:45:42 +0900,Merge pull request #7042 from psf/dependabot",
+    "f23346a9,Mike Fiedler,2023-12-23 17:36:34 +0000,Revert \"Merge pull request #6605, fix\"",
+    "2ecdb685,Alexandre Erwin Ittner,2023-07-29 22:50:43 -0300,Update reference to \"cookielib\"",
+    "6e4134b2,dependabot[bot],2025-10-13 16:16:05 +0000,Bump github/codeql-action from 3.30.0 to 4.30.8",
+]
+
+
+def make_synthetic_csv(path, rows):
+    """
+    生成合成 CSV
+
+    参数:
+        path (str): 输出路径
+        rows (int): 行数
+    """
+    if os.path.exists(SAMPLE_CSV):
+        with open(SAMPLE_CSV, "r", encoding="utf-8") as f:
+            sample = [line.rstrip("\n").split(",", 1)[1] for line in f if line.count(",") >= 3]
+    else:
+        sample = [line.split(",", 1)[1] for line in FALLBACK_SAMPLE]
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        batch = []
+        for i in range(rows):
+            batch.append(f"{i:08x},{sample[i % len(sample)]}\n")
+            if len(batch) == 100000:
+                f.writelines(batch)
+                batch = []
+        f.writelines(batch)
+
+
+def read_split(path):
+    """原 analyze_commits.py 的读取方式"""
+    count = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and len(line.split(",", 3)) == 4:
+                count += 1
+    return count
+
+
+def read_pandas_skip(path):
+    """原 CommitAnalyzer 的读取方式"""
+    import pandas as pd
+
+    df = pd.read_csv(path, encoding="utf-8-sig", quotechar='"', on_bad_lines="skip",
+                     header=None, names=["commit_id", "author", "date", "message"])
+    df["date"] = pd.to_datetime(df["date"], errors="coerce", utc=True).dt.tz_localize(None)
+    return len(df.dropna(subset=["date"]))
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    rows = int(args[0]) if args else 10_000_000
+    path = os.path.join(tempfile.gettempdir(), f"synthetic_commits_{rows}.csv")
+    if not os.path.exists(path):
+        print(f"生成 {rows} 行合成数据：{path}")
+        make_synthetic_csv(path, rows)
+    size_mb = os.path.getsize(path) / 1e6
+
+    readers = [
+        ("split", read_split),
+        ("pandas_skip", read_pandas_skip),
+        ("commit_csv_python", lambda p: len(read_commit_table(p, engine="python").df)),
+    ]
+    if HAS_PYARROW:
+        readers.append(("commit_csv_pyarrow", lambda p: len(read_commit_table(p, engine="pyarrow").df)))
+
+    print(f"{'读取方式':<20}{'耗时(秒)':>10}{'MB/秒':>10}{'行数':>12}")
+    for name, reader in readers:
+        start = time.perf_counter()
+        count = reader(path)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<20}{elapsed:>10.2f}{size_mb / elapsed:>10.1f}{count:>12}")
+
+    if "--keep" not in sys.argv:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+连接复用与延迟基准：requests.get 与复用 Session 的对比（本地 httpbin 替身，不访问网络）
+
+用法:
+    python benchmarks/bench_http_reuse.py [--requests 400] [--concurrency 1,4,16] [--pool-sizes 1,4,16]
+                                          [--path /get] [--repeat 3] [--output benchmarks/http_reuse_report.json]
+
+功能:
+    test_requests_usecase3.py 想展示 Session 的连接复用和 Cookie 保持，但它访问 https://httpbin.org，
+    耗时主要是网络抖动。这里在进程内启动 local_httpbin.LocalHttpbin，对每种组合用线程池发出固定数量的请求：
+    - get:     每次调用 requests.get（每次新建 Session 和连接池，每个请求一条新连接）
+    - session: 所有线程共用一个 Session，HTTPAdapter(pool_maxsize=连接池大小)
+    记录吞吐量（请求/秒）、p50 / p99 延迟、服务端实际接受的连接数，
+    以及连接池已满时 urllib3 丢弃的连接数（并发数大于连接池时出现）。
+    每个组合重复 --repeat 次取吞吐量居中的一次；开始前先校验 Cookie 在 Session 中得以保持。
+    结果连同运行环境写入 JSON 报告，并打印表格。
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+import urllib3
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from local_httpbin import LocalHttpbin
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "http_reuse_report.json")
+WARMUP_REQUESTS = 5
+
+
+class _PoolFullCounter(logging.Handler):
+    """统计 urllib3 的 "Connection pool is full, discarding connection" 警告"""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.count = 0
+
+    def emit(self, record):
+        if "pool is full" in record.getMessage():
+            self.count += 1
+
+
+def percentile(sorted_values, q):
+    """最近秩百分位数（sorted_values 已排序，q 取 0~100）"""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(q / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def make_client(mode, pool_size):
+    """
+    返回:
+        tuple: (get 函数, 需要关闭的 Session 或 None)
+    """
+    if mode == "get":
+        return requests.get, None
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+    return session.get, session
+
+
+def run_case(server, mode, concurrency, pool_size, total, path, pool_full):
+    """
+    跑一个组合
+
+    参数:
+        server (LocalHttpbin): 本地服务
+        mode (str): "get" / "session"
+        concurrency (int): 线程数
+        pool_size (int | None): Session 的连接池大小（get 模式为 None）
+        total (int): 请求总数
+        path (str): 请求路径
+        pool_full (_PoolFullCounter): 连接丢弃计数
+
+    返回:
+        dict: 本次结果
+    """
+    get, session = make_client(mode, pool_size)
+    url = server.url + path
+    for _ in range(WARMUP_REQUESTS):
+        get(url).content
+
+    def worker(count):
+        latencies = []
+        for _ in range(count):
+            start = time.perf_counter()
+            response = get(url)
+            response.content
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+        return latencies
+
+    shares = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+    connections_before, discarded_before = server.connections, pool_full.count
+    latencies = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for part in pool.map(worker, shares):
+            latencies.extend(part)
+    elapsed = time.perf_counter() - start
+    if session is not None:
+        session.close()
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "pool_size": pool_size,
+        "requests": total,
+        "seconds": round(elapsed, 4),
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "connections": server.connections - connections_before,
+        "discarded": pool_full.count - discarded_before,
+    }
+
+
+def check_cookies(server):
+    """用例3 的流程：Session 中设置的 Cookie 应在下一个请求中带上，requests.get 则不会"""
+    with requests.Session() as s:
+        s.get(server.url + "/cookies/set/sessioncookie/123456789")
+        in_session = s.get(server.url + "/cookies").json()["cookies"]
+    requests.get(server.url + "/cookies/set/sessioncookie/123456789")
+    bare = requests.get(server.url + "/cookies").json()["cookies"]
+    return {"session": in_session, "bare_get": bare,
+            "ok": in_session.get("sessioncookie") == "123456789" and not bare}
+
+
+def parse_ints(text):
+    return [int(v) for v in text.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="requests.get 与复用 Session 的吞吐量 / 延迟基准")
+    parser.add_argument("--requests", type=int, default=400, help="每个组合的请求总数")
+    parser.add_argument("--concurrency", default="1,4,16", help="逗号分隔的线程数")
+    parser.add_argument("--pool-sizes", default="1,4,16", help="逗号分隔的 Session 连接池大小")
+    parser.add_argument("--path", default="/get", help="请求路径")
+    parser.add_argument("--repeat", type=int, default=3, help="每个组合重复次数，取吞吐量居中的一次")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON 报告路径")
+    args = parser.parse_args()
+
+    pool_logger = logging.getLogger(urllib3.connectionpool.__name__)
+    pool_full = _PoolFullCounter()
+    pool_logger.addHandler(pool_full)
+    pool_logger.propagate = False
+
+    cases = []
+    for concurrency in parse_ints(args.concurrency):
+        cases.append(("get", concurrency, None))
+        cases.extend(("session", concurrency, size) for size in parse_ints(args.pool_sizes))
+
+    report = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "requests": requests.__version__,
+        "urllib3": urllib3.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": vars(args),
+        "results": [],
+    }
+    print(f"{'模式':<8}{'并发':>5}{'连接池':>7}{'请求/秒':>10}{'p50(ms)':>10}{'p99(ms)':>10}{'连接数':>8}{'丢弃':>6}")
+    with LocalHttpbin() as server:
+        report["cookie_check"] = check_cookies(server)
+        for mode, concurrency, pool_size in cases:
+            runs = [run_case(server, mode, concurrency, pool_size, args.requests, args.path, pool_full)
+                    for _ in range(args.repeat)]
+            result = sorted(runs, key=lambda r: r["rps"])[len(runs) // 2]
+            report["results"].append(result)
+            print(f"{mode:<8}{concurrency:>5}{pool_size or '-':>7}{result['rps']:>10.1f}{result['p50_ms']:>10.3f}"
+                  f"{result['p99_ms']:>10.3f}{result['connections']:>8}{result['discarded']:>6}")
+
+    print("Cookie 保持校验:", "通过" if report["cookie_check"]["ok"] else "失败", report["cookie_check"])
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("报告已保存:", args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+提交分析流水线基准：按阶段计时，结果追加到 JSON 历史
+
+用法:
+    python benchmarks/bench_pipeline.py [--sizes 10k,100k,1m,10m] [--history benchmarks/history.json] [--label 说明]
+
+功能:
+    对每个规模生成合成 CSV（见 bench_csv_reader.make_synthetic_csv），依次计时：
+    - parse:          读取并切分为 4 列（commit_csv.read_commit_table，不解析日期）
+    - dates:          日期解析（commit_csv.parse_commit_dates）
+    - classify:       整列提交类型分类（commit_classifier.classify_series）
+    - window_filter:  按时间排序后二分查找全时段 / 近5年 / 近2年窗口
+    - aggregate:      各窗口 Top10 贡献者、类型计数和年度计数
+    - stream_aggregate: analyze_commits.py 的单遍流式统计（commit_stream.aggregate_file，不用缓存）
+    - render:         绘制一组柱状图 / 折线图（figure_render.render_figure，串行）
+    - csv_export:     导出带类型的提交表
+    每次运行作为一条记录追加到历史文件（含 git 版本、Python 版本、平台），
+    同一阶段在不同版本之间的耗时变化即可对比。
+    benchmarks/history.json 纳入版本库（第一条为基线）：改动流水线性能的提交运行本脚本，
+    把追加的记录随提交一起提交；对比时只比较 platform / cpus 相同的记录。
+    只想在本地试跑、不改动共享历史时用 --history 指向别的文件。
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_csv_reader import make_synthetic_csv
+from commit_classifier import default_classifier
+from commit_csv import parse_commit_dates, read_commit_table
+from commit_stream import aggregate_file
+from figure_render import bar_spec, line_spec, render_figure
+
+DEFAULT_SIZES = "10k,100k,1m,10m"
+DEFAULT_HISTORY = os.path.join(REPO_ROOT, "benchmarks", "history.json")
+# 与 top3_contributor_analysis.py 相同的三个时间范围（年）
+WINDOW_YEARS = {"all": None, "5y": 5, "2y": 2}
+
+
+def parse_size(text):
+    """'10k' -> 10000, '1m' -> 1000000"""
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+@contextmanager
+def stage(timings, name):
+    """记录一个阶段的耗时（秒）"""
+    start = time.perf_counter()
+    yield
+    timings[name] = round(time.perf_counter() - start, 4)
+
+
+def run_pipeline(csv_path, work_dir):
+    """
+    跑一遍完整流水线
+
+    参数:
+        csv_path (str): 合成 CSV 路径
+        work_dir (str): 图表和导出 CSV 的临时目录
+
+    返回:
+        dict: {阶段名: 秒数}
+    """
+    import numpy as np
+    import pandas as pd
+
+    timings = {}
+    with stage(timings, "parse"):
+        df, _ = read_commit_table(csv_path, parse_dates=False)
+    with stage(timings, "dates"):
+        df["date"] = parse_commit_dates(df["date"]).to_numpy()
+        df = df.dropna(subset=["date"]).reset_index(drop=True)
+    with stage(timings, "classify"):
+        df["author"] = df["author"].astype("category")
+        df["commit_type"] = default_classifier.classify_series(df["message"])
+
+    with stage(timings, "window_filter"):
+        df = df.sort_values("date", kind="stable").reset_index(drop=True)
+        dates = df["date"].to_numpy()
+        latest = pd.Timestamp(dates[-1])
+        windows = {}
+        for name, years in WINDOW_YEARS.items():
+            lo = 0 if years is None else int(np.searchsorted(
+                dates, (latest - pd.DateOffset(years=years)).to_datetime64()))
+            windows[name] = df.iloc[lo:]
+
+    with stage(timings, "aggregate"):
+        summaries = {}
+        for name, window in windows.items():
+            summaries[name] = (
+                window["author"].value_counts().head(10),
+                window["commit_type"].value_counts(sort=False),
+                window["date"].dt.year.value_counts().sort_index(),
+            )
+
+    with stage(timings, "stream_aggregate"):
+        aggregate_file(csv_path, use_cache=False)
+
+    with stage(timings, "render"):
+        for name, (authors, types, years) in summaries.items():
+            render_figure(bar_spec(authors.index.astype(str), authors.tolist(), f"Top 10 ({name})",
+                                   os.path.join(work_dir, f"top_{name}.png"),
+                                   xlabel="Author", ylabel="Number of Commits", rotation=45))
+            render_figure(bar_spec(types.index.astype(str), types.tolist(), f"Types ({name})",
+                                   os.path.join(work_dir, f"types_{name}.png"),
+                                   xlabel="Commit Type", ylabel="Number of Commits", rotation=30))
+        years = summaries["all"][2]
+        render_figure(line_spec(years.index.tolist(), years.tolist(), "Yearly",
+                                os.path.join(work_dir, "yearly.png"),
+                                xlabel="Year", ylabel="Number of Commits"))
+
+    with stage(timings, "csv_export"):
+        df.to_csv(os.path.join(work_dir, "commits_with_type.csv"), index=False, encoding="utf-8")
+    return timings
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "-C", REPO_ROOT, "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def append_history(history_path, record):
+    """把本次结果追加到历史文件（JSON 列表）"""
+    history = []
+    if os.path.exists(history_path):
+        with open(history_path, "r", encoding="utf-8") as f:
+            history = json.load(f)
+    history.append(record)
+    with open(history_path, "w", encoding="utf-8") as f:
+        json.dump(history, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="提交分析流水线分阶段基准")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="逗号分隔的行数，如 10k,100k,1m,10m")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON 历史文件")
+    parser.add_argument("--label", default="", help="本次运行的说明")
+    parser.add_argument("--keep", action="store_true", help="保留生成的合成 CSV")
+    args = parser.parse_args()
+
+    record = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "label": args.label,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": {},
+    }
+    for size in [parse_size(s) for s in args.sizes.split(",")]:
+        csv_path = os.path.join(tempfile.gettempdir(), f"synthetic_commits_{size}.csv")
+        if not os.path.exists(csv_path):
+            make_synthetic_csv(csv_path, size)
+        with tempfile.TemporaryDirectory() as work_dir:
+            timings = run_pipeline(csv_path, work_dir)
+        if not args.keep:
+            os.remove(csv_path)
+        record["results"][str(size)] = timings
+        print(f"{size:>10} 行：" + "，".join(f"{k} {v:.3f}s" for k, v in timings.items()))
+
+    append_history(args.history, record)
+    print("结果已追加到:", args.history)
+
+
+if __name__ == "__main__":
+    main()
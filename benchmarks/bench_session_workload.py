@@ -0,0 +1,320 @@
+"""
+用例3 会话流程的并发负载：N 个独立会话并行回放，对比线程池与 asyncio 两种驱动方式
+
+用法:
+    python benchmarks/bench_session_workload.py [--sessions 1,2,4,8,16,32] [--iterations 20]
+                                                [--modes threads,to_thread,aiohttp] [--executor-workers N]
+                                                [--server-process] [--plot scaling.png]
+                                                [--output benchmarks/session_workload_report.json]
+
+功能:
+    每个会话与 test_requests_usecase3.py 相同：独立的 requests.Session（自己的 Cookie jar、
+    auth=('user', 'pass')、x-test 请求头），每轮依次请求
+        /cookies/set/sessioncookie/<会话号>（302 跳转到 /cookies）、/cookies、/basic-auth/user/pass
+    并校验返回的 Cookie 属于本会话、认证通过，串号或失败计入 errors。
+    驱动方式:
+    - threads:   ThreadPoolExecutor，每个会话一个线程
+    - to_thread: asyncio，每个请求 await asyncio.to_thread(session.get, ...)，
+                 受事件循环默认线程池大小限制（默认 min(32, CPU 数 + 4)，可用 --executor-workers 指定）
+    - aiohttp:   asyncio + aiohttp.ClientSession 作为对照（安装了 aiohttp 才运行）
+    对每个会话数记录吞吐量、p50 / p99 延迟、新建连接数和进程 CPU 利用率，得到扩展曲线；
+    曲线某一点之后吞吐量增幅低于 10% 视为拐点，并给出判断依据：
+    - 会话数超过 to_thread 线程池的线程数：线程池耗尽，多出的会话只能排队
+    - 进程 CPU 利用率接近 1 个核而机器有多个核：GIL 争用
+    - CPU 利用率接近全部核：CPU 饱和
+    服务端默认与客户端同进程（能统计连接数，但服务端线程也争用同一个 GIL），
+    --server-process 把服务端放到独立进程，两次结果对比即可看出 GIL 争用的影响。
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from importlib.util import find_spec
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+from bench_http_reuse import percentile
+from local_httpbin import LocalHttpbin
+
+HAS_AIOHTTP = find_spec("aiohttp") is not None
+
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "session_workload_report.json")
+AUTH = ("user", "pass")
+HEADERS = {"x-test": "true"}
+# 吞吐量增幅低于该比例视为曲线变平
+PLATEAU_GAIN = 0.10
+
+
+def session_flow(session_id):
+    """
+    一轮会话请求
+
+    返回:
+        list: [(路径, 校验函数(status, data) -> bool)]
+    """
+    cookie = str(session_id)
+
+    def has_own_cookie(status, data):
+        return status == 200 and data.get("cookies", {}).get("sessioncookie") == cookie
+
+    def authenticated(status, data):
+        return status == 200 and data.get("authenticated") is True
+
+    return [
+        (f"/cookies/set/sessioncookie/{cookie}", has_own_cookie),
+        ("/cookies", has_own_cookie),
+        (f"/basic-auth/{AUTH[0]}/{AUTH[1]}", authenticated),
+    ]
+
+
+def _new_session():
+    session = requests.Session()
+    session.auth = AUTH
+    session.headers.update(HEADERS)
+    return session
+
+
+def _check(check, response):
+    try:
+        return check(response.status_code, response.json())
+    except ValueError:
+        return False
+
+
+def replay_sync(url, session_id, iterations):
+    """
+    在当前线程回放一个会话
+
+    返回:
+        tuple: (每个请求的延迟列表, 错误数)
+    """
+    latencies, errors = [], 0
+    flow = session_flow(session_id)
+    with _new_session() as session:
+        for _ in range(iterations):
+            for path, check in flow:
+                start = time.perf_counter()
+                response = session.get(url + path)
+                latencies.append(time.perf_counter() - start)
+                errors += not _check(check, response)
+    return latencies, errors
+
+
+async def replay_to_thread(url, session_id, iterations):
+    """asyncio 中回放一个会话，每个阻塞请求交给 asyncio.to_thread"""
+    latencies, errors = [], 0
+    flow = session_flow(session_id)
+    session = _new_session()
+    try:
+        for _ in range(iterations):
+            for path, check in flow:
+                start = time.perf_counter()
+                response = await asyncio.to_thread(session.get, url + path)
+                latencies.append(time.perf_counter() - start)
+                errors += not _check(check, response)
+    finally:
+        session.close()
+    return latencies, errors
+
+
+async def replay_aiohttp(url, session_id, iterations):
+    """aiohttp 客户端回放一个会话（IP 地址的 Cookie 需要 unsafe=True 才会保存）"""
+    import aiohttp
+
+    latencies, errors = [], 0
+    flow = session_flow(session_id)
+    # 直接带 Authorization 头：aiohttp 新版本已弃用 auth= 参数
+    token = base64.b64encode(":".join(AUTH).encode("utf-8")).decode("ascii")
+    headers = dict(HEADERS, Authorization=f"Basic {token}")
+    async with aiohttp.ClientSession(headers=headers,
+                                     cookie_jar=aiohttp.CookieJar(unsafe=True)) as session:
+        for _ in range(iterations):
+            for path, check in flow:
+                start = time.perf_counter()
+                async with session.get(url + path) as response:
+                    data = await response.json(content_type=None)
+                    status = response.status
+                latencies.append(time.perf_counter() - start)
+                errors += not check(status, data)
+    return latencies, errors
+
+
+def run_threads(url, sessions, iterations, executor_workers=None):
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        return list(pool.map(replay_sync, [url] * sessions, range(sessions), [iterations] * sessions))
+
+
+def _run_async(replay, url, sessions, iterations, executor_workers=None):
+    async def main():
+        if executor_workers:
+            asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=executor_workers))
+        return await asyncio.gather(*(replay(url, i, iterations) for i in range(sessions)))
+    return asyncio.run(main())
+
+
+def run_to_thread(url, sessions, iterations, executor_workers=None):
+    return _run_async(replay_to_thread, url, sessions, iterations, executor_workers)
+
+
+def run_aiohttp(url, sessions, iterations, executor_workers=None):
+    return _run_async(replay_aiohttp, url, sessions, iterations)
+
+
+RUNNERS = {"threads": run_threads, "to_thread": run_to_thread, "aiohttp": run_aiohttp}
+
+
+def measure(runner, server, sessions, iterations, executor_workers):
+    """
+    跑一个会话数
+
+    返回:
+        dict: 吞吐量、延迟、错误数、连接数、CPU 利用率
+    """
+    connections_before = server.connections
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    results = runner(server.url, sessions, iterations, executor_workers)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    latencies = sorted(lat for part, _ in results for lat in part)
+    return {
+        "sessions": sessions,
+        "requests": len(latencies),
+        "seconds": round(wall, 4),
+        "rps": round(len(latencies) / wall, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "errors": sum(errors for _, errors in results),
+        "connections": None if server.connections is None else server.connections - connections_before,
+        "cpu_util": round(cpu / wall, 2),
+    }
+
+
+def find_plateau(mode, curve, cpus, executor_workers):
+    """
+    找出扩展曲线变平的位置并给出原因
+
+    参数:
+        mode (str): 驱动方式
+        curve (list): measure() 结果，按会话数升序
+        cpus (int): CPU 数
+        executor_workers (int): to_thread 使用的线程池大小
+
+    返回:
+        dict: {"plateau_after": 会话数或 None, "reason": 说明}
+    """
+    for prev, cur in zip(curve, curve[1:]):
+        if cur["rps"] >= prev["rps"] * (1 + PLATEAU_GAIN):
+            continue
+        if mode == "to_thread" and cur["sessions"] > executor_workers:
+            reason = f"to_thread 线程池耗尽：只有 {executor_workers} 个线程，多出的会话排队等待"
+        elif cur["cpu_util"] >= 0.85 * cpus:
+            reason = (f"CPU 饱和：进程 CPU 利用率 {cur['cpu_util']}，共 {cpus} 个核"
+                      + ("（单核机器上无法区分 GIL 争用）" if cpus == 1 else ""))
+        elif cur["cpu_util"] >= 0.85:
+            reason = f"GIL 争用：进程 CPU 利用率 {cur['cpu_util']}，只用满约 1 个核（共 {cpus} 个）"
+        else:
+            reason = f"CPU 未饱和（利用率 {cur['cpu_util']}），瓶颈在服务端或网络等待"
+        return {"plateau_after": prev["sessions"], "reason": reason}
+    return {"plateau_after": None, "reason": "在测试范围内吞吐量持续增长"}
+
+
+class _ServerProcess:
+    """在独立进程中运行 local_httpbin（不统计连接数）"""
+
+    connections = None
+
+    def __enter__(self):
+        self._proc = subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, "local_httpbin.py")],
+                                      stdout=subprocess.PIPE, text=True)
+        self.url = self._proc.stdout.readline().strip()
+        return self
+
+    def __exit__(self, *exc):
+        self._proc.terminate()
+        self._proc.wait()
+        return False
+
+
+def parse_ints(text):
+    return [int(v) for v in text.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用例3 会话流程的并发负载与扩展曲线")
+    parser.add_argument("--sessions", default="1,2,4,8,16,32", help="逗号分隔的并行会话数")
+    parser.add_argument("--iterations", type=int, default=20, help="每个会话回放的轮数（每轮 3 个请求）")
+    parser.add_argument("--modes", default="threads,to_thread,aiohttp", help="驱动方式")
+    parser.add_argument("--executor-workers", type=int, help="to_thread 的线程池大小，默认用 asyncio 的默认值")
+    parser.add_argument("--server-process", action="store_true", help="服务端放到独立进程")
+    parser.add_argument("--plot", help="扩展曲线图的保存路径（PNG）")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON 报告路径")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    executor_workers = args.executor_workers or min(32, cpus + 4)
+    modes = [m for m in args.modes.split(",") if m]
+    if "aiohttp" in modes and not HAS_AIOHTTP:
+        print("未安装 aiohttp，跳过 aiohttp 模式")
+        modes.remove("aiohttp")
+    session_counts = parse_ints(args.sessions)
+
+    report = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "requests": requests.__version__,
+        "platform": platform.platform(),
+        "cpus": cpus,
+        "executor_workers": executor_workers,
+        "params": vars(args),
+        "curves": {},
+        "plateaus": {},
+    }
+    server_cm = _ServerProcess() if args.server_process else LocalHttpbin()
+    with server_cm as server:
+        for mode in modes:
+            print(f"== {mode}")
+            print(f"{'会话数':>6}{'请求/秒':>10}{'p50(ms)':>10}{'p99(ms)':>10}{'错误':>6}{'连接数':>8}{'CPU':>6}")
+            # 预热：导入、首个连接等一次性开销不计入第一个点
+            RUNNERS[mode](server.url, 1, 1, executor_workers)
+            curve = []
+            for sessions in session_counts:
+                result = measure(RUNNERS[mode], server, sessions, args.iterations, executor_workers)
+                curve.append(result)
+                print(f"{sessions:>6}{result['rps']:>10.1f}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+                      f"{result['errors']:>6}{str(result['connections']):>8}{result['cpu_util']:>6}")
+            report["curves"][mode] = curve
+            plateau = find_plateau(mode, curve, cpus, executor_workers)
+            report["plateaus"][mode] = plateau
+            if plateau["plateau_after"] is None:
+                print(f"拐点: {plateau['reason']}")
+            else:
+                print(f"拐点: {plateau['plateau_after']} 个会话之后，{plateau['reason']}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("报告已保存:", args.output)
+
+    if args.plot and report["curves"]:
+        from figure_render import multi_line_spec, render_figure
+
+        render_figure(multi_line_spec(session_counts,
+                                      {mode: [r["rps"] for r in curve] for mode, curve in report["curves"].items()},
+                                      "Session workload scaling", args.plot,
+                                      xlabel="Parallel sessions", ylabel="Requests / second"))
+        print("扩展曲线已保存:", args.plot)
+
+
+if __name__ == "__main__":
+    main()
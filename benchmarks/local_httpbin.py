@@ -0,0 +1,164 @@
+"""
+进程内的 httpbin 替身（只实现用例脚本用到的接口），供 HTTP 基准离线运行
+
+接口:
+    GET /get                          返回 {"args", "headers", "url"}
+    GET /cookies                      返回 {"cookies": 请求携带的 Cookie}
+    GET /cookies/set/<name>/<value>   设置 Cookie 后 302 跳转到 /cookies（与 httpbin 相同）
+    GET /cookies/set?name=value       同上，可一次设置多个
+    GET /basic-auth/<user>/<passwd>   Basic 认证，通过返回 {"authenticated": true, "user"}，否则 401
+
+用法:
+    python benchmarks/local_httpbin.py [--port 0]     单独进程运行，首行输出地址
+    with LocalHttpbin() as server:
+        requests.get(server.url + "/get")
+        server.connections        # 服务端累计接受的 TCP 连接数（用来观察连接复用）
+
+功能:
+    基于 ThreadingHTTPServer，HTTP/1.1 keep-alive，每个连接一个线程。
+    服务端与客户端在同一进程内，会和客户端线程竞争 GIL，
+    测得的是相对差异（复用连接与否、连接池大小、并发度），不是绝对吞吐上限。
+"""
+
+import argparse
+import base64
+import json
+import threading
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 头和正文分两次写出，不关 Nagle 时 keep-alive 连接上每个响应会卡在延迟 ACK 上（约 40ms）
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        segments = [unquote(s) for s in parts.path.split("/") if s]
+        if segments == ["get"]:
+            self._send_json({"args": dict(parse_qsl(parts.query)), "headers": dict(self.headers),
+                             "url": f"http://{self.headers.get('Host', '')}{self.path}"})
+        elif segments == ["cookies"]:
+            self._send_json({"cookies": self._cookies()})
+        elif segments[:2] == ["cookies", "set"]:
+            if len(segments) == 4:
+                pairs = [(segments[2], segments[3])]
+            else:
+                pairs = parse_qsl(parts.query)
+            self._redirect("/cookies", [f"{name}={value}; Path=/" for name, value in pairs])
+        elif len(segments) == 3 and segments[0] == "basic-auth":
+            if self._authorized(segments[1], segments[2]):
+                self._send_json({"authenticated": True, "user": segments[1]})
+            else:
+                self._send_json({"authenticated": False}, status=401,
+                                headers=[("WWW-Authenticate", 'Basic realm="Fake Realm"')])
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _cookies(self):
+        cookie = SimpleCookie()
+        cookie.load(self.headers.get("Cookie", ""))
+        return {name: morsel.value for name, morsel in cookie.items()}
+
+    def _authorized(self, user, passwd):
+        expected = base64.b64encode(f"{user}:{passwd}".encode("utf-8")).decode("ascii")
+        return self.headers.get("Authorization", "") == f"Basic {expected}"
+
+    def _send_json(self, payload, status=200, headers=()):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _redirect(self, location, cookies):
+        self.send_response(302)
+        self.send_header("Location", location)
+        for cookie in cookies:
+            self.send_header("Set-Cookie", cookie)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class _CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 默认 backlog 只有 5，高并发下新连接会被内核拒绝
+    request_queue_size = 128
+
+    def __init__(self, address):
+        super().__init__(address, _Handler)
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+
+class LocalHttpbin:
+    """在后台线程中运行的本地 httpbin 替身，可用作上下文管理器"""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        """
+        参数:
+            host (str): 监听地址
+            port (int): 端口，0 表示自动分配
+        """
+        self._server = _CountingServer((host, port))
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def connections(self):
+        """累计接受的 TCP 连接数"""
+        return self._server.connections
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 httpbin 替身")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    args = parser.parse_args()
+    server = _CountingServer((args.host, args.port))
+    host, port = server.server_address[:2]
+    print(f"http://{host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+解析结果的磁盘缓存（列式二进制）
+
+功能:
+    把解析、类型转换、分类之后的提交表按列写到 CSV 旁边的 .commit_cache/ 目录：
+    - 数值列：原生字节序的定长二进制（array 模块，读回即可 np.frombuffer 零拷贝）
+    - 字符串列：UTF-8 文本，以 NUL 分隔（git 提交说明不会包含 NUL）
+    - meta.json：源文件大小、mtime、sha256，以及调用方给出的 schema 标识
+    源文件大小和 mtime 都没变时直接命中，不读源文件；mtime 变了再比对 sha256，
+    内容没变（例如重新导出了相同的数据）同样命中。
+    只依赖标准库，流式统计脚本不需要为缓存引入 numpy / pandas。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from array import array
+from pathlib import Path
+
+CACHE_DIR_NAME = ".commit_cache"
+FORMAT_VERSION = 1
+STRING_SEP = "\x00"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """
+    分块计算文件的 sha256
+
+    参数:
+        path (str | Path): 文件路径
+        chunk_size (int): 每次读取的字节数
+
+    返回:
+        str: 十六进制摘要
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_dir_for(source_path, namespace):
+    """
+    返回某个源文件、某种解析方式对应的缓存目录
+
+    参数:
+        source_path (str | Path): 源 CSV 路径
+        namespace (str): 解析方式名称（不同脚本的解析结果分开存放）
+
+    返回:
+        Path: 缓存目录
+    """
+    source_path = Path(source_path).resolve()
+    return source_path.parent / CACHE_DIR_NAME / f"{source_path.name}.{namespace}"
+
+
+class ColumnCacheWriter:
+    """
+    流式写入缓存：按块追加列数据，全部写完后 commit() 原子地替换旧缓存
+
+    用法:
+        writer = ColumnCacheWriter(csv_path, "stream", schema)
+        writer.append("author_codes", "i", codes_chunk)
+        writer.append_strings("authors", names)
+        writer.commit(rows)
+    """
+
+    def __init__(self, source_path, namespace, schema):
+        """
+        参数:
+            source_path (str | Path): 源 CSV 路径
+            namespace (str): 解析方式名称
+            schema (str): 列结构 / 分类规则标识，变化后旧缓存自动失效
+        """
+        self.source_path = Path(source_path)
+        self.schema = schema
+        self.target_dir = cache_dir_for(source_path, namespace)
+        self.tmp_dir = self.target_dir.with_name(self.target_dir.name + f".tmp{os.getpid()}")
+        if self.tmp_dir.exists():
+            shutil.rmtree(self.tmp_dir)
+        self.tmp_dir.mkdir(parents=True)
+        # 写入前先记录源文件状态，避免写缓存期间源文件被改动却仍被当作有效
+        stat = self.source_path.stat()
+        self._source = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": file_sha256(self.source_path),
+        }
+        self._columns = {}
+
+    def append(self, name, typecode, values):
+        """
+        追加数值列数据
+
+        参数:
+            name (str): 列名
+            typecode (str): array 模块的类型码，如 'b' / 'i' / 'q'
+            values (iterable | array | numpy.ndarray): 本块数据（numpy 数组的 dtype 需与 typecode 一致）
+        """
+        if not isinstance(values, array):
+            if hasattr(values, "tobytes"):
+                buffer = array(typecode)
+                buffer.frombytes(values.tobytes())
+                values = buffer
+            else:
+                values = array(typecode, values)
+        with open(self.tmp_dir / f"{name}.bin", "ab") as f:
+            values.tofile(f)
+        self._columns[name] = {"kind": "array", "typecode": typecode}
+
+    def append_strings(self, name, values):
+        """
+        追加字符串列数据
+
+        参数:
+            name (str): 列名
+            values (iterable): 本块字符串
+        """
+        values = list(values)
+        with open(self.tmp_dir / f"{name}.txt", "a", encoding="utf-8", newline="") as f:
+            if values:
+                f.write(STRING_SEP.join(values))
+                f.write(STRING_SEP)
+        self._columns[name] = {"kind": "strings"}
+
+    def commit(self, rows):
+        """
+        写入 meta.json 并替换旧缓存
+
+        参数:
+            rows (int): 行数
+        """
+        meta = {
+            "version": FORMAT_VERSION,
+            "schema": self.schema,
+            "rows": rows,
+            "source": self._source,
+            "columns": self._columns,
+        }
+        (self.tmp_dir / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+        if self.target_dir.exists():
+            shutil.rmtree(self.target_dir)
+        os.replace(self.tmp_dir, self.target_dir)
+
+    def abort(self):
+        """放弃本次写入"""
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+def _read_meta(cache_dir, source_path, schema):
+    """读取 meta.json 并校验是否仍对应当前源文件，失效时返回 None"""
+    meta_path = cache_dir / "meta.json"
+    if not meta_path.exists():
+        return None
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    except ValueError:
+        return None
+    if meta.get("version") != FORMAT_VERSION or meta.get("schema") != schema:
+        return None
+
+    stat = Path(source_path).stat()
+    source = meta["source"]
+    if stat.st_size != source["size"]:
+        return None
+    if stat.st_mtime_ns != source["mtime_ns"]:
+        # mtime 变了但内容可能没变（重新导出），比对哈希后刷新 mtime
+        if file_sha256(source_path) != source["sha256"]:
+            return None
+        source["mtime_ns"] = stat.st_mtime_ns
+        meta_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    return meta
+
+
+def load_columns(source_path, namespace, schema):
+    """
+    读取缓存的列数据
+
+    参数:
+        source_path (str | Path): 源 CSV 路径
+        namespace (str): 解析方式名称
+        schema (str): 列结构 / 分类规则标识
+
+    返回:
+        dict | None: {列名: array 或 字符串列表}，另含 "rows" 行数；缓存缺失或失效时返回 None
+    """
+    cache_dir = cache_dir_for(source_path, namespace)
+    meta = _read_meta(cache_dir, source_path, schema)
+    if meta is None:
+        return None
+
+    columns = {"rows": meta["rows"]}
+    for name, info in meta["columns"].items():
+        if info["kind"] == "array":
+            values = array(info["typecode"])
+            values.frombytes((cache_dir / f"{name}.bin").read_bytes())
+        else:
+            with open(cache_dir / f"{name}.txt", "r", encoding="utf-8", newline="") as f:
+                values = f.read().split(STRING_SEP)[:-1]
+        columns[name] = values
+    return columns
@@ -0,0 +1,142 @@
+"""
+提交类型分类规则引擎（analyze_commits.py 与 lemenpop-work 脚本共用）
+
+功能:
+    有序规则表只在这里定义一次，编译后提供两种用法：
+    - classify(message): 单条分类，供流式统计逐条调用
+    - classify_series(messages): 整列分类，供 pandas 分析脚本使用
+    两种用法由同一张规则表生成，保证标签完全一致。
+"""
+
+import hashlib
+import re
+from importlib.util import find_spec
+
+# pyarrow 为可选依赖：安装后 pandas 的 str 方法在 C++ (RE2) 中整列执行
+HAS_PYARROW = find_spec("pyarrow") is not None
+
+# 有序规则表：(类型, 前缀关键词, 包含关键词)
+# 从上到下依次匹配，先命中的规则优先；都不命中归为 Other
+COMMIT_TYPE_RULES = [
+    ("Merge PR", ["merge pull request"], []),
+    ("Dependency", [], ["bump", "dependabot"]),
+    ("Release", ["v"], ["release"]),
+    ("Bug Fix", [], ["fix", "bug", "error"]),
+    ("Feature", [], ["add", "feature", "support", "implement"]),
+    ("Refactor", [], ["refactor", "cleanup", "restructure"]),
+    ("Docs", [], ["doc", "docs", "readme"]),
+    ("Test", [], ["test", "ci", "workflow"]),
+    ("Maintenance", [], [
+        "update", "improve", "change", "adjust", "remove",
+        "minor", "tweak", "simplify", "optimize", "handle", "use"
+    ]),
+]
+
+OTHER = "Other"
+
+# 提交类型（顺序即图表中的展示顺序）
+COMMIT_TYPES = [label for label, _, _ in COMMIT_TYPE_RULES] + [OTHER]
+
+# 规则表指纹：规则一改，依赖分类结果的磁盘缓存随之失效
+RULES_DIGEST = hashlib.sha256(repr(COMMIT_TYPE_RULES).encode("utf-8")).hexdigest()[:16]
+
+
+class CommitClassifier:
+    """把有序规则表编译一次，之后按单条或整列分类"""
+
+    def __init__(self, rules=COMMIT_TYPE_RULES):
+        """
+        参数:
+            rules (list): 有序规则表，格式同 COMMIT_TYPE_RULES
+        """
+        self.labels = [label for label, _, _ in rules] + [OTHER]
+        # 单条分类：前缀用 str.startswith(tuple)，关键词用 in（CPython 中最快的子串查找）
+        self._scalar_rules = [
+            (label, tuple(prefixes), tuple(keywords))
+            for label, prefixes, keywords in rules
+        ]
+        # 整列分类：每条规则编译为一个交替正则，一次 str.contains 判断整列
+        self._patterns = [
+            re.compile("|".join(
+                ["^" + re.escape(p) for p in prefixes] +
+                [re.escape(k) for k in keywords]
+            ))
+            for _, prefixes, keywords in rules
+        ]
+
+    def classify(self, message):
+        """
+        单条提交分类
+
+        参数:
+            message (str): 提交说明，非字符串（如 NaN）归为 Other
+
+        返回:
+            str: 提交类型
+        """
+        if not isinstance(message, str):
+            return OTHER
+        msg = message.lower()
+        for label, prefixes, keywords in self._scalar_rules:
+            if prefixes and msg.startswith(prefixes):
+                return label
+            for keyword in keywords:
+                if keyword in msg:
+                    return label
+        return OTHER
+
+    def classify_series(self, messages):
+        """
+        整列提交分类
+
+        参数:
+            messages (pandas.Series): 提交说明列
+
+        返回:
+            pandas.Series: 与 messages 同索引的 Categorical 列，类别顺序同 self.labels
+
+        功能:
+            按优先级逐条规则判断整列，已命中的行不再参与后续规则。
+            （单个交替正则只会返回最靠左的命中，无法表达规则优先级）
+            安装 pyarrow 时在 Arrow 字符串列上匹配；未安装时用 pandas 自带的 string 列，
+            同样是每条规则一次 str.contains
+        """
+        import pandas as pd
+
+        codes = self._rule_codes(messages)
+        return pd.Series(
+            pd.Categorical.from_codes(codes, categories=self.labels),
+            index=messages.index, name="commit_type"
+        )
+
+    def _rule_codes(self, messages):
+        """逐条规则整列匹配，返回每行的类型编码（np.int8）"""
+        import numpy as np
+
+        lowered = messages.astype("string[pyarrow]" if HAS_PYARROW else "string").fillna("").str.lower()
+        codes = np.full(len(lowered), len(self.labels) - 1, dtype=np.int8)
+        remaining = np.arange(len(lowered))
+        for code, pattern in enumerate(self._patterns):
+            if not len(remaining):
+                break
+            hit = lowered.iloc[remaining].str.contains(pattern).to_numpy(dtype=bool)
+            codes[remaining[hit]] = code
+            remaining = remaining[~hit]
+        return codes
+
+
+# 默认分类器（模块级单例，规则只编译一次）
+default_classifier = CommitClassifier()
+
+
+def classify_message(message):
+    """
+    根据提交信息的关键词返回提交类型
+
+    参数:
+        message (str): 提交说明
+
+    返回:
+        str: COMMIT_TYPES 中的一个类型
+    """
+    return default_classifier.classify(message)
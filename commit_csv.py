@@ -0,0 +1,366 @@
+"""
+提交记录 CSV 的统一读取器（流式统计与 pandas 分析共用）
+
+功能:
+    requests_commits.csv 由 git log 直接导出：前三列（commit_id, author, date）不含逗号，
+    第三个逗号之后的整段都是提交说明，说明里的逗号和引号原样保留（如 Revert "Fix, ..."）。
+    pandas 用标准 CSV 规则读取时这些行字段数不对，被 on_bad_lines='skip' 静默丢弃。
+    这里按固定的 4 列结构解析：
+    - 前三列若以引号开头按标准 CSV 引号规则解析（兼容 pandas to_csv 导出的文件）
+    - 说明列若整段被引号包住（内部引号成对转义）则去掉引号，跨行的引号字段拼接后续行
+    - 其余情况说明列原样保留
+    - 首行若不是合法记录（日期列不以数字开头）视为表头跳过，不计入拒绝行
+    不足 4 列、commit_id 为空或日期无法解析的行计为拒绝行，由调用方报告数量。
+
+    iter_commit_records(): 标准库逐行解析，流式统计使用
+    read_commit_table(): 整表读取，安装 pyarrow 时按行读入 Arrow 后整列切分、整列解析日期，
+                         只有含引号的少数行回到逐行解析；未安装 pyarrow 时退回逐行解析
+"""
+
+import re
+from collections import namedtuple
+from datetime import datetime, timezone
+from importlib.util import find_spec
+
+HAS_PYARROW = find_spec("pyarrow") is not None
+
+COLUMNS = ["commit_id", "author", "date", "message"]
+
+# git log --format="%h,%an,%ai,%s" 的日期格式
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S %z"
+
+# 跨行的引号字段最多拼接的行数，超过后按原样处理（防止一个未闭合的引号吞掉整个文件）
+MAX_CONTINUATION_LINES = 1000
+
+# 整段被引号包住、内部引号成对转义的字段
+_QUOTED_FIELD = re.compile(r'"(?:[^"]|"")*"\Z', re.S)
+# 看起来像一条新记录的行：三个逗号分隔的前缀，第三列是日期
+_RECORD_START = re.compile(r'[^,]*,[^,]*,\s*\d{4}-\d{2}-\d{2}')
+
+# 读取结果：df 为 4 列的 DataFrame（date 已是 UTC 去时区的 datetime64），rejected 为拒绝行数
+ReadResult = namedtuple("ReadResult", ["df", "rejected"])
+
+
+def _read_field(line, pos):
+    """从 pos 开始读一个逗号分隔字段（支持引号），返回 (值, 下一个字段的起点)，缺少逗号时起点为 -1"""
+    if line.startswith('"', pos):
+        value = []
+        i = pos + 1
+        while True:
+            close = line.find('"', i)
+            if close < 0:
+                return None, -1
+            value.append(line[i:close])
+            if line.startswith('"', close + 1):
+                value.append('"')
+                i = close + 2
+                continue
+            comma = line.find(",", close + 1)
+            return "".join(value), (comma + 1 if comma >= 0 else -1)
+    comma = line.find(",", pos)
+    if comma < 0:
+        return None, -1
+    return line[pos:comma], comma + 1
+
+
+def _unquote_message(message):
+    """说明列整段被引号包住时去掉引号，否则原样返回"""
+    if message.startswith('"') and _QUOTED_FIELD.match(message):
+        return message[1:-1].replace('""', '"')
+    return message
+
+
+def _is_open_quote(message):
+    """说明列以引号开头但在本行没有闭合（跨行的引号字段）"""
+    if not message.startswith('"'):
+        return False
+    i = 1
+    while True:
+        close = message.find('"', i)
+        if close < 0:
+            return True
+        if message.startswith('"', close + 1):
+            i = close + 2
+            continue
+        return False
+
+
+def split_record(line):
+    """
+    把一行切分为 4 个字段
+
+    参数:
+        line (str): 去掉换行符的一行
+
+    返回:
+        tuple | None: (commit_id, author, date, message)，格式不对时返回 None
+    """
+    if '"' not in line:
+        parts = line.split(",", 3)
+        if len(parts) < 4:
+            return None
+        return parts[0].strip(), parts[1].strip(), parts[2].strip(), parts[3].strip()
+
+    fields = []
+    pos = 0
+    for _ in range(3):
+        value, pos = _read_field(line, pos)
+        if pos < 0:
+            return None
+        fields.append(value.strip())
+    fields.append(_unquote_message(line[pos:].strip()))
+    return tuple(fields)
+
+
+def _is_header(record):
+    return record is not None and not record[2][:1].isdigit()
+
+
+def iter_commit_records(lines, skip_header=None, stats=None, check_dates=True):
+    """
+    流式解析提交记录
+
+    参数:
+        lines (iterable): 文本行（如打开的文件对象）
+        skip_header (bool | None): True 跳过首行，False 不跳过，None 自动判断首行是否为表头
+        stats (dict | None): 传入时累加 stats["rejected"]（拒绝行数）
+        check_dates (bool): 日期无法解析（commit_timestamp 返回 None）的行计为拒绝行；
+                            整表读取由 parse_commit_dates 统一校验日期，传 False
+
+    返回:
+        generator: 逐条产出 (commit_id, author, date, message)
+    """
+    rejected = 0
+    lines = iter(lines)
+    # 拼接跨行说明时多读出、需要重新解析的行（倒序存放，末尾先取）
+    pending = []
+
+    def next_line():
+        return pending.pop() if pending else next(lines, None)
+
+    first = True
+    while True:
+        line = next_line()
+        if line is None:
+            break
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            # 空行和只含空白的行直接跳过，不计入拒绝行（与 pyarrow 读取一致）
+            continue
+
+        if first:
+            first = False
+            if skip_header or (skip_header is None and _is_header(split_record(line))):
+                continue
+
+        record = split_record(line)
+        if record is not None and _is_open_quote(record[3]):
+            record, unused = _join_continuation(record, next_line)
+            pending.extend(reversed(unused))
+        if record is None or not record[0] or (check_dates and commit_timestamp(record[2]) is None):
+            rejected += 1
+            continue
+        yield record
+
+    if stats is not None:
+        stats["rejected"] = stats.get("rejected", 0) + rejected
+
+
+def _join_continuation(record, next_line):
+    """
+    拼接跨行的引号说明
+
+    参数:
+        record (tuple): 说明列以未闭合引号开头的记录
+        next_line (callable): 读取下一行，没有更多行时返回 None
+
+    返回:
+        tuple: (拼接后的记录, 多读出但不属于本条记录、需要按原顺序重新解析的行列表)
+    """
+    parts = [record[3]]
+    consumed = []
+    for _ in range(MAX_CONTINUATION_LINES):
+        line = next_line()
+        if line is None:
+            break
+        line = line.rstrip("\r\n")
+        consumed.append(line)
+        if _RECORD_START.match(line):
+            # 遇到新记录：之前的引号不是 CSV 引号，说明按原样保留
+            return record, consumed
+        parts.append(line)
+        message = "\n".join(parts)
+        if not _is_open_quote(message):
+            return record[:3] + (_unquote_message(message),), []
+    # 到文件末尾或超过行数上限引号仍未闭合：同样按原样保留说明，读出的行退回逐行解析（格式不对的计为拒绝行）
+    return record, consumed
+
+
+_UTC_OFFSET = re.compile(r" ([+-])(\d{2})(\d{2})\Z")
+
+
+def _offset_minutes(text):
+    """' +0900' -> 540；格式不对返回 NaN"""
+    match = _UTC_OFFSET.match(text)
+    if not match:
+        return float("nan")
+    minutes = int(match.group(2)) * 60 + int(match.group(3))
+    return -minutes if match.group(1) == "-" else minutes
+
+
+def commit_timestamp(time_str):
+    """
+    git log %ai 格式的时间转换为 UTC 秒数
+
+    参数:
+        time_str (str): 如 "2025-10-15 20:45:42 +0900"
+
+    返回:
+        int | None: UTC 秒数，格式不对时返回 None
+    """
+    try:
+        local = datetime.fromisoformat(time_str[:19]).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+    minutes = _offset_minutes(time_str[19:])
+    if minutes != minutes:   # NaN：时区偏移格式不对
+        return None
+    return int(local.timestamp()) - minutes * 60
+
+
+def parse_commit_dates(values):
+    """
+    解析日期列
+
+    参数:
+        values (iterable): 日期字符串（git log %ai 格式，如 2025-10-15 20:45:42 +0900）
+
+    返回:
+        pandas.Series: UTC 去时区的 datetime64[ns]，无法解析的为 NaT
+
+    功能:
+        DATE_FORMAT 的时区偏移各行不同，直接交给 to_datetime(format=...) 会逐行处理时区；
+    这里把定长的本地时间整列解析，时区偏移只有几十种取值，去重后逐个换算再按编码取回。
+    不符合该格式的行按通用格式重试。
+    """
+    import numpy as np
+    import pandas as pd
+
+    values = pd.Series(values, dtype="str")
+    local = pd.to_datetime(values.str.slice(0, 19), format="%Y-%m-%d %H:%M:%S", errors="coerce")
+    codes, offsets = pd.factorize(values.str.slice(19))
+    # 编码 -1（缺失值）取到末尾的 NaN
+    offset_minutes = np.array([_offset_minutes(o) for o in offsets] + [np.nan])[codes]
+    dates = local - pd.to_timedelta(offset_minutes, unit="m")
+
+    retry = dates.isna() & values.notna()
+    if retry.any():
+        dates[retry] = pd.to_datetime(values[retry], errors="coerce", utc=True,
+                                      format="mixed").dt.tz_localize(None)
+    return dates.astype("datetime64[ns]")
+
+def _finish(records_df, rejected, parse_dates=True):
+    """统一解析日期并剔除日期无效的行（parse_dates=False 时保留原始日期字符串）"""
+    if not parse_dates:
+        return ReadResult(records_df, rejected)
+    records_df["date"] = parse_commit_dates(records_df["date"]).to_numpy()
+    bad = records_df["date"].isna()
+    if bad.any():
+        records_df = records_df[~bad].reset_index(drop=True)
+    return ReadResult(records_df, rejected + int(bad.sum()))
+
+
+def _read_with_python(path, skip_header, parse_dates=True):
+    import pandas as pd
+
+    stats = {}
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        records = list(iter_commit_records(f, skip_header, stats, check_dates=False))
+    df = pd.DataFrame.from_records(records, columns=COLUMNS)
+    return _finish(df, stats.get("rejected", 0), parse_dates)
+
+
+def _read_with_pyarrow(path, skip_header, parse_dates=True):
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv
+
+    # 每行作为一个字符串读入（分隔符取一个提交记录中不会出现的控制字符，不处理引号）
+    bad_lines = []
+
+    def on_invalid(row):
+        bad_lines.append(row.number)
+        return "skip"
+
+    table = csv.read_csv(
+        path,
+        read_options=csv.ReadOptions(column_names=["line"], block_size=1 << 24),
+        parse_options=csv.ParseOptions(delimiter="\x1e", quote_char=False,
+                                       newlines_in_values=False,
+                                       invalid_row_handler=on_invalid),
+        convert_options=csv.ConvertOptions(column_types={"line": pa.string()},
+                                           strings_can_be_null=False),
+    )
+    lines = table.column("line").combine_chunks()
+    if len(lines) and lines[0].as_py().startswith("\ufeff"):
+        lines = pa.concat_arrays([pa.array([lines[0].as_py()[1:]]), lines[1:]])
+    # 只含空白的行与逐行解析一样跳过，不计入拒绝行（空行 read_csv 已跳过）
+    lines = lines.filter(pc.invert(pc.utf8_is_space(lines)))
+    if len(lines) and (skip_header or (skip_header is None and _is_header(split_record(lines[0].as_py())))):
+        lines = lines[1:]
+
+    quoted = pc.match_substring(lines, '"').to_numpy(zero_copy_only=False)
+    quoted_rows = np.flatnonzero(quoted)
+    quoted_records = [split_record(lines[int(i)].as_py()) for i in quoted_rows]
+    if any(r is not None and _is_open_quote(r[3]) for r in quoted_records):
+        # 存在跨行的引号字段：按行切分的前提不成立，整体走逐行解析
+        return _read_with_python(path, skip_header, parse_dates)
+
+    # 不含引号的行：整列按前三个逗号切分
+    plain = lines.filter(pa.array(~quoted))
+    parts = pc.split_pattern(plain, ",", max_splits=3)
+    complete = pc.equal(pc.list_value_length(parts), 4)
+    parts = parts.filter(complete)
+    columns = {name: pc.utf8_trim_whitespace(pc.list_element(parts, i)).to_pandas()
+               for i, name in enumerate(COLUMNS)}
+    df = pd.DataFrame(columns)
+    df.index = np.flatnonzero(~quoted)[complete.to_numpy(zero_copy_only=False)]
+    rejected = len(bad_lines) + len(plain) - len(df)
+
+    kept = [(i, r) for i, r in zip(quoted_rows, quoted_records) if r is not None]
+    rejected += len(quoted_records) - len(kept)
+    if kept:
+        quoted_df = pd.DataFrame.from_records([r for _, r in kept], columns=COLUMNS,
+                                              index=[int(i) for i, _ in kept])
+        df = pd.concat([df, quoted_df]).sort_index()
+
+    empty_id = df["commit_id"] == ""
+    rejected += int(empty_id.sum())
+    df = df[~empty_id].reset_index(drop=True)
+    for name in COLUMNS:
+        df[name] = df[name].astype(str)
+    return _finish(df, rejected, parse_dates)
+
+
+def read_commit_table(path, skip_header=None, engine=None, parse_dates=True):
+    """
+    读取提交记录 CSV 为 DataFrame
+
+    参数:
+        path (str | Path): CSV 路径
+        skip_header (bool | None): 同 iter_commit_records
+        engine (str | None): "pyarrow" / "python"；None 表示安装了 pyarrow 就用 pyarrow
+        parse_dates (bool): False 时 date 列保留原始字符串，日期无效的行也不计入拒绝行
+                            （之后可自行调用 parse_commit_dates，基准测试据此分开计时）
+
+    返回:
+        ReadResult: (df, rejected)；df 列为 commit_id, author, date, message，
+                    date 为 UTC 去时区的 datetime64[ns]
+    """
+    if engine is None:
+        engine = "pyarrow" if HAS_PYARROW else "python"
+    if engine == "pyarrow":
+        return _read_with_pyarrow(path, skip_header, parse_dates)
+    return _read_with_python(path, skip_header, parse_dates)
@@ -0,0 +1,519 @@
+"""
+提交说明全文检索：倒排索引（词 -> 提交编号的有序列表，差分压缩）
+
+用法:
+    python commit_search.py urllib3 proxy --any --since 2020 [--author "Nate Prewitt"] [--limit 20] [--csv requests_commits.csv]
+
+    from commit_search import CommitSearchIndex
+    index = CommitSearchIndex.open("requests_commits.csv")     # CSV 未变时直接读取 .commit_cache/ 中的索引
+    hits = index.search(any_terms=["urllib3", "proxy"], since="2020")
+    index.count(terms=["fix", "timeout"], author="Ian Cordasco", since="2015", until="2017")
+
+功能:
+    回答"2020 年以来哪些提交提到了 urllib3 或 proxy"不再需要重读 CSV、逐条做子串匹配。
+    - 提交按时间（UTC）升序编号，日期范围因此是一个连续的编号区间，二分查找即可得到
+    - 提交说明按 tokenize() 切词，每个词对应一个升序的编号列表（倒排表）；
+      作者同样有一份倒排表，按作者过滤时自动包含 author_identity 合并的别名写法
+    - 倒排表存相邻编号的差值，按最大差值选 1 / 2 / 4 字节宽度；
+      读取时 array 直接从字节构造、itertools.accumulate 还原，都在 C 中完成，解码过的列表留在内存里复用
+    - 词表有序存放，"proxy*" 这样的前缀查询用二分查找展开
+    - 组合查询从最短的列表出发，逐个与其他列表求交集（长度相差悬殊时对长列表二分查找）
+    索引与解析缓存一样写在 CSV 旁边的 .commit_cache/ 中，随 CSV 内容和切词规则失效。只依赖标准库。
+"""
+
+import argparse
+import re
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict, namedtuple
+from datetime import datetime, timezone
+from itertools import accumulate, chain
+from operator import sub
+
+from commit_cache import ColumnCacheWriter, load_columns
+from commit_csv import commit_timestamp
+
+SEARCH_CACHE_NAMESPACE = "search"
+# 切词规则或存储格式变化时修改，旧索引自动失效
+SEARCH_SCHEMA = "search-v1"
+# 说明列只保存首行的前若干字符，用于展示检索结果
+SUBJECT_CHARS = 120
+# 差值宽度（字节）-> array 类型码
+_WIDTH_TYPECODES = {1: "B", 2: "H", 4: "I"}
+# 解码后留在内存中的倒排表个数上限
+DECODED_CACHE_SIZE = 4096
+
+_TOKEN = re.compile(r"\w+")
+
+# 检索结果：time 为 UTC 时间字符串
+SearchHit = namedtuple("SearchHit", ["commit_id", "author", "time", "subject"])
+
+
+def tokenize(text):
+    """
+    切词：统一大小写后取连续的字母 / 数字 / 下划线，丢弃单个字符
+
+    参数:
+        text (str): 提交说明或查询词
+
+    返回:
+        list: 词列表（保持出现顺序，可能重复）
+    """
+    return [t for t in _TOKEN.findall(text.casefold()) if len(t) > 1]
+
+
+def parse_bound(value):
+    """
+    查询的时间边界转换为 UTC 秒数
+
+    参数:
+        value (str | int | datetime | None): "2020"、"2020-06"、"2020-06-01" 或 ISO 时间、UTC 秒数、datetime
+
+    返回:
+        int | None
+    """
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    text = str(value).strip()
+    if re.fullmatch(r"\d{4}", text):
+        text += "-01-01"
+    elif re.fullmatch(r"\d{4}-\d{2}", text):
+        text += "-01"
+    return parse_bound(datetime.fromisoformat(text))
+
+
+def encode_postings(ids):
+    """
+    升序编号列表差分编码
+
+    参数:
+        ids (list): 升序、不重复的编号
+
+    返回:
+        tuple: (字节宽度 1 / 2 / 4, 差值字节串)
+    """
+    deltas = list(map(sub, ids, chain((0,), ids)))
+    largest = max(deltas, default=0)
+    width = 1 if largest < 1 << 8 else 2 if largest < 1 << 16 else 4
+    return width, array(_WIDTH_TYPECODES[width], deltas).tobytes()
+
+
+def decode_postings(width, data):
+    """encode_postings() 的逆过程，返回升序编号列表"""
+    deltas = array(_WIDTH_TYPECODES[width])
+    deltas.frombytes(data)
+    return list(accumulate(deltas))
+
+
+def _intersect(a, b):
+    """两个升序列表的交集（a 较短）：长度相差悬殊时在 b 中二分查找，否则用集合"""
+    if len(b) > 4 * len(a):
+        result, lo = [], 0
+        for x in a:
+            lo = bisect_left(b, x, lo)
+            if lo == len(b):
+                break
+            if b[lo] == x:
+                result.append(x)
+        return result
+    members = set(b)
+    return [x for x in a if x in members]
+
+
+def _clip(ids, lo, hi):
+    """升序列表中落在 [lo, hi) 内的部分"""
+    if lo == 0 and (hi is None or not ids or ids[-1] < hi):
+        return ids
+    start = bisect_left(ids, lo)
+    return ids[start:len(ids) if hi is None else bisect_left(ids, hi, start)]
+
+
+def _intersect_all(lists):
+    """多个升序列表的交集，从最短的开始"""
+    lists = sorted(lists, key=len)
+    result = lists[0] if lists else []
+    for other in lists[1:]:
+        if not result:
+            break
+        result = _intersect(result, other)
+    return result
+
+
+def _union(lists):
+    """多个升序列表的并集"""
+    lists = [ids for ids in lists if ids]
+    if len(lists) <= 1:
+        return lists[0] if lists else []
+    return sorted(set().union(*lists))
+
+
+class _PostingTable:
+    """一组倒排表：有序的键、每个键的 (偏移, 宽度)，以及所有差值拼成的一段字节"""
+
+    def __init__(self, keys, offsets, widths, blob):
+        self.keys = keys
+        self.offsets = offsets
+        self.widths = widths
+        self.blob = memoryview(blob)
+        self.position = {key: i for i, key in enumerate(keys)}
+        self._decoded = {}
+
+    @classmethod
+    def build(cls, postings):
+        """
+        由 {键: 升序编号列表} 构造
+
+        参数:
+            postings (dict): 键 -> 编号列表
+        """
+        keys = sorted(postings)
+        offsets, widths, blob = array("q", [0]), array("b"), bytearray()
+        for key in keys:
+            width, data = encode_postings(postings[key])
+            blob += data
+            widths.append(width)
+            offsets.append(len(blob))
+        return cls(keys, offsets, widths, blob)
+
+    def ids(self, key):
+        """某个键的编号列表（不存在时为空列表）"""
+        i = self.position.get(key)
+        if i is None:
+            return []
+        ids = self._decoded.get(i)
+        if ids is None:
+            if len(self._decoded) >= DECODED_CACHE_SIZE:
+                self._decoded.clear()
+            ids = self._decoded[i] = decode_postings(
+                self.widths[i], self.blob[self.offsets[i]:self.offsets[i + 1]])
+        return ids
+
+    def prefixed(self, prefix):
+        """以 prefix 开头的全部键"""
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + "\U0010ffff", lo)
+        return self.keys[lo:hi]
+
+
+class CommitSearchIndex:
+    """提交说明的倒排索引（另含按时间排序的 commit_id / 作者 / 时间 / 说明首行）"""
+
+    def __init__(self, commit_ids, times, author_codes, authors, subjects, terms, author_postings,
+                 source_path=None):
+        """
+        一般通过 build() / open() 构造
+
+        参数:
+            commit_ids (list): 按时间升序的 commit_id
+            times (array): 对应的 UTC 秒数（升序）
+            author_codes (array): 对应的作者编码
+            authors (list): 作者编码 -> 作者名
+            subjects (list): 说明首行
+            terms (_PostingTable): 词 -> 提交编号
+            author_postings (_PostingTable): 作者名 -> 提交编号
+            source_path (str | Path | None): CSV 路径（作者别名映射缓存用）
+        """
+        self.commit_ids = commit_ids
+        self.times = times
+        self.author_codes = author_codes
+        self.authors = authors
+        self.subjects = subjects
+        self.terms = terms
+        self.author_postings = author_postings
+        self.source_path = source_path
+        self._author_code = {name: code for code, name in enumerate(authors)}
+        self._aliases = None
+
+    # ------------------------------------------------------------ 构建
+    @classmethod
+    def build(cls, commits, source_path=None):
+        """
+        由提交记录构建索引（时间无法解析的提交不进入索引）
+
+        参数:
+            commits (iterable): Commit(commit_id, author, time, message)，如 commit_stream.iter_commits()
+            source_path (str | Path | None): CSV 路径
+
+        返回:
+            CommitSearchIndex
+        """
+        rows = []
+        for c in commits:
+            ts = commit_timestamp(c.time)
+            if ts is not None:
+                rows.append((ts, c.commit_id, c.author, c.message))
+        # 稳定排序：同一秒的提交保持原有顺序
+        rows.sort(key=lambda row: row[0])
+
+        author_index = {}
+        term_postings = defaultdict(list)
+        author_postings = defaultdict(list)
+        commit_ids, subjects = [], []
+        times, author_codes = array("q"), array("i")
+        for doc, (ts, commit_id, author, message) in enumerate(rows):
+            commit_ids.append(commit_id)
+            times.append(ts)
+            author_codes.append(author_index.setdefault(author, len(author_index)))
+            subjects.append(message.split("\n", 1)[0][:SUBJECT_CHARS])
+            author_postings[author].append(doc)
+            # 编号递增，追加后各列表天然有序
+            for term in set(tokenize(message)):
+                term_postings[term].append(doc)
+
+        return cls(commit_ids, times, author_codes, list(author_index), subjects,
+                   _PostingTable.build(term_postings), _PostingTable.build(author_postings),
+                   source_path=source_path)
+
+    # ------------------------------------------------------------ 持久化
+    def save(self, source_path):
+        """
+        写入 .commit_cache/<CSV 文件名>.search/
+
+        参数:
+            source_path (str | Path): 索引对应的 CSV 路径
+        """
+        writer = ColumnCacheWriter(source_path, SEARCH_CACHE_NAMESPACE, SEARCH_SCHEMA)
+        try:
+            writer.append_strings("commit_id", self.commit_ids)
+            writer.append("time", "q", self.times)
+            writer.append("author_codes", "i", self.author_codes)
+            writer.append_strings("authors", self.authors)
+            writer.append_strings("subject", self.subjects)
+            for name, table in (("term", self.terms), ("author", self.author_postings)):
+                writer.append_strings(f"{name}_keys", table.keys)
+                writer.append(f"{name}_offsets", "q", table.offsets)
+                writer.append(f"{name}_widths", "b", table.widths)
+                writer.append(f"{name}_postings", "B", array("B", table.blob))
+            writer.commit(len(self.commit_ids))
+        except BaseException:
+            writer.abort()
+            raise
+
+    @classmethod
+    def load(cls, source_path):
+        """
+        读取已保存的索引，缺失或 CSV 已变化时返回 None
+
+        参数:
+            source_path (str | Path): CSV 路径
+
+        返回:
+            CommitSearchIndex | None
+        """
+        columns = load_columns(source_path, SEARCH_CACHE_NAMESPACE, SEARCH_SCHEMA)
+        if columns is None:
+            return None
+        tables = [
+            _PostingTable(columns[f"{name}_keys"], columns[f"{name}_offsets"],
+                          columns[f"{name}_widths"], columns[f"{name}_postings"])
+            for name in ("term", "author")
+        ]
+        return cls(columns["commit_id"], columns["time"], columns["author_codes"], columns["authors"],
+                   columns["subject"], *tables, source_path=source_path)
+
+    @classmethod
+    def open(cls, source_path, use_cache=True):
+        """
+        取与 CSV 一致的索引：已保存且未过期则直接读取，否则流式读取 CSV 重建并保存
+
+        参数:
+            source_path (str | Path): CSV 路径
+            use_cache (bool): 是否读写 .commit_cache/
+
+        返回:
+            CommitSearchIndex
+        """
+        from commit_stream import iter_commits
+
+        index = cls.load(source_path) if use_cache else None
+        if index is None:
+            index = cls.build(iter_commits(source_path), source_path=source_path)
+            if use_cache:
+                try:
+                    index.save(source_path)
+                except OSError as e:
+                    print(f"警告：无法写入检索索引（{e}）")
+        return index
+
+    # ------------------------------------------------------------ 查询
+    def __len__(self):
+        return len(self.commit_ids)
+
+    def term_ids(self, term, lo=0, hi=None):
+        """
+        一个查询词对应的提交编号
+
+        参数:
+            term (str): 词；以 * 结尾为前缀查询；切词后有多个词（如 "urllib3.util"）时要求全部出现
+            lo / hi (int): 只取该编号区间内的部分（见 time_range()）
+
+        返回:
+            list: 升序编号
+        """
+        prefix = term.endswith("*")
+        tokens = tokenize(term.rstrip("*"))
+        if not tokens:
+            return []
+        lists = [_clip(self.terms.ids(t), lo, hi) for t in tokens[:-1]]
+        last = tokens[-1]
+        if prefix:
+            lists.append(_union([_clip(self.terms.ids(t), lo, hi) for t in self.terms.prefixed(last)]))
+        else:
+            lists.append(_clip(self.terms.ids(last), lo, hi))
+        return _intersect_all(lists)
+
+    def author_names(self, author):
+        """
+        作者名展开为同一规范名下的全部写法（见 author_identity）
+
+        参数:
+            author (str | list): 作者名，或多个作者名
+
+        返回:
+            list: 索引中出现过的写法
+        """
+        names = [author] if isinstance(author, str) else list(author)
+        expanded = set()
+        aliases = self._alias_groups()
+        for name in names:
+            expanded.update(aliases.get(name, [name]))
+        return sorted(name for name in expanded if name in self._author_code)
+
+    def author_ids(self, author, lo=0, hi=None):
+        """
+        某作者（含别名写法）的提交编号
+
+        参数:
+            author (str | list): 作者名，或多个作者名
+            lo / hi (int): 只取该编号区间内的部分
+
+        返回:
+            list: 升序编号
+        """
+        return _union([_clip(self.author_postings.ids(name), lo, hi) for name in self.author_names(author)])
+
+    def _alias_groups(self):
+        """作者写法 -> 同一规范名下的全部写法（首次按作者过滤时计算，映射本身有缓存）"""
+        if self._aliases is None:
+            from author_identity import identity_map
+
+            counts = dict(zip(self.authors, [0] * len(self.authors)))
+            for code, n in Counter(self.author_codes).items():
+                counts[self.authors[code]] = n
+            mapping, _ = identity_map(counts, self.source_path)
+            groups = defaultdict(list)
+            for raw, canonical in mapping.items():
+                groups[canonical].append(raw)
+            self._aliases = {raw: groups[mapping[raw]] for raw in mapping}
+            self._aliases.update(groups)
+        return self._aliases
+
+    def time_range(self, since=None, until=None):
+        """
+        时间范围对应的编号区间
+
+        参数:
+            since: 起始时间（含），格式见 parse_bound()
+            until: 结束时间（不含）
+
+        返回:
+            tuple: (起始编号, 结束编号)，左闭右开
+        """
+        since, until = parse_bound(since), parse_bound(until)
+        lo = 0 if since is None else bisect_left(self.times, since)
+        hi = len(self.times) if until is None else bisect_left(self.times, until)
+        return lo, max(lo, hi)
+
+    def match(self, terms=(), any_terms=(), author=None, since=None, until=None):
+        """
+        组合查询，返回命中的提交编号
+
+        参数:
+            terms (list): 全部都要出现的词
+            any_terms (list): 至少出现一个的词
+            author (str | list | None): 作者名（含别名）
+            since: 起始时间（含）
+            until: 结束时间（不含）
+
+        返回:
+            list: 升序编号（即按时间从旧到新）
+        """
+        if isinstance(terms, str):
+            terms = [terms]
+        if isinstance(any_terms, str):
+            any_terms = [any_terms]
+        # 先确定时间区间，每个倒排表只取区间内的部分再做交集 / 并集
+        lo, hi = self.time_range(since, until)
+        lists = [self.term_ids(t, lo, hi) for t in terms]
+        if any_terms:
+            lists.append(_union([self.term_ids(t, lo, hi) for t in any_terms]))
+        if author is None:
+            return _intersect_all(lists) if lists else list(range(lo, hi))
+        if not lists:
+            return self.author_ids(author, lo, hi)
+        # 已有词条件时不必展开作者的倒排表（多产作者可能有几十万条），逐个检查候选提交的作者编码
+        codes = {self._author_code[name] for name in self.author_names(author)}
+        author_codes = self.author_codes
+        return [doc for doc in _intersect_all(lists) if author_codes[doc] in codes]
+
+    def count(self, **query):
+        """命中条数，参数同 match()"""
+        return len(self.match(**query))
+
+    def hit(self, doc):
+        """编号 -> SearchHit"""
+        ts = datetime.fromtimestamp(self.times[doc], timezone.utc)
+        return SearchHit(self.commit_ids[doc], self.authors[self.author_codes[doc]],
+                         ts.strftime("%Y-%m-%d %H:%M:%S"), self.subjects[doc])
+
+    def search(self, terms=(), any_terms=(), author=None, since=None, until=None, limit=None):
+        """
+        组合查询，返回从新到旧的检索结果
+
+        参数:
+            terms / any_terms / author / since / until: 同 match()
+            limit (int | None): 最多返回的条数
+
+        返回:
+            list: SearchHit 列表
+        """
+        docs = self.match(terms, any_terms, author, since, until)
+        if limit is not None:
+            docs = docs[max(len(docs) - limit, 0):]
+        return [self.hit(doc) for doc in reversed(docs)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="提交说明全文检索")
+    parser.add_argument("terms", nargs="*", help="查询词（以 * 结尾为前缀查询）")
+    parser.add_argument("--any", action="store_true", help="命中任意一个词即可（默认要求全部出现）")
+    parser.add_argument("--author", action="append", help="作者名，可重复（自动包含别名写法）")
+    parser.add_argument("--since", help="起始时间（含），如 2020 / 2020-06 / 2020-06-01")
+    parser.add_argument("--until", help="结束时间（不含）")
+    parser.add_argument("--limit", type=int, default=20, help="最多显示的条数（0 表示只显示数量）")
+    parser.add_argument("--csv", default="requests_commits.csv", help="提交记录 CSV")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = CommitSearchIndex.open(args.csv)
+    opened = time.perf_counter() - start
+
+    query = {"terms": [] if args.any else args.terms, "any_terms": args.terms if args.any else [],
+             "author": args.author, "since": args.since, "until": args.until}
+    start = time.perf_counter()
+    docs = index.match(**query)
+    elapsed = time.perf_counter() - start
+
+    for doc in reversed(docs[max(len(docs) - args.limit, 0):]):
+        hit = index.hit(doc)
+        print(f"{hit.commit_id}  {hit.time}  {hit.author:<24}  {hit.subject}")
+    print(f"\n命中 {len(docs)} / {len(index)} 条提交；加载索引 {opened * 1000:.1f} ms，查询 {elapsed * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
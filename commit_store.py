@@ -0,0 +1,374 @@
+"""
+SQLite 提交库：把提交记录批量写入本地数据库，统计用带索引的 GROUP BY 在库内完成
+
+用法:
+    from commit_store import CommitStore
+    store = CommitStore.open("requests_commits.csv")     # CSV 未变时直接打开已有的库
+    store.top_authors(10, since="2021")                   # [(作者, 提交数)]
+    store.type_counts(since="2021")                       # {类型: 提交数}
+    store.yearly_counts()                                 # {年份: 提交数}
+    store.author_type_breakdown(3, since="2020-10-18")    # Top3 提交者及各自的类型分布
+    window_counters, latest_year = store.window_counters(WINDOWS)   # 与 commit_stream.aggregate_file 相同的结果
+
+功能:
+    流式统计和 CommitAnalyzer 都把数据放在内存里、每次重新计算。这里作为可选的存储后端：
+    - 首次打开时流式读取 CSV（commit_stream.iter_commits）、分类后，在一个事务中分批 executemany 写入，
+      写完再建索引 (date)、(author, date)、(commit_type, date)，比边写边维护索引快
+    - 库文件在 CSV 旁边的 .commit_cache/<CSV 文件名>.sqlite3，记录 CSV 的大小、mtime、sha256 和分类规则，
+      失效规则与 commit_cache 一致；CSV 未变时再次运行不再读取 CSV
+    - 统计全部是 SQL 聚合，只把结果行读回 Python，数据集比内存大也能分析
+    - author 列保存 author_identity 合并后的规范名（原始写法在 raw_author 列），
+      合并开关或 mailmap 变化时在库内整列改写，不需要重新导入
+    只依赖标准库。
+"""
+
+import json
+import sqlite3
+from collections import Counter
+from pathlib import Path
+
+from commit_cache import cache_dir_for, file_sha256
+from commit_classifier import RULES_DIGEST, classify_message
+from commit_csv import commit_timestamp
+from commit_search import parse_bound
+from commit_stream import CommitCounters, iter_commits, window_years
+
+STORE_NAMESPACE = "sqlite3"
+# 表结构或分类规则变化时旧库自动重建
+STORE_SCHEMA = f"store-v2:{RULES_DIGEST}"
+# 每批写入的行数
+INSERT_BATCH_ROWS = 50000
+# 年份窗口换算为时间戳区间时向两侧放宽的秒数（年份按提交者本地时间划分，时区偏移最大 14 小时）
+YEAR_MARGIN_SECONDS = 86400
+
+_DDL = """
+CREATE TABLE commits (
+    commit_id   TEXT NOT NULL,
+    raw_author  TEXT NOT NULL,
+    author      TEXT NOT NULL,
+    date        INTEGER,          -- UTC 秒数，无法解析时为 NULL
+    year        TEXT NOT NULL,    -- 提交者本地时间的年份（与 commit_stream 的年份桶一致）
+    commit_type TEXT NOT NULL,
+    message     TEXT NOT NULL
+);
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+_INDEXES = """
+CREATE INDEX idx_commits_date ON commits (date);
+CREATE INDEX idx_commits_author_date ON commits (author, date);
+CREATE INDEX idx_commits_type_date ON commits (commit_type, date);
+"""
+
+
+def _source_state(source_path, with_sha=True):
+    stat = Path(source_path).stat()
+    state = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if with_sha:
+        state["sha256"] = file_sha256(source_path)
+    return state
+
+
+class CommitStore:
+    """SQLite 提交库"""
+
+    def __init__(self, db_path):
+        """
+        参数:
+            db_path (str | Path): 数据库文件路径（一般通过 open() 构造）
+        """
+        self.db_path = Path(db_path)
+        self.conn = sqlite3.connect(str(self.db_path))
+
+    # ------------------------------------------------------------ 打开 / 导入
+    @classmethod
+    def open(cls, source_path, merge_aliases=True, mailmap_path=None, db_path=None, stats=None):
+        """
+        打开与 CSV 一致的库：库不存在、CSV 已变化或规则变化时重新导入
+
+        参数:
+            source_path (str | Path): 提交记录 CSV 路径
+            merge_aliases (bool): author 列是否使用合并后的规范名
+            mailmap_path (str | Path | None): 指定 mailmap，默认使用 CSV 旁边的 .mailmap
+            db_path (str | Path | None): 库文件路径，默认 .commit_cache/<CSV 文件名>.sqlite3
+            stats (dict | None): 传入时累加 stats["rejected"]（导入时拒绝的行数，打开已有的库时从 meta 读取）
+
+        返回:
+            CommitStore
+        """
+        db_path = Path(db_path) if db_path else cache_dir_for(source_path, STORE_NAMESPACE)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        store = cls(db_path)
+        if not store._is_fresh(source_path):
+            read_stats = {}
+            store.import_commits(iter_commits(source_path, stats=read_stats), source_state=_source_state(source_path),
+                                 read_stats=read_stats)
+        store.sync_identity(source_path, merge_aliases, mailmap_path)
+        if stats is not None:
+            stats["rejected"] = stats.get("rejected", 0) + store.rejected
+        return store
+
+    def _meta(self, key):
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        except sqlite3.DatabaseError:
+            return None
+        return json.loads(row[0]) if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def _is_fresh(self, source_path):
+        """库是否仍对应当前 CSV：大小和 mtime 都没变直接命中，mtime 变了再比对 sha256"""
+        if self._meta("schema") != STORE_SCHEMA:
+            return False
+        recorded = self._meta("source")
+        if not recorded:
+            return False
+        current = _source_state(source_path, with_sha=False)
+        if recorded["size"] != current["size"]:
+            return False
+        if recorded["mtime_ns"] != current["mtime_ns"]:
+            if file_sha256(source_path) != recorded["sha256"]:
+                return False
+            recorded["mtime_ns"] = current["mtime_ns"]
+            with self.conn:
+                self._set_meta("source", recorded)
+        return True
+
+    def import_commits(self, commits, source_state=None, read_stats=None):
+        """
+        清空后导入提交记录（一个事务内分批 executemany，导入完成后再建索引）
+
+        参数:
+            commits (iterable): Commit(commit_id, author, time, message)
+            source_state (dict | None): 源文件状态，写入 meta 用于判断是否过期
+            read_stats (dict | None): commits 读取过程累加的 stats，导入完成后其中的拒绝行数写入 meta，
+                                      供再次打开时报告
+
+        返回:
+            int: 导入的行数
+        """
+        conn = self.conn
+        conn.execute("PRAGMA journal_mode = WAL")
+        # 导入中途失败时整个事务回滚；库只是缓存，关闭逐次 fsync
+        conn.execute("PRAGMA synchronous = OFF")
+        rows = 0
+        with conn:
+            # 建表语句不会隐式开启事务，显式 BEGIN 让删表、建表、写入作为一个整体提交
+            conn.execute("BEGIN")
+            conn.execute("DROP TABLE IF EXISTS commits")
+            conn.execute("DROP TABLE IF EXISTS meta")
+            for statement in _DDL.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            batch = []
+            for c in commits:
+                batch.append((c.commit_id, c.author, c.author, commit_timestamp(c.time), c.time[:4],
+                              classify_message(c.message), c.message))
+                if len(batch) >= INSERT_BATCH_ROWS:
+                    conn.executemany("INSERT INTO commits VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+                    rows += len(batch)
+                    batch = []
+            conn.executemany("INSERT INTO commits VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+            rows += len(batch)
+            for statement in _INDEXES.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            self._set_meta("schema", STORE_SCHEMA)
+            self._set_meta("source", source_state or {})
+            self._set_meta("rows", rows)
+            self._set_meta("rejected", (read_stats or {}).get("rejected", 0))
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return rows
+
+    def sync_identity(self, source_path=None, merge_aliases=True, mailmap_path=None):
+        """
+        让 author 列与作者合并设置一致：设置没变时什么都不做，否则按映射整列改写
+
+        参数:
+            source_path (str | Path | None): CSV 路径（用于映射缓存和查找 .mailmap）
+            merge_aliases (bool): 是否合并别名
+            mailmap_path (str | Path | None): 指定 mailmap
+        """
+        from author_identity import find_mailmap, identity_map, identity_schema
+
+        if mailmap_path is None and source_path is not None:
+            mailmap_path = find_mailmap(source_path)
+        wanted = identity_schema(mailmap_path) if merge_aliases else "raw"
+        if self._meta("identity") == wanted:
+            return
+        with self.conn:
+            if merge_aliases:
+                counts = dict(self.conn.execute("SELECT raw_author, COUNT(*) FROM commits GROUP BY raw_author"))
+                mapping, _ = identity_map(counts, source_path, mailmap_path)
+                self.conn.execute("CREATE TEMP TABLE author_alias (raw TEXT PRIMARY KEY, canonical TEXT NOT NULL)")
+                self.conn.executemany("INSERT INTO author_alias VALUES (?, ?)", mapping.items())
+                self.conn.execute("UPDATE commits SET author = "
+                                  "(SELECT canonical FROM author_alias WHERE raw = commits.raw_author)")
+                self.conn.execute("DROP TABLE author_alias")
+            else:
+                self.conn.execute("UPDATE commits SET author = raw_author")
+            self._set_meta("identity", wanted)
+
+    @property
+    def rejected(self):
+        """导入时拒绝的格式错误行数"""
+        return self._meta("rejected") or 0
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # ------------------------------------------------------------ 查询
+    @staticmethod
+    def _where(since=None, until=None, years=None):
+        """
+        时间条件
+
+        参数:
+            since / until: 起始（含）/ 结束（不含）时间，格式见 commit_search.parse_bound()
+            years (tuple | None): 本地年份闭区间 (起始年, 结束年)
+
+        返回:
+            tuple: (WHERE 子句, 参数)
+        """
+        clauses, params = [], []
+        since, until = parse_bound(since), parse_bound(until)
+        if years is not None:
+            # 先按放宽的时间戳区间走索引，再按本地年份精确筛选
+            start, end = years
+            low = parse_bound(f"{start:04d}") - YEAR_MARGIN_SECONDS
+            high = parse_bound(f"{end + 1:04d}") + YEAR_MARGIN_SECONDS
+            since = low if since is None else max(since, low)
+            until = high if until is None else min(until, high)
+            clauses.append("year BETWEEN ? AND ?")
+            params.extend([f"{start:04d}", f"{end:04d}"])
+        if since is not None:
+            clauses.append("date >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("date < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def count(self, since=None, until=None, years=None):
+        """时间范围内的提交数"""
+        where, params = self._where(since, until, years)
+        return self.conn.execute(f"SELECT COUNT(*) FROM commits{where}", params).fetchone()[0]
+
+    def top_authors(self, n=10, since=None, until=None, years=None):
+        """
+        提交最多的作者
+
+        参数:
+            n (int | None): 取前 n 名，None 表示全部
+            since / until / years: 时间条件，见 _where()
+
+        返回:
+            list: [(作者, 提交数)]，同数时按作者名排序
+        """
+        where, params = self._where(since, until, years)
+        sql = f"SELECT author, COUNT(*) AS n FROM commits{where} GROUP BY author ORDER BY n DESC, author"
+        if n is not None:
+            sql += " LIMIT ?"
+            params.append(n)
+        return self.conn.execute(sql, params).fetchall()
+
+    def type_counts(self, since=None, until=None, years=None):
+        """
+        返回:
+            dict: {提交类型: 提交数}
+        """
+        where, params = self._where(since, until, years)
+        return dict(self.conn.execute(
+            f"SELECT commit_type, COUNT(*) FROM commits{where} GROUP BY commit_type", params))
+
+    def yearly_counts(self, since=None, until=None, years=None):
+        """
+        返回:
+            dict: {年份字符串: 提交数}（年份按提交者本地时间）
+        """
+        where, params = self._where(since, until, years)
+        return dict(self.conn.execute(f"SELECT year, COUNT(*) FROM commits{where} GROUP BY year", params))
+
+    def author_type_breakdown(self, n=3, since=None, until=None):
+        """
+        Top N 提交者及各自的提交类型分布（Top3ContributorAnalyzer 的结果格式）
+
+        参数:
+            n (int): 提交者人数
+            since / until: 时间条件
+
+        返回:
+            dict: {作者: {"总提交数": int, "提交类型分布": {类型: 数量}}}
+                  作者与类型都按提交数从多到少、同数按名称排序，
+                  与 Top3ContributorAnalyzer（type_counts_for_rows）的顺序相同，导出的CSV逐字节一致
+        """
+        top = self.top_authors(n, since, until)
+        results = {author: {"总提交数": total, "提交类型分布": {}} for author, total in top}
+        if not top:
+            return results
+        where, params = self._where(since, until)
+        where += (" AND " if where else " WHERE ") + f"author IN ({', '.join('?' * len(top))})"
+        rows = self.conn.execute(
+            f"SELECT author, commit_type, COUNT(*) AS n FROM commits{where} "
+            f"GROUP BY author, commit_type ORDER BY author, n DESC, commit_type",
+            params + [author for author, _ in top])
+        for author, commit_type, count in rows:
+            results[author]["提交类型分布"][commit_type] = count
+        return results
+
+    def latest_year(self):
+        """
+        返回:
+            int | None: 有效年份中的最大值（与 CommitCounters.latest_year 一致）
+        """
+        for (year,) in self.conn.execute("SELECT DISTINCT year FROM commits ORDER BY year DESC"):
+            if year.isdigit() and len(year) == 4:
+                return int(year)
+        return None
+
+    def window_counters(self, windows):
+        """
+        各时间窗口的计数（与 commit_stream.aggregate_file 的结果相同，但计数来自库内聚合）
+
+        参数:
+            windows (list): [(名称, 范围), ...]，范围含义见 commit_stream.DEFAULT_WINDOWS
+
+        返回:
+            tuple: ({窗口名称: CommitCounters}, 最新年份或 None)
+        """
+        latest_year = self.latest_year()
+        results = {}
+        for name, span in windows:
+            counters = CommitCounters()
+            if span is None:
+                years = None
+            elif latest_year is None:
+                results[name] = counters
+                continue
+            else:
+                years = window_years(span, latest_year)
+            counters.authors = Counter(dict(self.top_authors(None, years=years)))
+            counters.types = Counter(self.type_counts(years=years))
+            counters.years = Counter(self.yearly_counts(years=years))
+            counters.total = sum(counters.years.values())
+            results[name] = counters
+        return results, latest_year
+
+    def explain(self, sql, params=()):
+        """
+        查询计划（确认 GROUP BY 是否走了索引）
+
+        返回:
+            list: EXPLAIN QUERY PLAN 的说明文字
+        """
+        return [row[-1] for row in self.conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
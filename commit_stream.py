@@ -0,0 +1,470 @@
+"""
+提交记录流式读取与单遍统计
+
+功能:
+    逐行读取 requests_commits.csv，产出紧凑的提交记录（namedtuple），
+    并在同一遍遍历中累加贡献者、提交类型和年度计数。
+    整个过程不保留提交列表，峰值内存与提交总数无关。
+    多个时间窗口（全时段、近五年、近两年……）也在这一遍中按年份分桶得到，
+    窗口结果由年份桶合并而来，不再重复扫描提交数据。
+    首次读取时顺便把（作者、年份、类型）编码为整数列写入磁盘缓存，
+    CSV 未变时后续运行直接从缓存统计，跳过文本解析和分类。
+    增量模式把年份桶和已处理的 commit_id 持久化，CSV 追加新提交后只折叠新增部分。
+"""
+
+import json
+import os
+from array import array
+from collections import Counter, namedtuple
+
+from commit_cache import ColumnCacheWriter, cache_dir_for, load_columns
+from commit_classifier import COMMIT_TYPES, RULES_DIGEST, classify_message
+from commit_csv import iter_commit_records
+
+# 单条提交记录：namedtuple 没有实例 __dict__，比每行一个 dict 节省大量内存
+Commit = namedtuple("Commit", ["commit_id", "author", "time", "message"])
+
+
+def iter_commits(file_path, skip_header=None, stats=None):
+    """
+    流式读取提交数据
+
+    参数:
+        file_path (str | Path): CSV 文件路径，列顺序为 commit_id,author,date,message
+        skip_header (bool | None): 是否跳过第一行；None 表示首行像表头时才跳过
+        stats (dict | None): 传入时累加 stats["rejected"]（格式不对而跳过的行数）
+
+    返回:
+        generator: 逐条产出 Commit(commit_id, author, time, message)
+
+    功能:
+        每次只持有一行文本（跨行的引号说明除外），由 commit_csv 统一切分：
+        第三个逗号之后整段都是提交说明，说明中的逗号和引号保留在 message 中
+    """
+    with open(file_path, "r", encoding="utf-8-sig", newline="") as f:
+        for record in iter_commit_records(f, skip_header, stats):
+            yield Commit._make(record)
+
+
+def commit_year(time_str):
+    """
+    提取提交年份
+
+    参数:
+        time_str (str): 提交时间（YYYY-MM-DD ...）
+
+    返回:
+        int | None: 年份，格式无效时返回 None
+    """
+    try:
+        return int(time_str[:4])
+    except (ValueError, IndexError):
+        return None
+
+
+class CommitCounters:
+    """贡献者 / 提交类型 / 年度 三个计数器，逐条累加"""
+    __slots__ = ("authors", "types", "years", "total")
+
+    def __init__(self):
+        self.authors = Counter()
+        self.types = Counter()
+        self.years = Counter()
+        self.total = 0
+
+    def add(self, commit, commit_type=None):
+        """
+        累加一条提交
+
+        参数:
+            commit (Commit): 提交记录
+            commit_type (str): 已知的提交类型，为 None 时现场分类
+        """
+        self.authors[commit.author] += 1
+        self.types[commit_type or classify_message(commit.message)] += 1
+        self.years[commit.time[:4]] += 1
+        self.total += 1
+
+    def merge(self, other):
+        """
+        把另一组计数合并进来（用于年份桶合并、多仓库汇总）
+
+        参数:
+            other (CommitCounters): 另一组计数
+
+        返回:
+            CommitCounters: self，便于链式调用
+        """
+        self.authors.update(other.authors)
+        self.types.update(other.types)
+        self.years.update(other.years)
+        self.total += other.total
+        return self
+
+    def same_as(self, other):
+        """
+        判断两组计数是否完全相同（用于增量模式判断图表是否需要重画）
+
+        参数:
+            other (CommitCounters): 另一组计数
+
+        返回:
+            bool: 作者、类型、年度计数都相同时为 True
+        """
+        return (self.authors == other.authors and self.types == other.types
+                and self.years == other.years)
+
+    def to_dict(self):
+        """
+        返回:
+            dict: 可写入 JSON 的计数
+        """
+        return {
+            "authors": dict(self.authors),
+            "types": dict(self.types),
+            "years": dict(self.years),
+            "total": self.total,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        参数:
+            data (dict): to_dict() 的结果
+
+        返回:
+            CommitCounters: 还原的计数
+        """
+        counters = cls()
+        counters.authors.update(data["authors"])
+        counters.types.update(data["types"])
+        counters.years.update(data["years"])
+        counters.total = data["total"]
+        return counters
+
+    def type_counts(self):
+        """
+        返回:
+            tuple: (类型列表, 类型数量列表)，顺序与 COMMIT_TYPES 一致
+        """
+        return list(COMMIT_TYPES), [self.types[t] for t in COMMIT_TYPES]
+
+    def latest_year(self):
+        """
+        返回:
+            int | None: 有效年份中的最大值，没有有效年份时返回 None
+        """
+        valid = [y for y in map(commit_year, self.years) if y is not None]
+        return max(valid) if valid else None
+
+
+def count_commits(commits):
+    """
+    单遍统计提交记录
+
+    参数:
+        commits (iterable): Commit 记录的可迭代对象（通常是 iter_commits 生成器）
+
+    返回:
+        CommitCounters: 统计结果
+    """
+    counters = CommitCounters()
+    for c in commits:
+        counters.add(c)
+    return counters
+
+
+# 默认时间窗口：(名称, 范围)
+#   范围为 None       -> 全时段
+#   范围为 int n      -> 以最新年份为终点的最近 n 年
+#   范围为 (起, 止)   -> 固定年份区间（闭区间）
+DEFAULT_WINDOWS = [("all", None), ("5years", 5), ("2years", 2)]
+
+
+def window_years(span, latest_year):
+    """
+    把窗口范围换算为年份闭区间
+
+    参数:
+        span (int | tuple): 最近 n 年，或 (起始年, 结束年)
+        latest_year (int): 数据中的最新年份
+
+    返回:
+        tuple: (起始年, 结束年)
+    """
+    if isinstance(span, tuple):
+        return span
+    return latest_year - span + 1, latest_year
+
+
+def _bucket_by_year(commits):
+    """按年份字符串分桶累加，返回 {年份字符串: CommitCounters}"""
+    buckets = {}
+    for c in commits:
+        key = c.time[:4]
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = CommitCounters()
+        bucket.add(c)
+    return buckets
+
+
+def _merge_windows(buckets, windows):
+    """把年份桶合并为各窗口的计数，返回 ({窗口名称: CommitCounters}, 最新年份)"""
+    valid_buckets = {}
+    for key, bucket in buckets.items():
+        year = commit_year(key)
+        if year is not None:
+            valid_buckets[year] = bucket
+    latest_year = max(valid_buckets) if valid_buckets else None
+
+    results = {}
+    for name, span in windows:
+        counters = CommitCounters()
+        if span is None:
+            for bucket in buckets.values():
+                counters.merge(bucket)
+        elif latest_year is not None:
+            start, end = window_years(span, latest_year)
+            for year, bucket in valid_buckets.items():
+                if start <= year <= end:
+                    counters.merge(bucket)
+        results[name] = counters
+    return results, latest_year
+
+
+def aggregate_windows(commits, windows=DEFAULT_WINDOWS):
+    """
+    单遍计算多个时间窗口的贡献者 / 类型 / 年度计数
+
+    参数:
+        commits (iterable): Commit 记录的可迭代对象
+        windows (list): [(名称, 范围), ...]，范围含义见 DEFAULT_WINDOWS
+
+    返回:
+        tuple: ({窗口名称: CommitCounters}, 最新年份或 None)
+
+    功能:
+        遍历时只按年份分桶累加（每条提交只分类一次），
+        遍历结束后再把落在窗口内的年份桶合并，合并代价与提交数无关
+    """
+    return _merge_windows(_bucket_by_year(commits), windows)
+
+
+# -------------------------- 磁盘缓存 --------------------------
+CACHE_NAMESPACE = "stream"
+CACHE_SCHEMA = f"stream-v3:{RULES_DIGEST}"
+CACHE_CHUNK_ROWS = 65536
+
+
+def _scan_into_cache(file_path, writer, stats=None):
+    """
+    流式读取 CSV：分桶统计的同时把每条提交编码为整数写入缓存
+
+    缓存列:
+        author_codes / year_codes / type_codes: 每条提交的编码
+        authors / year_keys: 编码对应的作者名、年份字符串
+        rejected: 拒绝行数（命中缓存时仍能报告）
+    """
+    author_index = {}
+    year_index = {}
+    type_index = {t: i for i, t in enumerate(COMMIT_TYPES)}
+    buckets = {}
+    author_codes, year_codes, type_codes = array("i"), array("i"), array("b")
+    rows = 0
+
+    def flush():
+        writer.append("author_codes", "i", author_codes)
+        writer.append("year_codes", "i", year_codes)
+        writer.append("type_codes", "b", type_codes)
+        del author_codes[:], year_codes[:], type_codes[:]
+
+    scan_stats = {}
+    for c in iter_commits(file_path, stats=scan_stats):
+        commit_type = classify_message(c.message)
+        key = c.time[:4]
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = CommitCounters()
+        bucket.add(c, commit_type)
+
+        author_codes.append(author_index.setdefault(c.author, len(author_index)))
+        year_codes.append(year_index.setdefault(key, len(year_index)))
+        type_codes.append(type_index[commit_type])
+        rows += 1
+        if len(type_codes) >= CACHE_CHUNK_ROWS:
+            flush()
+    flush()
+    writer.append_strings("authors", author_index)
+    writer.append_strings("year_keys", year_index)
+    rejected = scan_stats.get("rejected", 0)
+    writer.append("rejected", "q", [rejected])
+    writer.commit(rows)
+    if stats is not None:
+        stats["rejected"] = stats.get("rejected", 0) + rejected
+    return buckets
+
+
+def _buckets_from_columns(columns):
+    """
+    由缓存的整数列重建年份桶
+
+    Counter(zip(...)) 的计数循环在 C 中完成，不逐行执行 Python 代码
+    """
+    authors, year_keys = columns["authors"], columns["year_keys"]
+    year_codes = columns["year_codes"]
+    buckets = {key: CommitCounters() for key in year_keys}
+    for (y, a), n in Counter(zip(year_codes, columns["author_codes"])).items():
+        buckets[year_keys[y]].authors[authors[a]] += n
+    for (y, t), n in Counter(zip(year_codes, columns["type_codes"])).items():
+        buckets[year_keys[y]].types[COMMIT_TYPES[t]] += n
+    for y, n in Counter(year_codes).items():
+        bucket = buckets[year_keys[y]]
+        bucket.years[year_keys[y]] = n
+        bucket.total = n
+    return buckets
+
+
+def aggregate_file(file_path, windows=DEFAULT_WINDOWS, use_cache=True, stats=None):
+    """
+    统计 CSV 文件的多个时间窗口，优先使用磁盘缓存
+
+    参数:
+        file_path (str | Path): CSV 文件路径
+        windows (list): [(名称, 范围), ...]，范围含义见 DEFAULT_WINDOWS
+        use_cache (bool): 是否读写 .commit_cache/ 缓存
+        stats (dict | None): 传入时累加 stats["rejected"]（拒绝行数）
+
+    返回:
+        tuple: ({窗口名称: CommitCounters}, 最新年份或 None)
+    """
+    if not use_cache:
+        return aggregate_windows(iter_commits(file_path, stats=stats), windows)
+
+    columns = load_columns(file_path, CACHE_NAMESPACE, CACHE_SCHEMA)
+    if columns is not None:
+        if stats is not None:
+            stats["rejected"] = stats.get("rejected", 0) + columns["rejected"][0]
+        return _merge_windows(_buckets_from_columns(columns), windows)
+
+    try:
+        writer = ColumnCacheWriter(file_path, CACHE_NAMESPACE, CACHE_SCHEMA)
+    except OSError as e:
+        print(f"警告：无法写入缓存（{e}），本次不使用缓存")
+        return aggregate_windows(iter_commits(file_path, stats=stats), windows)
+    try:
+        buckets = _scan_into_cache(file_path, writer, stats)
+    except BaseException:
+        writer.abort()
+        raise
+    return _merge_windows(buckets, windows)
+
+
+# -------------------------- 增量模式 --------------------------
+STATE_NAMESPACE = "state"
+STATE_SCHEMA = f"state-v3:{RULES_DIGEST}"
+
+
+def load_state(file_path):
+    """
+    读取增量状态
+
+    参数:
+        file_path (str | Path): CSV 文件路径
+
+    返回:
+        tuple | None: ({年份字符串: CommitCounters}, 已处理 commit_id 集合)；不存在或规则已变时返回 None
+    """
+    state_dir = cache_dir_for(file_path, STATE_NAMESPACE)
+    try:
+        state = json.loads((state_dir / "state.json").read_text(encoding="utf-8"))
+        with open(state_dir / "seen_ids.txt", "r", encoding="utf-8", newline="") as f:
+            seen = set(f.read().split("\n")[:-1])
+    except (OSError, ValueError):
+        return None
+    if state.get("schema") != STATE_SCHEMA:
+        return None
+    buckets = {key: CommitCounters.from_dict(data) for key, data in state["buckets"].items()}
+    return buckets, seen
+
+
+def save_state(file_path, buckets, seen):
+    """
+    保存增量状态（先写临时文件再替换，中途失败不会留下半份状态）
+
+    参数:
+        file_path (str | Path): CSV 文件路径
+        buckets (dict): {年份字符串: CommitCounters}
+        seen (set): 已处理的 commit_id
+    """
+    state_dir = cache_dir_for(file_path, STATE_NAMESPACE)
+    state_dir.mkdir(parents=True, exist_ok=True)
+    state = {
+        "schema": STATE_SCHEMA,
+        "buckets": {key: bucket.to_dict() for key, bucket in buckets.items()},
+    }
+    for name, content in (("state.json", json.dumps(state, ensure_ascii=False)),
+                          ("seen_ids.txt", "".join(i + "\n" for i in seen))):
+        tmp_path = state_dir / f"{name}.tmp{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+        os.replace(tmp_path, state_dir / name)
+
+
+def aggregate_incremental(file_path, windows=DEFAULT_WINDOWS, stats=None):
+    """
+    增量统计：只把上次运行之后新增的提交折叠进持久化的年份桶
+
+    参数:
+        file_path (str | Path): CSV 文件路径（需包含 commit_id 列）
+        windows (list): [(名称, 范围), ...]，范围含义见 DEFAULT_WINDOWS
+        stats (dict | None): 传入时累加 stats["rejected"]（拒绝行数）
+
+    返回:
+        tuple: ({窗口名称: CommitCounters}, 最新年份或 None, 数字有变化的窗口名称集合)
+
+    功能:
+        按 commit_id 判断提交是否已处理过，已处理的行只做一次集合查找，不再分类和计数。
+        如果上次处理过的提交从 CSV 中消失（历史被改写），丢弃状态整体重算。
+    """
+    state = load_state(file_path)
+    if state is None:
+        buckets, seen = {}, set()
+        old_results = None
+    else:
+        buckets, seen = state
+        old_results, _ = _merge_windows(buckets, windows)
+
+    known = set(seen)
+    current_ids = set()
+    new_commits = 0
+    for c in iter_commits(file_path, stats=stats):
+        current_ids.add(c.commit_id)
+        if c.commit_id in seen:
+            continue
+        seen.add(c.commit_id)
+        key = c.time[:4]
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = CommitCounters()
+        bucket.add(c)
+        new_commits += 1
+
+    if known - current_ids:
+        print("提示：检测到已处理的提交被移除（历史被改写），重新全量统计")
+        buckets = _bucket_by_year(iter_commits(file_path))
+        seen = current_ids
+        old_results = None
+    elif new_commits:
+        print(f"增量模式：新增 {new_commits} 条提交")
+
+    if old_results is None or new_commits:
+        save_state(file_path, buckets, seen)
+
+    results, latest_year = _merge_windows(buckets, windows)
+    if old_results is None:
+        changed = set(results)
+    else:
+        changed = {name for name, counters in results.items()
+                   if name not in old_results or not counters.same_as(old_results[name])}
+    return results, latest_year, changed
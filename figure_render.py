@@ -0,0 +1,274 @@
+"""
+图表渲染阶段：先生成全部图表描述，再用进程池并行绘制
+
+功能:
+    统计脚本只负责生成 FigureSpec（图表类型、保存路径、标题、数据），
+    render_all() 把它们分发到进程池，每个进程用面向对象的 matplotlib.figure.Figure
+    独立绘图，不经过 pyplot 的全局状态，因此多个图表可以同时光栅化。
+    matplotlib 与进程池在渲染函数内部才导入，只做统计的调用方不需要承担导入开销。
+    每张图的输入（类型、标题、数据、样式）计算 sha256 并保存在 PNG 旁边的 .sha256 文件中，
+    输入没变且 PNG 仍在时跳过该图，夜间任务在数据不变时几乎不做光栅化。
+"""
+
+import hashlib
+import json
+import os
+from collections import namedtuple
+from pathlib import Path
+
+# 渲染函数的样式一旦修改就加一，使所有已保存的哈希失效
+RENDER_VERSION = 1
+HASH_SUFFIX = ".sha256"
+
+# 一张图表的完整描述：必须能被 pickle，才能发送到进程池
+#   kind  (str): 图表类型，对应 RENDERERS 中的绘制函数
+#   path  (str): 保存路径
+#   title (str): 图表标题
+#   data  (dict): 绘制所需的数据和样式
+FigureSpec = namedtuple("FigureSpec", ["kind", "path", "title", "data"])
+
+
+def bar_spec(labels, values, title, path, xlabel, ylabel, rotation):
+    """
+    生成带数值标注的柱状图描述
+
+    参数:
+        labels (list): 横轴标签
+        values (list): 柱高
+        title (str): 图表标题
+        path (str | Path): 保存路径
+        xlabel (str): 横轴名称
+        ylabel (str): 纵轴名称
+        rotation (int): 横轴标签旋转角度
+
+    返回:
+        FigureSpec: 图表描述
+    """
+    return FigureSpec("bar", str(path), title, {
+        "labels": list(labels), "values": list(values),
+        "xlabel": xlabel, "ylabel": ylabel, "rotation": rotation,
+    })
+
+
+def line_spec(labels, values, title, path, xlabel, ylabel):
+    """
+    生成带数值标注的折线图描述
+
+    参数:
+        labels (list): 横轴标签
+        values (list): 纵轴数值
+        title (str): 图表标题
+        path (str | Path): 保存路径
+        xlabel (str): 横轴名称
+        ylabel (str): 纵轴名称
+
+    返回:
+        FigureSpec: 图表描述
+    """
+    return FigureSpec("line", str(path), title, {
+        "labels": list(labels), "values": list(values),
+        "xlabel": xlabel, "ylabel": ylabel,
+    })
+
+
+def multi_line_spec(labels, series, title, path, xlabel, ylabel, max_ticks=12):
+    """
+    生成多条折线的趋势图描述（月度 / 周度 / 滚动窗口序列）
+
+    参数:
+        labels (list): 横轴标签（所有序列共用）
+        series (dict): 序列名 -> 纵轴数值列表（长度与 labels 一致）
+        title (str): 图表标题
+        path (str | Path): 保存路径
+        xlabel (str): 横轴名称
+        ylabel (str): 纵轴名称
+        max_ticks (int): 横轴最多显示的标签数，点数很多时等间隔抽取
+
+    返回:
+        FigureSpec: 图表描述
+    """
+    return FigureSpec("multi_line", str(path), title, {
+        "labels": [str(label) for label in labels],
+        "series": {name: list(values) for name, values in series.items()},
+        "xlabel": xlabel, "ylabel": ylabel, "max_ticks": max_ticks,
+        "figsize": (14, 6),
+    })
+
+
+def _render_bar(fig, spec):
+    data = spec.data
+    ax = fig.subplots()
+    bars = ax.bar(data["labels"], data["values"])
+    ax.tick_params(axis="x", labelrotation=data["rotation"])
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment("right")
+    ax.set_xlabel(data["xlabel"])
+    ax.set_ylabel(data["ylabel"])
+    ax.set_title(spec.title)
+    for bar, count in zip(bars, data["values"]):
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2, height + 0.5,
+                str(count), ha='center', va='bottom', fontsize=10)
+    fig.tight_layout()
+
+
+def _render_line(fig, spec):
+    data = spec.data
+    ax = fig.subplots()
+    ax.plot(data["labels"], data["values"], marker="o")
+    ax.tick_params(axis="x", labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment("right")
+    ax.set_xlabel(data["xlabel"])
+    ax.set_ylabel(data["ylabel"])
+    ax.set_title(spec.title)
+    for x, y in zip(data["labels"], data["values"]):
+        ax.text(x, y + 10.5, str(y), ha='center', va='bottom', fontsize=9)
+    fig.tight_layout()
+
+
+def _render_multi_line(fig, spec):
+    data = spec.data
+    labels = data["labels"]
+    ax = fig.subplots()
+    x = range(len(labels))
+    for name, values in data["series"].items():
+        ax.plot(x, values, linewidth=1.2, label=name)
+    # 点数可能上千，只等间隔显示部分横轴标签
+    step = max(1, -(-len(labels) // data["max_ticks"]))
+    ticks = list(range(0, len(labels), step))
+    ax.set_xticks(ticks)
+    ax.set_xticklabels([labels[i] for i in ticks], rotation=45, ha="right")
+    ax.set_xlabel(data["xlabel"])
+    ax.set_ylabel(data["ylabel"])
+    ax.set_title(spec.title)
+    ax.legend(fontsize=8, loc="upper left", ncol=2)
+    fig.tight_layout()
+
+
+def _render_pie_row(fig, spec):
+    """一行多个饼图（Top3 贡献者提交类型分布），样式与 reports/top3_contributor_analysis.py 一致"""
+    pies = spec.data["pies"]
+    axes = fig.subplots(1, len(pies))
+    fig.suptitle(spec.title, fontsize=20, y=0.98, fontweight='bold')
+    for ax, pie in zip(axes, pies):
+        wedges, texts, autotexts = ax.pie(
+            pie["values"],
+            labels=pie["labels"],
+            autopct='%1.1f%%',
+            startangle=90,
+            textprops={'fontsize': 12, 'wrap': True},
+            labeldistance=1.1,
+            pctdistance=0.75,
+            wedgeprops={'edgecolor': 'white', 'linewidth': 2},
+            colors=pie["colors"],
+            rotatelabels=False,
+        )
+        # 优化标签显示
+        for text in texts:
+            text.set_rotation(0)
+            text.set_ha('center')
+            text.set_wrap(True)
+            pos = text.get_position()
+            text.set_position((pos[0], pos[1] + 0.05))
+        # 美化百分比文字
+        for autotext in autotexts:
+            autotext.set_color('#333333')
+            autotext.set_fontsize(11)
+            autotext.set_fontweight('bold')
+            autotext.set_ha('center')
+        ax.set_title(pie["title"], fontsize=16, pad=30, fontweight='bold', y=-0.15)
+        ax.set_aspect('equal')
+    fig.tight_layout(rect=[0, 0.1, 1, 0.95])
+
+
+RENDERERS = {
+    "bar": _render_bar,
+    "line": _render_line,
+    "multi_line": _render_multi_line,
+    "pie_row": _render_pie_row,
+}
+
+
+def spec_digest(spec):
+    """
+    计算图表输入的哈希
+
+    参数:
+        spec (FigureSpec): 图表描述
+
+    返回:
+        str: 十六进制摘要（不含保存路径，只含会影响图片内容的输入）
+    """
+    payload = json.dumps([RENDER_VERSION, spec.kind, spec.title, spec.data],
+                         sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_up_to_date(spec):
+    """
+    判断已有的 PNG 是否由相同输入生成
+
+    参数:
+        spec (FigureSpec): 图表描述
+
+    返回:
+        bool: PNG 存在且旁边记录的哈希与当前输入一致时为 True
+    """
+    hash_path = Path(spec.path + HASH_SUFFIX)
+    if not Path(spec.path).exists():
+        return False
+    try:
+        return hash_path.read_text(encoding="utf-8").strip() == spec_digest(spec)
+    except OSError:
+        return False
+
+
+def render_figure(spec):
+    """
+    绘制并保存一张图表（在进程池的工作进程中执行）
+
+    参数:
+        spec (FigureSpec): 图表描述；data 中可选 figsize、rc（matplotlib 配置）、savefig（保存参数）
+
+    返回:
+        str: 保存路径
+    """
+    import matplotlib
+    from matplotlib.figure import Figure
+
+    with matplotlib.rc_context(spec.data.get("rc", {})):
+        fig = Figure(figsize=spec.data.get("figsize"))
+        RENDERERS[spec.kind](fig, spec)
+        fig.savefig(spec.path, **spec.data.get("savefig", {"dpi": 300}))
+    # 图片写完之后再记录哈希：中途失败时不会留下“已是最新”的假记录
+    Path(spec.path + HASH_SUFFIX).write_text(spec_digest(spec) + "\n", encoding="utf-8")
+    return spec.path
+
+
+def render_all(specs, workers=None, skip_unchanged=True):
+    """
+    渲染全部图表
+
+    参数:
+        specs (iterable): FigureSpec 列表
+        workers (int | None): 进程数；None 表示使用全部 CPU 核心，1 表示在当前进程中串行渲染
+        skip_unchanged (bool): 跳过输入哈希未变且 PNG 仍存在的图表
+
+    返回:
+        list: 实际重新渲染的保存路径列表（顺序与 specs 一致）
+    """
+    specs = list(specs)
+    if skip_unchanged:
+        specs = [spec for spec in specs if not is_up_to_date(spec)]
+    if not specs:
+        return []
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(specs))
+    if workers <= 1:
+        return [render_figure(spec) for spec in specs]
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render_figure, specs))
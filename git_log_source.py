@@ -0,0 +1,100 @@
+"""
+直接从本地 git 仓库读取提交记录（不经过中间 CSV）
+
+功能:
+    启动 git log 子进程，用 NUL 分隔的格式输出 (commit_id, 作者, 时间, 提交说明)，
+    从管道中分块读取并逐条产出 Commit，与 commit_stream.iter_commits 的产出完全同构。
+    git 不允许提交说明和作者名中出现 NUL，因此按 NUL 切分不会像按逗号切分那样
+    误切含逗号的说明，也不需要丢弃“格式错误”的行。
+    字段格式与原先导出 requests_commits.csv 的命令一致（8 位短哈希、ISO 时间、标题行）。
+"""
+
+import subprocess
+import tempfile
+
+from commit_stream import Commit
+
+# 每条提交 4 个字段，字段之间用 %x00 分隔；-z 让提交之间也用 NUL 分隔
+GIT_LOG_FORMAT = "%h%x00%an%x00%ai%x00%s"
+FIELDS_PER_COMMIT = 4
+READ_CHUNK = 1 << 16
+
+
+def git_log_command(repo_path, rev="HEAD", git="git"):
+    """
+    生成 git log 命令行
+
+    参数:
+        repo_path (str | Path): 本地仓库路径
+        rev (str): 起始版本（分支名、标签或范围，如 v2.0..HEAD）
+        git (str): git 可执行文件
+
+    返回:
+        list: 命令参数列表
+    """
+    return [git, "-C", str(repo_path), "-c", "core.abbrev=8", "log", "-z",
+            f"--format={GIT_LOG_FORMAT}", rev, "--"]
+
+
+def iter_git_log(repo_path, rev="HEAD", git="git"):
+    """
+    流式读取 git 仓库的提交记录
+
+    参数:
+        repo_path (str | Path): 本地仓库路径
+        rev (str): 起始版本
+        git (str): git 可执行文件
+
+    返回:
+        generator: 逐条产出 Commit(commit_id, author, time, message)，顺序同 git log（新到旧）
+
+    异常:
+        RuntimeError: git 不存在、路径不是仓库或 git log 执行失败
+    """
+    # stderr 写入临时文件而不是管道：git 输出大量警告时不会因管道写满而阻塞，
+    # 也就不会与这里读 stdout 互相等待
+    stderr_file = tempfile.TemporaryFile()
+    try:
+        proc = subprocess.Popen(git_log_command(repo_path, rev, git),
+                                stdout=subprocess.PIPE, stderr=stderr_file)
+    except OSError as e:
+        stderr_file.close()
+        raise RuntimeError(f"无法启动 git：{e}") from e
+
+    fields = []
+    pending = b""
+    finished = False
+    try:
+        # 分块读取管道：每次只持有一块输出和一条未完成的提交
+        for chunk in iter(lambda: proc.stdout.read(READ_CHUNK), b""):
+            parts = (pending + chunk).split(b"\x00")
+            pending = parts.pop()
+            for part in parts:
+                fields.append(part)
+                if len(fields) == FIELDS_PER_COMMIT:
+                    yield _to_commit(fields)
+                    fields = []
+        if pending:
+            fields.append(pending)
+        if len(fields) == FIELDS_PER_COMMIT:
+            yield _to_commit(fields)
+        finished = True
+    finally:
+        # 调用方提前停止遍历（或读取出错）时结束子进程，避免遗留僵尸进程；
+        # 正常读完时 git 可能已关闭 stdout 但尚未退出，只等待，不能误杀
+        proc.stdout.close()
+        if not finished and proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        stderr_file.seek(0)
+        stderr = stderr_file.read().decode("utf-8", errors="replace").strip()
+        stderr_file.close()
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"git log 执行失败（{repo_path}）：{stderr}")
+
+
+def _to_commit(fields):
+    """把 4 个原始字段解码为 Commit（无法解码的字节替换为 U+FFFD，不丢弃整条提交）"""
+    commit_id, author, time, message = (f.decode("utf-8", errors="replace") for f in fields)
+    return Commit(commit_id, author, time, message)
@@ -0,0 +1,346 @@
+"""
+requests 调用链的轻量追踪器（替代 pysnooper）
+
+功能:
+    pysnooper 逐行记录并对每个变量做 repr，两三次请求就生成几百 KB 日志，
+    追踪本身的开销也远大于被测代码，记录下来的耗时失真。
+    这里只记录指定函数（如 Session.request、HTTPAdapter.send）的进入 / 返回事件：
+    - Python 3.12+：sys.monitoring，只在目标函数的代码对象上开启 PY_START / PY_RETURN 事件，
+      其余函数完全不触发回调
+    - 更早的版本：把目标函数在所有已导入模块和所属类中的引用临时替换为计时包装函数，
+      停止时恢复（sys.setprofile 会对每一次 Python / C 调用触发回调，
+      本地请求实测开销超过 200%，因此不采用）
+    事件以元组形式缓存在内存中（纳秒时间戳、事件类型、层编号、线程），结束时一次性写出
+    JSONL（.jsonl）或定长二进制记录（其他扩展名），再还原为 API → Session → Adapter 的调用树和耗时分解。
+
+用法:
+    tracer = CallTracer({"Session": requests.Session.request,
+                         "Adapter": requests.adapters.HTTPAdapter.send}, output="trace.jsonl")
+    with tracer:
+        requests.get(url)
+    tracer.print_summary()
+"""
+
+import functools
+import inspect
+import json
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+CALL, RETURN = 0, 1
+EVENT_NAMES = ("call", "return")
+
+# 二进制格式：魔数 + 一行 JSON 头（层名、线程表）+ 定长记录
+BINARY_MAGIC = b"HTTPTRACE1\n"
+_RECORD = struct.Struct("<qBHI")  # 时间戳(ns), 事件, 层编号, 线程编号
+
+HAS_MONITORING = hasattr(sys, "monitoring")
+
+# 一条事件
+#   t_ns   (int): time.perf_counter_ns() 时间戳
+#   event  (int): CALL / RETURN
+#   layer  (str): 层名（如 "Session"）
+#   thread (int): 线程编号
+TraceEvent = namedtuple("TraceEvent", ["t_ns", "event", "layer", "thread"])
+
+# 还原后的一次调用
+#   layer     (str): 层名
+#   thread    (int): 线程编号
+#   depth     (int): 在目标函数之间的嵌套深度（0 为最外层）
+#   start_ns  (int): 开始时间（相对第一条事件）
+#   duration_ns (int | None): 耗时，追踪结束时仍未返回为 None
+#   self_ns   (int | None): 扣除嵌套目标调用后的自身耗时
+Frame = namedtuple("Frame", ["layer", "thread", "depth", "start_ns", "duration_ns", "self_ns"])
+
+
+def requests_layers():
+    """
+    requests 调用链的默认追踪层
+
+    返回:
+        dict: 层名 -> 函数（API → Session → Adapter，以及 Cookie 提取）
+    """
+    import requests
+    import requests.cookies
+
+    return {
+        "API": requests.api.request,
+        "Session": requests.sessions.Session.request,
+        "Adapter": requests.adapters.HTTPAdapter.send,
+        "Cookie": requests.cookies.extract_cookies_to_jar,
+    }
+
+
+class CallTracer:
+    """只记录目标函数进入 / 返回事件的追踪器，可用作上下文管理器"""
+
+    def __init__(self, layers, output=None):
+        """
+        参数:
+            layers (dict): 层名 -> 函数或方法
+            output (str | None): 结束时写出的文件；.jsonl 为文本，其他扩展名为二进制，None 表示不写文件
+        """
+        self.labels = list(layers)
+        self.output = output
+        self._funcs = [inspect.unwrap(func) for func in layers.values()]
+        self._codes = {func.__code__: i for i, func in enumerate(self._funcs)}
+        self._events = []
+        self._tool_id = None
+        self._patches = []
+
+    # -------------------------- 采集 --------------------------
+    def start(self):
+        """开始记录（同一个实例可多次 start/stop，事件累积）"""
+        # sys.monitoring 的 6 个工具编号都被占用时同样退回替换引用
+        if not (HAS_MONITORING and self._start_monitoring()):
+            self._start_patching()
+        return self
+
+    def stop(self):
+        """停止记录，并在设置了 output 时写出文件"""
+        if self._tool_id is not None:
+            self._stop_monitoring()
+        else:
+            self._stop_patching()
+        if self.output:
+            self.write(self.output)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _wrap(self, func, layer):
+        # 包装函数中只用局部变量，避免每次调用的属性查找
+        append = self._events.append
+        clock = time.perf_counter_ns
+        get_ident = threading.get_ident
+
+        @functools.wraps(func)
+        def traced(*args, **kwargs):
+            append((clock(), CALL, layer, get_ident()))
+            try:
+                return func(*args, **kwargs)
+            finally:
+                append((clock(), RETURN, layer, get_ident()))
+        return traced
+
+    def _start_patching(self):
+        wrappers = {id(func): (func, self._wrap(func, i)) for i, func in enumerate(self._funcs)}
+        # 1. 方法：替换定义它的类中的属性
+        for func, wrapper in wrappers.values():
+            owner = _owner_of(func)
+            if owner is not None and vars(owner).get(func.__name__) is func:
+                self._patch(owner, func.__name__, func, wrapper)
+        # 2. 函数：替换所有已导入模块中对它的引用（包括 from x import f 得到的别名）
+        for module in list(sys.modules.values()):
+            namespace = getattr(module, "__dict__", None)
+            if not isinstance(namespace, dict):
+                continue
+            for name, value in list(namespace.items()):
+                entry = wrappers.get(id(value))
+                if entry is not None and entry[0] is value:
+                    self._patch(module, name, value, entry[1])
+
+    def _patch(self, owner, name, original, wrapper):
+        setattr(owner, name, wrapper)
+        self._patches.append((owner, name, original))
+
+    def _stop_patching(self):
+        while self._patches:
+            owner, name, original = self._patches.pop()
+            setattr(owner, name, original)
+
+    def _start_monitoring(self):
+        """开启 sys.monitoring 事件；没有空闲的工具编号时返回 False"""
+        monitoring = sys.monitoring
+        tool_id = monitoring.PROFILER_ID
+        if monitoring.get_tool(tool_id) is not None:
+            tool_id = next((i for i in range(6) if monitoring.get_tool(i) is None), None)
+            if tool_id is None:
+                return False
+        monitoring.use_tool_id(tool_id, "http_call_tracer")
+        self._tool_id = tool_id
+
+        codes = self._codes
+        append = self._events.append
+        clock = time.perf_counter_ns
+        get_ident = threading.get_ident
+
+        def on_start(code, offset):
+            append((clock(), CALL, codes[code], get_ident()))
+
+        def on_return(code, offset, retval):
+            append((clock(), RETURN, codes[code], get_ident()))
+
+        def on_unwind(code, offset, exc):
+            # 异常离开目标函数同样记为返回；PY_UNWIND 只能全局开启，这里按代码对象过滤
+            layer = codes.get(code)
+            if layer is not None:
+                append((clock(), RETURN, layer, get_ident()))
+
+        events = monitoring.events
+        monitoring.register_callback(tool_id, events.PY_START, on_start)
+        monitoring.register_callback(tool_id, events.PY_RETURN, on_return)
+        monitoring.register_callback(tool_id, events.PY_UNWIND, on_unwind)
+        for code in codes:
+            monitoring.set_local_events(tool_id, code, events.PY_START | events.PY_RETURN)
+        monitoring.set_events(tool_id, events.PY_UNWIND)
+        return True
+
+    def _stop_monitoring(self):
+        monitoring = sys.monitoring
+        tool_id, self._tool_id = self._tool_id, None
+        monitoring.set_events(tool_id, 0)
+        for code in self._codes:
+            monitoring.set_local_events(tool_id, code, 0)
+        for event in (monitoring.events.PY_START, monitoring.events.PY_RETURN, monitoring.events.PY_UNWIND):
+            monitoring.register_callback(tool_id, event, None)
+        monitoring.free_tool_id(tool_id)
+
+    # -------------------------- 结果 --------------------------
+    def events(self):
+        """
+        返回:
+            list: TraceEvent 列表（线程编号从 0 开始按出现顺序编号）
+        """
+        threads = {}
+        return [TraceEvent(t, ev, self.labels[layer], threads.setdefault(tid, len(threads)))
+                for t, ev, layer, tid in self._events]
+
+    def write(self, path):
+        """
+        写出事件
+
+        参数:
+            path (str): .jsonl 写为每行一个 JSON 对象，其他扩展名写为二进制定长记录
+        """
+        events = self.events()
+        if str(path).endswith(".jsonl"):
+            with open(path, "w", encoding="utf-8") as f:
+                for e in events:
+                    f.write(json.dumps({"t_ns": e.t_ns, "event": EVENT_NAMES[e.event],
+                                        "layer": e.layer, "thread": e.thread}) + "\n")
+            return
+        with open(path, "wb") as f:
+            f.write(BINARY_MAGIC)
+            f.write(json.dumps({"layers": self.labels}).encode("utf-8") + b"\n")
+            index = {label: i for i, label in enumerate(self.labels)}
+            f.write(b"".join(_RECORD.pack(e.t_ns, e.event, index[e.layer], e.thread) for e in events))
+
+    def frames(self):
+        """还原调用树，见 build_frames"""
+        return build_frames(self.events())
+
+    def print_summary(self):
+        """打印调用树与各层耗时分解"""
+        print("\n".join(format_summary(self.frames())))
+
+
+def _owner_of(func):
+    """按 __qualname__ 找到定义方法的类，普通函数或找不到时返回 None"""
+    parts = func.__qualname__.split(".")[:-1]
+    if not parts or "<locals>" in parts:
+        return None
+    owner = sys.modules.get(func.__module__)
+    for part in parts:
+        owner = getattr(owner, part, None)
+    return owner if isinstance(owner, type) else None
+
+
+def read_trace(path):
+    """
+    读取 CallTracer.write 写出的文件
+
+    参数:
+        path (str): JSONL 或二进制追踪文件
+
+    返回:
+        list: TraceEvent 列表
+    """
+    with open(path, "rb") as f:
+        if f.read(len(BINARY_MAGIC)) == BINARY_MAGIC:
+            labels = json.loads(f.readline())["layers"]
+            data = f.read()
+            return [TraceEvent(t, ev, labels[layer], thread)
+                    for t, ev, layer, thread in _RECORD.iter_unpack(data)]
+    events = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                events.append(TraceEvent(item["t_ns"], EVENT_NAMES.index(item["event"]),
+                                         item["layer"], item["thread"]))
+    return events
+
+
+def build_frames(events):
+    """
+    按线程配对进入 / 返回事件，还原调用树
+
+    参数:
+        events (list): TraceEvent 列表（时间顺序）
+
+    返回:
+        list: Frame 列表，按开始时间排序；同一线程内按深度缩进即为调用树
+    """
+    if not events:
+        return []
+    origin = events[0].t_ns
+    stacks = {}
+    frames = []
+    for e in events:
+        stack = stacks.setdefault(e.thread, [])
+        if e.event == CALL:
+            # [层名, 开始时间, 嵌套目标调用耗时, 在 frames 中的位置]
+            stack.append([e.layer, e.t_ns, 0, len(frames)])
+            frames.append(None)
+            continue
+        # 返回事件与栈顶不匹配（追踪开始前已进入的调用）时忽略
+        if not stack or stack[-1][0] != e.layer:
+            continue
+        layer, start, child_ns, slot = stack.pop()
+        duration = e.t_ns - start
+        frames[slot] = Frame(layer, e.thread, len(stack), start - origin, duration, duration - child_ns)
+        if stack:
+            stack[-1][2] += duration
+    # 追踪结束时仍未返回的调用
+    for thread, stack in stacks.items():
+        for depth, (layer, start, _, slot) in enumerate(stack):
+            frames[slot] = Frame(layer, thread, depth, start - origin, None, None)
+    return [f for f in frames if f is not None]
+
+
+def format_summary(frames):
+    """
+    生成调用树和各层汇总的文本
+
+    参数:
+        frames (list): build_frames 的结果
+
+    返回:
+        list: 文本行
+    """
+    lines = ["调用树（耗时 / 自身耗时，毫秒）："]
+    for f in frames:
+        if f.duration_ns is None:
+            lines.append(f"{'  ' * f.depth}[{f.layer}] 未返回")
+        else:
+            lines.append(f"{'  ' * f.depth}[{f.layer}] {f.duration_ns / 1e6:.3f} ms"
+                         f"（自身 {f.self_ns / 1e6:.3f} ms）")
+    totals = {}
+    for f in frames:
+        if f.duration_ns is None:
+            continue
+        count, total, self_total = totals.get(f.layer, (0, 0, 0))
+        totals[f.layer] = (count + 1, total + f.duration_ns, self_total + f.self_ns)
+    lines.append("各层汇总：")
+    for layer, (count, total, self_total) in totals.items():
+        lines.append(f"  {layer:<12} 调用 {count} 次，总耗时 {total / 1e6:.3f} ms，"
+                     f"自身 {self_total / 1e6:.3f} ms，平均 {total / count / 1e6:.3f} ms")
+    return lines
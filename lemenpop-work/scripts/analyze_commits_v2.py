@@ -1,77 +1,253 @@
 # -*- coding: utf-8 -*-
-import pandas as pd
+# pandas / numpy 在用到时才导入：只需要 TABLE_CACHE_SCHEMA 等常量的调用方不承担其导入开销
 import os
-from datetime import datetime
-from dateutil.relativedelta import relativedelta
-from collections import Counter
+import sys
+
+# 复用仓库根目录下与 analyze_commits.py 共用的分类规则引擎
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+from author_identity import identity_map, mapping_digest
+from commit_cache import ColumnCacheWriter, load_columns
+from commit_classifier import default_classifier, RULES_DIGEST
+from commit_csv import COLUMNS, DATE_FORMAT, parse_commit_dates, read_commit_table
+from git_log_source import iter_git_log
+from stage_profiler import profiler
+
+# 解析结果缓存（CSV 未变时跳过 read_csv / to_datetime / 分类）
+TABLE_CACHE_NAMESPACE = 'pandas'
+TABLE_CACHE_SCHEMA = f'table-v2:{RULES_DIGEST}'
+
+
+def data_path_from_argv(argv=None):
+    """
+    从命令行参数中取数据路径：--data=<路径> 或第一个不以 -- 开头的位置参数
+    :param argv: 参数列表，默认 sys.argv[1:]
+    :return: CSV路径；未给出时返回 None（使用 CommitAnalyzer.DEFAULT_DATA_PATH）
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    for arg in argv:
+        if arg.startswith('--data='):
+            return arg.split('=', 1)[1]
+    return next((arg for arg in argv if not arg.startswith('--')), None)
 
 class CommitAnalyzer:
-    """提交记录分析核心类（适配git log导出的无表头CSV）"""
-    # 直接指定真实数据路径，无需外部传参
-    def __init__(self):
-        """初始化：自动加载真实数据+字段映射+类型分类，无任何外部依赖"""
-        self.data_path = r"C:\Users\dell\my-course-work\python-team-project\requests_commits.csv"
-     
-        if os.path.exists(self.data_path):
-            self.df = pd.read_csv(
-                self.data_path,
-                encoding='utf-8-sig',       # 解决UTF-8带BOM编码问题
-                quotechar='"',             # 正确解析含逗号的提交说明
-                on_bad_lines='skip',       # 新版Pandas唯一有效：跳过格式错误行
-                header=None,               # 关键：git log导出的CSV无表头
-                names=['commit_id', 'author', 'date', 'message']  # 手动映射列名（必须和git log列顺序一致）
-            )
-            print(f"成功加载真实数据：{self.data_path}（共{len(self.df)}条提交记录）")
-        else:
-            self._create_sample_data()  # 备用：真实数据不存在时生成示例
-        
-       
-        self.df['date'] = pd.to_datetime(self.df['date'], errors='coerce', utc=True).dt.tz_localize(None)
-        # 过滤掉日期转换失败的无效行
-        self.df = self.df.dropna(subset=['date'])
-        
-        # 提交类型分类规则（和组长保持一致的10类）
-        self.commit_type_rules = [
-            ('Merge PR', ['merge', 'pr']),
-            ('Dependency', ['dependency', 'update package', 'pip', 'requirements']),
-            ('Release', ['release', 'v\\d+\\.', 'version']),
-            ('Bug Fix', ['fix', 'bug', 'repair', 'correct']),
-            ('Feature', ['add', 'new', 'feature', 'implement']),
-            ('Refactor', ['refactor', 'restructure', 'optimize']),
-            ('Docs', ['doc', 'documentation', 'readme', '说明']),
-            ('Test', ['test', 'pytest', 'unit test', 'ci']),
-            ('Maintenance', ['maintain', 'clean', 'format', 'lint']),
-            ('Other', [])
-        ]
-        
-        # 自动添加提交类型列（子类直接可用，无KeyError）
-        self.df['commit_type'] = self.df['message'].apply(self.classify_commit_type)
+    """
+    提交记录分析核心类（适配git log导出的无表头CSV）
+
+    author / commit_type 两列以 pandas Categorical（整数编码）存储，
+    按作者取提交通过 author_rows() 查预先分好组的行号，不再逐行比较字符串
+    """
+    # 默认真实数据路径（不传 data_path 时使用）：仓库根目录下的 requests_commits.csv
+    DEFAULT_DATA_PATH = os.path.join(REPO_ROOT, 'requests_commits.csv')
+    # 合并同一作者的不同写法（规则见根目录 author_identity.py），关闭后按原始写法统计
+    MERGE_AUTHOR_ALIASES = True
+    # git 格式的 mailmap 路径；None 表示使用数据源旁边的 .mailmap
+    MAILMAP_PATH = None
+
+    def __init__(self, data_path=None, git_repo=None):
+        """
+        初始化：自动加载真实数据+字段映射+类型分类，无任何外部依赖
+        :param data_path: 提交记录CSV路径，默认 DEFAULT_DATA_PATH（批量分析多个仓库时逐个传入）
+        :param git_repo: 本地git仓库路径；给出时直接读取 git log，不经过CSV（也不使用解析缓存）
+        """
+        import pandas as pd
+
+        self.git_repo = git_repo
+        self.data_path = git_repo or data_path or self.DEFAULT_DATA_PATH
+        # 提交类型分类规则：与组长的 analyze_commits.py 共用同一张有序规则表（10类）
+        self.classifier = default_classifier
+        # 按作者编码分组的行号索引，首次调用 author_rows() 时构建
+        self._author_index = None
+        # 作者映射摘要：依赖作者名的持久化结果（如 Top3 增量状态）据此判断是否失效
+        self.identity_digest = 'none'
+        # 分阶段性能记录（COMMIT_PROFILE 环境变量或 --profile 启用，关闭时几乎无开销）
+        self.profiler = profiler
+
+        with self.profiler.stage('load') as stage:
+            rejected = 0
+            if git_repo:
+                # NUL 分隔的 git log 输出逐条解析，含逗号/引号的提交说明不会被误切或丢弃
+                with self.profiler.stage('git_log'):
+                    self.df = pd.DataFrame.from_records(
+                        iter_git_log(git_repo), columns=['commit_id', 'author', 'date', 'message'])
+                source = f"成功读取git仓库：{git_repo}"
+            elif os.path.exists(self.data_path):
+                with self.profiler.stage('load_cache'):
+                    self.df = self._load_table_cache()
+                if self.df is not None:
+                    stage['rows'] = len(self.df)
+                    print(f"从缓存加载真实数据：{self.data_path}（共{len(self.df)}条提交记录）")
+                    self._merge_author_aliases()
+                    return
+                # 统一读取器：按固定4列切分（说明中的逗号、引号不再导致整行被丢弃）
+                with self.profiler.stage('read_csv'):
+                    self.df, rejected = read_commit_table(self.data_path, parse_dates=False)
+                source = f"成功加载真实数据：{self.data_path}"
+            else:
+                self._create_sample_data()  # 备用：真实数据不存在时生成示例
+                source = None
+
+            with self.profiler.stage('parse_dates'):
+                if not pd.api.types.is_datetime64_dtype(self.df['date']):
+                    self.df['date'] = parse_commit_dates(self.df['date']).to_numpy()
+                # 过滤掉日期转换失败的无效行
+                rows_before = len(self.df)
+                self.df = self.df.dropna(subset=['date']).reset_index(drop=True)
+                rejected += rows_before - len(self.df)
+            if source:
+                print(f"{source}（共{len(self.df)}条提交记录，拒绝{rejected}行格式错误的记录）")
+
+            with self.profiler.stage('encode'):
+                # 统一为字符串，保证与缓存读回的结果一致
+                self.df['commit_id'] = self.df['commit_id'].astype(str)
+                self.df['message'] = self.df['message'].fillna('').astype(str)
+                # 作者列整数编码：每行只存编码，作者名在类别表中只存一份
+                self.df['author'] = self.df['author'].astype('category')
+
+            # 自动添加提交类型列（整列向量化分类，子类直接可用，无KeyError）
+            with self.profiler.stage('classify', rows=len(self.df)):
+                self.df['commit_type'] = self.classifier.classify_series(self.df['message'])
+
+            if not git_repo and os.path.exists(self.data_path):
+                with self.profiler.stage('save_cache'):
+                    self._save_table_cache()
+            stage['rows'] = len(self.df)
+        # 缓存里保存原始写法，合并在读取之后做，修改 mailmap 不需要重新解析 CSV
+        self._merge_author_aliases()
+
+    def _merge_author_aliases(self):
+        """
+        把作者列的不同写法合并为规范名：映射按类别表计算（或读缓存），
+        再用一次数组查表把每行的作者编码换成规范名的编码
+        """
+        import numpy as np
+        import pandas as pd
+
+        if not self.MERGE_AUTHOR_ALIASES:
+            return
+        with self.profiler.stage('identity'):
+            author = self.df['author'].cat
+            categories = author.categories.astype(str)
+            codes = author.codes.to_numpy()
+            counts = np.bincount(codes[codes >= 0], minlength=len(categories))
+            mapping, _ = identity_map(dict(zip(categories, counts.tolist())),
+                                      self.data_path, self.MAILMAP_PATH)
+            canonical = sorted(set(mapping.values()))
+            position = {name: code for code, name in enumerate(canonical)}
+            lookup = np.array([position[mapping[name]] for name in categories], dtype=np.int32)
+            merged = np.where(codes >= 0, lookup[codes], -1)
+            self.df['author'] = pd.Categorical.from_codes(merged, categories=canonical)
+            self.identity_digest = mapping_digest(mapping)
+            self._author_index = None
+
+    def _load_table_cache(self):
+        """从 .commit_cache/ 读取已解析、已分类的提交表，缓存缺失或 CSV 已变化时返回 None"""
+        import numpy as np
+        import pandas as pd
+
+        columns = load_columns(self.data_path, TABLE_CACHE_NAMESPACE, TABLE_CACHE_SCHEMA)
+        if columns is None:
+            return None
+        author_codes = np.frombuffer(columns['author_codes'], dtype=np.int32)
+        type_codes = np.frombuffer(columns['type_codes'], dtype=np.int8)
+        return pd.DataFrame({
+            'commit_id': columns['commit_id'],
+            'author': pd.Categorical.from_codes(author_codes, categories=columns['authors']),
+            'date': np.frombuffer(columns['date'], dtype=np.int64).view('datetime64[ns]'),
+            'message': columns['message'],
+            'commit_type': pd.Categorical.from_codes(type_codes, categories=self.classifier.labels),
+        })
+
+    def _save_table_cache(self):
+        """把解析、类型转换、分类后的提交表按列写入 .commit_cache/（写失败不影响分析）"""
+        import numpy as np
+
+        authors = self.df['author'].cat
+        try:
+            writer = ColumnCacheWriter(self.data_path, TABLE_CACHE_NAMESPACE, TABLE_CACHE_SCHEMA)
+        except OSError as e:
+            print(f"警告：无法写入缓存（{e}）")
+            return
+        writer.append_strings('commit_id', self.df['commit_id'])
+        writer.append('author_codes', 'i', authors.codes.to_numpy(dtype=np.int32))
+        writer.append_strings('authors', authors.categories.astype(str))
+        writer.append('date', 'q', self.df['date'].to_numpy(dtype='datetime64[ns]').view(np.int64))
+        writer.append_strings('message', self.df['message'])
+        writer.append('type_codes', 'b', self.df['commit_type'].cat.codes.to_numpy(dtype=np.int8))
+        writer.commit(len(self.df))
 
     def _create_sample_data(self):
         """备用：真实数据不存在时生成示例数据"""
+        import pandas as pd
+
         data_dir = '../data'
         if not os.path.exists(data_dir):
             os.makedirs(data_dir)
+        sample_size = 51  # 3 种说明 / 作者各重复 17 次，各列长度必须一致
+        # 与 git log 导出的格式一致（列顺序同 commit_csv.COLUMNS，完整的带时区时间），
+        # 生成的文件可以再交给 read_commit_table / batch_analyze.py 读取
+        dates = pd.date_range(start='2019-01-01', periods=sample_size, freq='ME', tz='UTC')
         sample_data = {
-            'commit_id': list(range(1, 51)),
-            'message': ['fix: 修复bug', 'feat: 新增功能', 'docs: 更新文档'] * 17,
-            'author': ['Kenneth Reitz', 'dependabot[bot]', 'Nate Prewitt'] * 17,
-            'date': pd.date_range(start='2019-01-01', periods=50, freq='ME')
+            'commit_id': [f'{i:08x}' for i in range(1, sample_size + 1)],
+            'author': ['Kenneth Reitz', 'dependabot[bot]', 'Nate Prewitt'] * (sample_size // 3),
+            'date': dates.strftime(DATE_FORMAT),
+            'message': ['fix: 修复bug', 'feat: 新增功能', 'docs: 更新文档'] * (sample_size // 3),
         }
-        self.df = pd.DataFrame(sample_data)
+        self.df = pd.DataFrame(sample_data, columns=COLUMNS)
         sample_path = os.path.join(data_dir, 'sample_commits.csv')
         self.df.to_csv(sample_path, index=False, encoding='utf-8')
         print(f" 真实数据不存在，生成示例数据：{sample_path}")
 
+    # -------------------------- 基于编码的分组查询 --------------------------
+    def _author_groups(self):
+        """
+        按作者编码分组的行号索引：(按编码排序后的行号, 每个编码的起止位置, 作者名->编码)
+        只在首次使用时构建一次（稳定排序，组内保持原行顺序）；替换 self.df 后需重置 self._author_index
+        """
+        import numpy as np
+
+        if self._author_index is None:
+            author_col = self.df['author'].cat
+            codes = author_col.codes.to_numpy()
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(author_col.categories) + 1))
+            positions = {author: code for code, author in enumerate(author_col.categories)}
+            self._author_index = (order, bounds, positions)
+        return self._author_index
+
+    def author_rows(self, author):
+        """
+        某位作者全部提交的行号（self.df 中的位置，按原顺序）
+        :param author: 作者名
+        :return: numpy 行号数组；查编码 + 切片，与提交总数无关
+        """
+        order, bounds, positions = self._author_groups()
+        code = positions.get(author)
+        if code is None:
+            return order[:0]
+        return order[bounds[code]:bounds[code + 1]]
+
+    def author_commits(self, author):
+        """某位作者的全部提交（DataFrame）"""
+        return self.df.iloc[self.author_rows(author)]
+
+    def type_counts_for_rows(self, rows):
+        """
+        指定行的提交类型计数
+        :param rows: self.df 中的行号数组
+        :return: {提交类型: 提交数}，按提交数降序、同数按类型名排序（与 SQLite 提交库一致），只含非零类型
+        """
+        import numpy as np
+
+        labels = self.classifier.labels
+        codes = self.df['commit_type'].cat.codes.to_numpy()[rows]
+        counts = np.bincount(codes, minlength=len(labels))
+        order = sorted(np.flatnonzero(counts), key=lambda i: (-counts[i], labels[i]))
+        return {labels[i]: int(counts[i]) for i in order}
+
     def classify_commit_type(self, message):
-        """提交类型自动分类"""
-        if pd.isna(message):
-            return 'Other'
-        message = message.lower()
-        for commit_type, keywords in self.commit_type_rules:
-            if any(keyword in message for keyword in keywords):
-                return commit_type
-        return 'Other'
+        """单条提交类型分类（整列分类请用 self.classifier.classify_series）"""
+        return self.classifier.classify(message)
 
     def basic_statistics(self):
         """基础统计输出"""
@@ -84,12 +260,17 @@ class CommitAnalyzer:
         print("="*50 + "\n")
 
 if __name__ == "__main__":
-    # 单独运行测试
-    analyzer = CommitAnalyzer()
+    # --profile：输出各阶段耗时/内存（同 COMMIT_PROFILE=1）
+    if '--profile' in sys.argv:
+        profiler.enable()
+    # 单独运行测试；数据路径可作为位置参数或 --data=<路径> 给出
+    analyzer = CommitAnalyzer(data_path_from_argv())
     analyzer.basic_statistics()
     # 自动创建reports目录并保存数据
     reports_dir = '../reports'
     if not os.path.exists(reports_dir):
         os.makedirs(reports_dir)
-    analyzer.df.to_csv(os.path.join(reports_dir, 'real_commits_with_type.csv'), index=False, encoding='utf-8')
-    print(f" 带类型的真实数据已保存：{reports_dir}/real_commits_with_type.csv")
\ No newline at end of file
+    with profiler.stage('csv_export', rows=len(analyzer.df)):
+        analyzer.df.to_csv(os.path.join(reports_dir, 'real_commits_with_type.csv'), index=False, encoding='utf-8')
+    print(f" 带类型的真实数据已保存：{reports_dir}/real_commits_with_type.csv")
+    profiler.report()
\ No newline at end of file
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+调用图与继承关系索引（设计模式检测用）
+核心功能：
+1. 由 source_structure 的提取结果一次性建立整个源码树的索引：
+   - 继承：基类按名字解析到项目内的类（同模块优先），预先算好直接子类、全部子孙类
+   - 调用图：每个方法 / 函数调用了什么，反向索引某个方法名被哪些方法调用
+   - 每个类的方法被哪些子孙类重写
+2. 索引保存在 <源码根目录>/.code_index.json，以源码树摘要为键，源码没变时直接读取
+3. 检测器只按类 id（"模块路径:qualname"）查字典，不再读源码文件：
+   - 策略模式：同一方法被 2 个及以上子类重写（子类扇出）
+   - 适配器模式：send 等方法把调用转给另一个对象的不同接口（如 conn.urlopen）
+   - 观察者模式：注册回调（register_*、向 *hooks / *listeners 追加）
+   - 单例 / 工厂模式：__new__ / get_instance，返回 cls(...) 的类方法、create_* 方法
+作者：lemenpop
+日期：2026
+"""
+
+import json
+import os
+from collections import defaultdict
+from pathlib import Path
+
+INDEX_SCHEMA = "code-index-v1"
+INDEX_FILE_NAME = ".code_index.json"
+
+# 适配器检测关注的方法
+ADAPTER_METHODS = ("send",)
+# 容器 / 字符串等内置类型的常用方法，调用它们不算委托给另一个对象
+BUILTIN_METHODS = frozenset({
+    "get", "pop", "popitem", "insert", "append", "extend", "remove", "update", "setdefault",
+    "items", "keys", "values", "copy", "clear", "add", "discard", "index", "count", "sort",
+    "format", "join", "split", "rsplit", "strip", "lstrip", "rstrip", "startswith", "endswith",
+    "encode", "decode", "lower", "upper", "replace", "find", "read", "write", "close",
+})
+# 回调容器的属性名关键字
+HOOK_CONTAINER_WORDS = ("hook", "listener", "callback", "observer", "subscriber", "handler")
+REGISTER_PREFIXES = ("register_", "add_listener", "add_observer", "subscribe", "add_hook")
+
+
+def class_id(module, qualname):
+    """类的唯一标识：模块相对路径:qualname"""
+    return f"{module}:{qualname}"
+
+
+def _root_name(call):
+    return call.split(".", 1)[0].split("[", 1)[0].split("(", 1)[0]
+
+
+def _is_hook_registration(call):
+    """self.hooks[].append、self._listeners.add 之类向回调容器追加的调用"""
+    if not call.endswith((".append", ".extend", ".add", ".insert")):
+        return False
+    container = call.rsplit(".", 1)[0].lower()
+    return any(word in container for word in HOOK_CONTAINER_WORDS)
+
+
+class CodeIndex:
+    """持久化的调用图 / 继承索引，所有查询都是字典查找"""
+
+    def __init__(self, data):
+        """
+        :param data: build() 生成的字典（也是 JSON 文件的内容）
+        """
+        self.data = data
+        self.classes = data["classes"]
+        self.by_name = data["by_name"]
+        self.callers = data["callers"]
+        self.imports = data["imports"]
+
+    # ------------------------------------------------------------ 构建
+    @classmethod
+    def build(cls, files, source_digest=None):
+        """
+        由提取结果建立索引
+        :param files: SourceStructureIndex.files（相对路径 -> 提取结果）
+        :param source_digest: 源码树摘要，写入索引用于判断是否过期
+        :return: CodeIndex
+        """
+        classes, by_name, imports = {}, defaultdict(list), {}
+        callers = defaultdict(list)
+        for module, result in files.items():
+            imports[module] = result.get("imports", [])
+            for info in result["classes"]:
+                cid = class_id(module, info["qualname"])
+                methods = {}
+                for m in info["methods"]:
+                    methods[m["name"]] = {"kind": m["kind"], "lineno": m["lineno"], "calls": m["calls"]}
+                    for call in m["calls"]:
+                        callers[call.rsplit(".", 1)[-1]].append(f"{cid}.{m['name']}")
+                classes[cid] = {
+                    "module": module, "name": info["name"], "qualname": info["qualname"],
+                    "lineno": info["lineno"], "bases": info["bases"], "methods": methods,
+                }
+                by_name[info["name"]].append(cid)
+            for f in result["functions"]:
+                for call in f["calls"]:
+                    callers[call.rsplit(".", 1)[-1]].append(f"{module}:{f['name']}")
+
+        # 基类按最后一段名字解析：同模块优先，否则取唯一同名类，再否则取全部同名类
+        children = defaultdict(list)
+        for cid, info in classes.items():
+            resolved = []
+            for base in info["bases"]:
+                candidates = by_name.get(base.split("[", 1)[0].rsplit(".", 1)[-1], [])
+                same_module = [c for c in candidates if classes[c]["module"] == info["module"] and c != cid]
+                for parent in same_module or [c for c in candidates if c != cid]:
+                    resolved.append(parent)
+                    children[parent].append(cid)
+            info["base_ids"] = resolved
+
+        for cid, info in classes.items():
+            info["subclass_ids"] = sorted(children.get(cid, []))
+            descendants = cls._descendants(cid, children)
+            info["descendant_count"] = len(descendants)
+            # 本类的方法被哪些子孙类重写
+            overridden = {}
+            for name in info["methods"]:
+                who = sorted(d for d in descendants if name in classes[d]["methods"])
+                if who:
+                    overridden[name] = who
+            info["overridden_by"] = overridden
+
+        return cls({
+            "schema": INDEX_SCHEMA,
+            "source_digest": source_digest,
+            "classes": classes,
+            "by_name": dict(by_name),
+            "imports": imports,
+            "callers": {name: sorted(set(sites)) for name, sites in callers.items()},
+        })
+
+    @staticmethod
+    def _descendants(cid, children):
+        seen, stack = set(), list(children.get(cid, []))
+        while stack:
+            child = stack.pop()
+            if child not in seen:
+                seen.add(child)
+                stack.extend(children.get(child, []))
+        return seen
+
+    # ------------------------------------------------------------ 持久化
+    def save(self, path):
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, source_digest=None):
+        """
+        读取索引，结构标识或源码摘要不符时返回 None
+        :param path: 索引文件
+        :param source_digest: 期望的源码树摘要（None 不检查）
+        :return: CodeIndex 或 None
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("schema") != INDEX_SCHEMA:
+            return None
+        if source_digest is not None and data.get("source_digest") != source_digest:
+            return None
+        return cls(data)
+
+    @classmethod
+    def for_structure(cls, structure_index, path=None):
+        """
+        取与源码树一致的索引：已保存且未过期则直接读取，否则重建并保存
+        :param structure_index: 已 scan() 的 SourceStructureIndex
+        :param path: 索引文件，默认 <源码根目录>/.code_index.json
+        :return: CodeIndex
+        """
+        path = Path(path) if path else Path(structure_index.root) / INDEX_FILE_NAME
+        digest = structure_index.source_digest()
+        index = cls.load(path, digest)
+        if index is None:
+            index = cls.build(structure_index.files, digest)
+            index.save(path)
+        return index
+
+    # ------------------------------------------------------------ 查询
+    def get(self, cid):
+        """类信息（不存在返回 None）"""
+        return self.classes.get(cid)
+
+    def find(self, name):
+        """按类名查类 id 列表"""
+        return self.by_name.get(name, [])
+
+    def callers_of(self, method_name):
+        """调用了某方法名的位置列表（"类id.方法" 或 "模块:函数"）"""
+        return self.callers.get(method_name, [])
+
+
+# ---------------------------------------------------------------- 检测器
+# 每个检测器接收 (index, 类信息)，返回说明文字或 None
+
+def detect_strategy(index, info):
+    """子类扇出：同一方法被至少 2 个子孙类重写，本类是可替换实现的公共接口"""
+    best = max(((name, who) for name, who in info["overridden_by"].items()
+                if not name.startswith("__") or name == "__call__"),
+               key=lambda item: len(item[1]), default=None)
+    if best and len(best[1]) >= 2:
+        names = ", ".join(index.classes[c]["name"] for c in best[1][:4])
+        return f"{len(best[1])} 个子类重写 {best[0]}（{names}）"
+    return None
+
+
+def detect_adapter(index, info):
+    """send 等方法把调用转交给另一个对象的不同接口（接口转换）"""
+    imports = set(index.imports.get(info["module"], []))
+    for name in ADAPTER_METHODS:
+        method = info["methods"].get(name)
+        if method is None:
+            continue
+        delegated = [call for call in method["calls"]
+                     if "." in call and _root_name(call) not in ("self", "cls", "super", "?")
+                     and _root_name(call) not in imports
+                     and call.rsplit(".", 1)[-1] not in BUILTIN_METHODS | {name}]
+        if delegated:
+            return f"{name} 委托给 {', '.join(delegated[:3])}"
+    return None
+
+
+def detect_observer(index, info):
+    """注册回调：register_* 等方法，或向 hooks / listeners 容器追加回调"""
+    for name, method in info["methods"].items():
+        registrations = [call for call in method["calls"] if _is_hook_registration(call)]
+        if registrations:
+            return f"{name} 注册回调（{', '.join(registrations[:2])}）"
+        if name.startswith(REGISTER_PREFIXES):
+            return f"{name} 注册回调"
+    return None
+
+
+def detect_singleton(index, info):
+    if "__new__" in info["methods"] or "get_instance" in info["methods"]:
+        return "定义了 __new__ / get_instance"
+    return None
+
+
+def detect_factory(index, info):
+    """返回 cls(...) 的类方法（备选构造器）或 create_* 方法"""
+    for name, method in info["methods"].items():
+        if name.startswith("create_"):
+            return f"{name} 创建对象"
+        if method["kind"] == "classmethod" and "cls" in method["calls"]:
+            return f"类方法 {name} 返回 cls(...)"
+    return None
+
+
+DETECTORS = [
+    ("策略模式", detect_strategy),
+    ("适配器模式", detect_adapter),
+    ("观察者模式", detect_observer),
+    ("单例模式", detect_singleton),
+    ("工厂模式", detect_factory),
+]
+
+
+def detect_patterns(index, cid):
+    """
+    对一个类运行全部检测器
+    :param index: CodeIndex
+    :param cid: 类 id
+    :return: [(模式名, 依据)]
+    """
+    info = index.get(cid)
+    if info is None:
+        return []
+    hints = []
+    for pattern, detector in DETECTORS:
+        reason = detector(index, info)
+        if reason:
+            hints.append((pattern, reason))
+    return hints
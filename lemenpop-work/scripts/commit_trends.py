@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+提交趋势分析工具：按月 / 按周 / 滚动90天统计每位贡献者、每种提交类型的提交数
+核心做法：先用 np.bincount 得到 (时间单元 × 分组) 的计数矩阵，再沿时间轴做前缀和，
+任意长度的滚动窗口都是两个前缀和相减，每个输出点 O(1)
+作者：lemenpop
+日期：2026
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+from analyze_commits_v2 import CommitAnalyzer, data_path_from_argv
+
+# 复用仓库根目录下的并行渲染模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from figure_render import multi_line_spec, render_all
+
+# 输出目录：与 analyze_commits.py 的 yearly_commit.png 放在一起
+OUTPUT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'analyze_commits_figures'))
+
+# 按贡献者统计时只保留提交最多的前N位（其余贡献者的序列几乎全为0）
+TOP_AUTHORS = 10
+
+# 滚动窗口长度（天）
+ROLLING_DAYS = 90
+
+# 渲染进程数：None 表示使用全部 CPU 核心，1 表示串行渲染
+RENDER_WORKERS = None
+
+# 分组方式 -> 图表中的名称
+GROUP_TITLES = {'author': 'Contributor', 'commit_type': 'Commit Type'}
+
+
+def _group_codes(df, by, top_authors=TOP_AUTHORS):
+    """
+    分组列的整数编码
+    :param df: CommitAnalyzer.df（author / commit_type 为 Categorical）
+    :param by: 'author' 或 'commit_type'
+    :return: (每行的分组编码（不参与统计的行为 -1）, 分组名称列表)
+    """
+    column = df[by].cat
+    codes = column.codes.to_numpy().astype(np.int64)
+    if by != 'author':
+        return codes, [str(c) for c in column.categories]
+    # 只保留提交最多的前N位贡献者，编码重排为 0..N-1（同数时按首次出现的编码）
+    counts = np.bincount(codes, minlength=len(column.categories))
+    keep = np.argsort(-counts, kind='stable')[:top_authors]
+    keep = keep[counts[keep] > 0]
+    remap = np.full(len(column.categories), -1, dtype=np.int64)
+    remap[keep] = np.arange(len(keep))
+    return remap[codes], [str(column.categories[c]) for c in keep]
+
+
+def _count_matrix(unit_index, codes, n_units, n_groups):
+    """(时间单元 × 分组) 计数矩阵：一次 bincount，不按分组循环"""
+    mask = codes >= 0
+    flat = unit_index[mask] * n_groups + codes[mask]
+    return np.bincount(flat, minlength=n_units * n_groups).reshape(n_units, n_groups)
+
+
+def period_counts(df, freq, by):
+    """
+    按自然周期（月 / 周）统计每个分组的提交数，中间没有提交的周期补0
+    :param df: CommitAnalyzer.df
+    :param freq: pandas 周期代码，'M' 为按月，'W' 为按周（周一至周日）
+    :param by: 'author' 或 'commit_type'
+    :return: 宽表 DataFrame，索引为周期起始日期，每列一个分组
+    """
+    codes, names = _group_codes(df, by)
+    periods = df['date'].dt.to_period(freq)
+    ordinals = periods.array.asi8
+    first, last = ordinals.min(), ordinals.max()
+    matrix = _count_matrix(ordinals - first, codes, last - first + 1, len(names))
+    index = pd.period_range(periods.min(), periods.max(), freq=freq).start_time
+    return pd.DataFrame(matrix, index=index, columns=names)
+
+
+def rolling_counts(df, by, days=ROLLING_DAYS):
+    """
+    每天往前 days 天（含当天）内每个分组的提交数
+    :param df: CommitAnalyzer.df
+    :param by: 'author' 或 'commit_type'
+    :param days: 滚动窗口长度（天）
+    :return: 宽表 DataFrame，索引为日期（从最早提交日到最晚提交日），每列一个分组
+
+    前缀和 prefix[t] = 前 t 天的累计提交数，窗口 (t-days, t] 的提交数为 prefix[t+1] - prefix[t+1-days]
+    """
+    codes, names = _group_codes(df, by)
+    day = df['date'].dt.floor('D')
+    start = day.min()
+    day_index = ((day - start) // pd.Timedelta(days=1)).to_numpy().astype(np.int64)
+    n_days = int(day_index.max()) + 1
+    daily = _count_matrix(day_index, codes, n_days, len(names))
+
+    prefix = np.zeros((n_days + 1, len(names)), dtype=np.int64)
+    np.cumsum(daily, axis=0, out=prefix[1:])
+    ends = np.arange(1, n_days + 1)
+    rolling = prefix[ends] - prefix[np.maximum(ends - days, 0)]
+    index = pd.date_range(start, periods=n_days, freq='D')
+    return pd.DataFrame(rolling, index=index, columns=names)
+
+
+def to_tidy(wide, period_name='period', group_name='group'):
+    """宽表转长表：每行一个 (周期, 分组, 提交数)，便于看板直接读取"""
+    tidy = wide.rename_axis(period_name).reset_index().melt(
+        id_vars=period_name, var_name=group_name, value_name='commits')
+    tidy[period_name] = tidy[period_name].dt.strftime('%Y-%m-%d')
+    return tidy
+
+
+def build_trends(df):
+    """
+    计算全部趋势序列
+    :param df: CommitAnalyzer.df
+    :return: {(序列名, 分组方式): 宽表}，序列名为 monthly / weekly / rolling90d
+    """
+    trends = {}
+    for by in GROUP_TITLES:
+        trends[('monthly', by)] = period_counts(df, 'M', by)
+        trends[('weekly', by)] = period_counts(df, 'W', by)
+        trends[(f'rolling{ROLLING_DAYS}d', by)] = rolling_counts(df, by)
+    return trends
+
+
+def save_trends(trends, output_dir=OUTPUT_DIR):
+    """
+    每个序列保存为 tidy CSV，并生成对应的折线图描述
+    :return: FigureSpec 列表（由调用方统一并行渲染）
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    titles = {'monthly': 'Monthly', 'weekly': 'Weekly'}
+    specs = []
+    for (name, by), wide in trends.items():
+        tidy = to_tidy(wide, group_name=by)
+        tidy.to_csv(os.path.join(output_dir, f'trend_{name}_{by}.csv'), index=False, encoding='utf-8')
+        label = titles.get(name, f'Rolling {ROLLING_DAYS}-day')
+        specs.append(multi_line_spec(
+            wide.index.strftime('%Y-%m-%d'),
+            {column: wide[column].tolist() for column in wide.columns},
+            title=f'{label} Commits by {GROUP_TITLES[by]}',
+            path=os.path.join(output_dir, f'trend_{name}_{by}.png'),
+            xlabel='Date', ylabel='Number of Commits',
+        ))
+    return specs
+
+
+if __name__ == "__main__":
+    # 数据路径可作为位置参数或 --data=<路径> 给出，默认仓库根目录下的 requests_commits.csv
+    analyzer = CommitAnalyzer(data_path_from_argv())
+    trends = build_trends(analyzer.df)
+    specs = save_trends(trends)
+    rendered = render_all(specs, workers=RENDER_WORKERS)
+    print(f"趋势CSV与图表已保存至：{OUTPUT_DIR}（重新渲染 {len(rendered)} 张图表）")
@@ -2,22 +2,31 @@
 """
 设计模式分析辅助工具
 核心功能：
-1. 提取requests项目核心模块的类和方法结构
+1. 提取requests项目核心模块的类和方法结构（基于ast，见 source_structure.py）
 2. 生成类-方法调用关系文档
-3. 标记可能涉及的设计模式（如工厂模式、单例模式）
+3. 标记可能涉及的设计模式：类名/方法名推测，加上基于调用图与继承索引的检测（见 code_index.py）
+用法：
+    python design_pattern_helper.py [项目路径] [--all] [--workers=N]
+    --all 报告整个源码目录，默认只报告 core_modules
 作者：lemenpop
 日期：2026
 """
 
 import os
+import sys
+from datetime import datetime
 from pathlib import Path
 
+from code_index import CodeIndex, class_id, detect_patterns
+from source_structure import SourceStructureIndex, extract_source
+
 class DesignPatternHelper:
     """设计模式分析辅助类"""
-    def __init__(self, project_root=None):
+    def __init__(self, project_root=None, workers=None):
         """
         初始化：指定requests项目根路径（后续替换为真实路径）
         :param project_root: requests项目本地路径
+        :param workers: 解析源码的进程数，默认CPU数
         """
         # 示例：假设requests项目克隆到本地data文件夹（后续可修改为真实路径）
         self.project_root = project_root or '../data/requests'
@@ -29,6 +38,37 @@ class DesignPatternHelper:
             'requests/adapters.py',
             'requests/auth.py'
         ]
+        self.workers = workers
+        self._index = None
+        self._code_index = None
+
+    def structure_index(self):
+        """
+        整个项目源码的结构索引（首次调用时扫描，未改动的文件直接读缓存）
+        :return: SourceStructureIndex
+        """
+        if self._index is None:
+            self._index = SourceStructureIndex(self.project_root, workers=self.workers)
+            self._index.scan()
+            stats = self._index.stats
+            print(f"源码扫描：{stats['files']} 个文件，解析 {stats['parsed']} 个，"
+                  f"缓存命中 {stats['cached']} 个，语法错误 {stats['errors']} 个")
+        return self._index
+
+    def code_index(self):
+        """
+        调用图与继承索引（源码未改动时直接读取已保存的索引）
+        :return: CodeIndex
+        """
+        if self._code_index is None:
+            self._code_index = CodeIndex.for_structure(self.structure_index())
+        return self._code_index
+
+    @staticmethod
+    def _class_methods(result):
+        """把提取结果转换为 {类qualname: [(方法名, 行号, 方法类型)]}"""
+        return {cls['qualname']: [(m['name'], m['lineno'], m['kind']) for m in cls['methods']]
+                for cls in result['classes']}
 
     def extract_class_methods(self, file_path):
         """
@@ -38,41 +78,33 @@ class DesignPatternHelper:
         """
         if not os.path.exists(file_path):
             return {}
-        
-        class_methods = {}
-        current_class = None
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            lines = f.readlines()
-            for line_num, line in enumerate(lines, 1):
-                line = line.strip()
-                # 匹配类定义（class XXX: 或 class XXX(Parent):）
-                if line.startswith('class ') and (line.endswith(':') or '(' in line):
-                    class_name = line.split('class ')[1].split('(')[0].split(':')[0].strip()
-                    current_class = class_name
-                    class_methods[current_class] = []
-                # 匹配方法定义（def XXX(self, ...):）
-                elif line.startswith('def ') and 'self' in line and line.endswith(':'):
-                    if current_class:
-                        method_name = line.split('def ')[1].split('(')[0].strip()
-                        class_methods[current_class].append((method_name, line_num))  # 记录方法名和行号
-        return class_methods
+        # ast解析：嵌套类（Outer.Inner）、装饰器、多行签名、staticmethod/classmethod都能识别
+        result = extract_source(Path(file_path).read_bytes(), str(file_path))
+        return self._class_methods(result)
 
-    def generate_structure_report(self):
-        """生成核心模块的类-方法结构报告"""
+    def generate_structure_report(self, all_modules=False):
+        """
+        生成类-方法结构报告
+        :param all_modules: True 报告整个源码目录，False 只报告 core_modules
+        """
+        files = self.structure_index().files
+        code_index = self.code_index()
+        modules = list(files) if all_modules else self.core_modules
         report = []
         report.append("# Requests项目核心代码结构报告（设计模式分析用）")
         report.append(f"生成时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         report.append("="*50 + "\n")
 
-        for module in self.core_modules:
-            module_path = Path(self.project_root) / module
-            if not module_path.exists():
+        for module in modules:
+            if module not in files:
                 report.append(f"模块不存在：{module}")
                 report.append("")
                 continue
             
             report.append(f"## 模块：{module}")
-            class_methods = self.extract_class_methods(module_path)
+            if files[module]['error']:
+                report.append(f"  解析失败：{files[module]['error']}")
+            class_methods = self._class_methods(files[module])
             
             if not class_methods:
                 report.append("  无公开类定义")
@@ -80,16 +112,22 @@ class DesignPatternHelper:
                 for cls, methods in class_methods.items():
                     report.append(f"### 类：{cls}")
                     report.append("  方法列表（方法名：行号）：")
-                    for method, line_num in methods:
-                        report.append(f"    - {method}: 第{line_num}行")
-                    # 标记可能的设计模式（基于类名/方法名推测）
-                    pattern_hints = self._guess_design_pattern(cls, methods)
+                    for method, line_num, kind in methods:
+                        suffix = "" if kind == 'instance' else f"（{kind}）"
+                        report.append(f"    - {method}: 第{line_num}行{suffix}")
+                    # 标记可能的设计模式：调用图/继承索引的检测结果，加上基于类名/方法名的推测
+                    detected = detect_patterns(code_index, class_id(module, cls))
+                    pattern_hints = [pattern for pattern, _ in detected]
+                    pattern_hints += [p for p in self._guess_design_pattern(cls, methods) if p not in pattern_hints]
                     if pattern_hints:
                         report.append(f"  可能的设计模式：{', '.join(pattern_hints)}")
+                    for pattern, reason in detected:
+                        report.append(f"    - {pattern}依据：{reason}")
                     report.append("")
         
         # 保存报告到docs文件夹
         report_path = '../docs/design_pattern_structure.md'
+        os.makedirs(os.path.dirname(report_path), exist_ok=True)
         with open(report_path, 'w', encoding='utf-8') as f:
             f.write('\n'.join(report))
         
@@ -121,6 +159,8 @@ class DesignPatternHelper:
 
 # 主函数：运行生成报告
 if __name__ == "__main__":
-    helper = DesignPatternHelper()
-    helper.generate_structure_report()
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    workers = next((int(arg.split('=', 1)[1]) for arg in sys.argv if arg.startswith('--workers=')), None)
+    helper = DesignPatternHelper(args[0] if args else None, workers=workers)
+    helper.generate_structure_report(all_modules='--all' in sys.argv)
     print("\n设计模式辅助分析完成")
\ No newline at end of file
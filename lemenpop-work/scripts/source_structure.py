@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+基于 ast 的源码结构提取（DesignPatternHelper 使用）
+核心功能：
+1. 遍历整个源码目录，用 ast 提取类（含嵌套类、函数内定义的类）、方法（含多行签名、
+   staticmethod / classmethod / property、async）、装饰器、基类和模块级函数，
+   以及每个函数体内的调用（如 self.get_connection、conn.urlopen、self.hooks[].append）
+   和模块导入的名字，供 code_index.py 建立调用图
+2. 未命中缓存的文件在进程池中并行解析
+3. 每个文件的结果按相对路径缓存在 <源码根目录>/.structure_cache.json：
+   大小和 mtime 都没变直接命中；mtime 变了再比对 sha256，内容没变同样命中
+   （与 commit_cache 的失效规则一致），因此再次生成报告只重新解析改动过的文件
+"""
+
+import ast
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from commit_cache import file_sha256
+
+# 提取结果的结构标识，字段变化时修改，旧缓存自动失效
+STRUCTURE_SCHEMA = "structure-v2"
+CACHE_FILE_NAME = ".structure_cache.json"
+# 不进入的目录
+EXCLUDED_DIRS = {".git", ".hg", ".svn", ".tox", ".nox", ".venv", "venv", "__pycache__",
+                 "build", "dist", "node_modules", ".mypy_cache", ".pytest_cache"}
+# 未命中的文件少于该数量时在当前进程解析，省去进程池启动开销
+MIN_PARALLEL_FILES = 16
+
+
+def iter_source_files(root):
+    """
+    遍历源码目录下的 .py 文件
+    :param root: 源码根目录
+    :return: 相对路径（/ 分隔）的有序列表
+    """
+    root = Path(root)
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in EXCLUDED_DIRS and not d.endswith(".egg-info"))
+        for name in filenames:
+            if name.endswith(".py"):
+                files.append((Path(dirpath) / name).relative_to(root).as_posix())
+    return sorted(files)
+
+
+def _decorator_names(node):
+    return [ast.unparse(d) for d in node.decorator_list]
+
+
+def _method_kind(decorators):
+    """根据装饰器判断方法类型"""
+    for name in decorators:
+        if name in ("staticmethod", "classmethod", "property"):
+            return name
+        if name.endswith((".setter", ".getter", ".deleter")) or name.endswith("cached_property"):
+            return "property"
+    return "instance"
+
+
+def _call_name(func):
+    """调用目标的规范写法：下标写作 []，调用结果写作 ()，其他表达式写作 ?"""
+    if isinstance(func, ast.Name):
+        return func.id
+    if isinstance(func, ast.Attribute):
+        return f"{_call_name(func.value)}.{func.attr}"
+    if isinstance(func, ast.Subscript):
+        return _call_name(func.value) + "[]"
+    if isinstance(func, ast.Call):
+        return _call_name(func.func) + "()"
+    return "?"
+
+
+def _body_calls(node):
+    """函数体内的调用目标（不含嵌套函数 / 类 / lambda 内部），去重后排序"""
+    calls = set()
+    stack = list(node.body)
+    while stack:
+        child = stack.pop()
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+            continue
+        if isinstance(child, ast.Call):
+            calls.add(_call_name(child.func))
+        stack.extend(ast.iter_child_nodes(child))
+    return sorted(calls)
+
+
+def _imported_names(tree):
+    """模块中 import 绑定的名字（任意层级的 import 语句）"""
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.asname or alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            names.update(alias.asname or alias.name for alias in node.names)
+    return sorted(names)
+
+
+def _function_info(node, in_class):
+    decorators = _decorator_names(node)
+    args = node.args
+    names = [a.arg for a in args.posonlyargs + args.args]
+    if args.vararg:
+        names.append("*" + args.vararg.arg)
+    names.extend(a.arg for a in args.kwonlyargs)
+    if args.kwarg:
+        names.append("**" + args.kwarg.arg)
+    info = {
+        "name": node.name,
+        "lineno": node.lineno,
+        "decorators": decorators,
+        "args": names,
+        "async": isinstance(node, ast.AsyncFunctionDef),
+        "calls": _body_calls(node),
+    }
+    if in_class:
+        info["kind"] = _method_kind(decorators)
+    return info
+
+
+class _StructureVisitor(ast.NodeVisitor):
+    """收集类、方法和模块级函数，qualname 规则与 Python 相同（函数内为 <locals>）"""
+
+    def __init__(self):
+        self.classes = []
+        self.functions = []
+        self._scope = []      # qualname 各段
+        self._class_stack = []
+
+    def visit_ClassDef(self, node):
+        qualname = ".".join(self._scope + [node.name])
+        info = {
+            "name": node.name,
+            "qualname": qualname,
+            "lineno": node.lineno,
+            "end_lineno": node.end_lineno,
+            "bases": [ast.unparse(b) for b in node.bases],
+            "decorators": _decorator_names(node),
+            "methods": [],
+        }
+        self.classes.append(info)
+        self._scope.append(node.name)
+        self._class_stack.append(info)
+        self.generic_visit(node)
+        self._class_stack.pop()
+        self._scope.pop()
+
+    def _visit_function(self, node):
+        in_class = bool(self._class_stack) and self._scope[-1] == self._class_stack[-1]["name"]
+        if in_class:
+            self._class_stack[-1]["methods"].append(_function_info(node, True))
+        elif not self._scope:
+            self.functions.append(_function_info(node, False))
+        self._scope.extend([node.name, "<locals>"])
+        # 函数内部的类仍然收集，嵌套函数不算方法
+        saved, self._class_stack = self._class_stack, []
+        self.generic_visit(node)
+        self._class_stack = saved
+        del self._scope[-2:]
+
+    visit_FunctionDef = _visit_function
+    visit_AsyncFunctionDef = _visit_function
+
+
+def extract_source(source, filename="<unknown>"):
+    """
+    从源码文本 / 字节中提取结构
+    :param source: 源码（str 或 bytes）
+    :param filename: 报错时显示的文件名
+    :return: {"classes": [...], "functions": [...], "imports": [...], "error": None 或错误信息}
+    """
+    try:
+        tree = ast.parse(source, filename=filename)
+    except (SyntaxError, ValueError) as e:
+        return {"classes": [], "functions": [], "imports": [], "error": f"{type(e).__name__}: {e}"}
+    visitor = _StructureVisitor()
+    visitor.visit(tree)
+    return {"classes": visitor.classes, "functions": visitor.functions,
+            "imports": _imported_names(tree), "error": None}
+
+
+def _parse_file(task):
+    """进程池任务：读取、计算 sha256、解析一个文件"""
+    root, rel = task
+    path = Path(root) / rel
+    data = path.read_bytes()
+    stat = path.stat()
+    return rel, {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "result": extract_source(data, str(path)),
+    }
+
+
+class SourceStructureIndex:
+    """整个源码目录的结构索引（带文件级缓存）"""
+
+    def __init__(self, root, cache_path=None, workers=None):
+        """
+        初始化
+        :param root: 源码根目录
+        :param cache_path: 缓存文件路径，默认 <root>/.structure_cache.json
+        :param workers: 解析进程数，默认 CPU 数
+        """
+        self.root = Path(root)
+        self.cache_path = Path(cache_path) if cache_path else self.root / CACHE_FILE_NAME
+        self.workers = workers or os.cpu_count() or 1
+        self.files = {}
+        self.digests = {}
+        self.stats = {}
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if cache.get("schema") != STRUCTURE_SCHEMA:
+            return {}
+        return cache.get("files", {})
+
+    def _save_cache(self, entries):
+        tmp_path = self.cache_path.with_name(self.cache_path.name + f".tmp{os.getpid()}")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"schema": STRUCTURE_SCHEMA, "files": entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
+
+    def _is_fresh(self, rel, entry):
+        """缓存条目是否仍与文件一致（mtime 变化但内容相同时顺带更新 mtime）"""
+        stat = (self.root / rel).stat()
+        if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return True
+        if entry["size"] == stat.st_size and entry["sha256"] == file_sha256(self.root / rel):
+            entry["mtime_ns"] = stat.st_mtime_ns
+            return True
+        return False
+
+    def scan(self):
+        """
+        扫描源码目录，只解析新增或改动的文件
+        :return: {相对路径: {"classes", "functions", "imports", "error"}}
+        """
+        cached = self._load_cache()
+        entries, todo = {}, []
+        changed = False
+        for rel in iter_source_files(self.root):
+            entry = cached.get(rel)
+            old_mtime = entry and entry["mtime_ns"]
+            if entry is not None and self._is_fresh(rel, entry):
+                entries[rel] = entry
+                changed = changed or entry["mtime_ns"] != old_mtime
+            else:
+                todo.append((str(self.root), rel))
+
+        if len(todo) >= MIN_PARALLEL_FILES and self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                parsed = list(pool.map(_parse_file, todo, chunksize=max(1, len(todo) // (self.workers * 4))))
+        else:
+            parsed = [_parse_file(task) for task in todo]
+        entries.update(parsed)
+
+        if parsed or changed or len(entries) != len(cached):
+            self._save_cache(dict(sorted(entries.items())))
+        self.files = {rel: entry["result"] for rel, entry in sorted(entries.items())}
+        self.digests = {rel: entry["sha256"] for rel, entry in sorted(entries.items())}
+        self.stats = {"files": len(entries), "parsed": len(parsed), "cached": len(entries) - len(parsed),
+                      "errors": sum(1 for r in self.files.values() if r["error"])}
+        return self.files
+
+    def source_digest(self):
+        """
+        整个源码树的摘要（各文件 sha256 的汇总），用于判断派生索引是否过期
+        :return: 十六进制摘要
+        """
+        digest = hashlib.sha256(STRUCTURE_SCHEMA.encode("utf-8"))
+        for rel, sha in self.digests.items():
+            digest.update(f"{rel}\0{sha}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def classes(self):
+        """
+        所有类
+        :return: [(相对路径, 类信息)]
+        """
+        return [(rel, cls) for rel, result in self.files.items() for cls in result["classes"]]
@@ -7,74 +7,75 @@ Top3贡献者提交类型分析工具（最终运行版）
 """
 
 import pandas as pd
+import numpy as np
+from abc import ABC, abstractmethod
 from datetime import datetime
 from dateutil.relativedelta import relativedelta  # 已确保导入
 from collections import Counter
-from analyze_commits_v2 import CommitAnalyzer  # 复用修复后的父类
+from analyze_commits_v2 import CommitAnalyzer, TABLE_CACHE_SCHEMA, data_path_from_argv  # 复用修复后的父类
+from commit_cache import cache_dir_for
+from commit_store import CommitStore
+from stage_profiler import profiler
+import json
 import os
+import sys
 
-class Top3ContributorAnalyzer(CommitAnalyzer):
-    """继承后直接使用'commit_type'列，无KeyError"""
-    def __init__(self):
-      super().__init__()  # 父类已无参数，直接调用
+class Top3Report(ABC):
+    """
+    Top3结果的时间范围、打印与保存：内存分析（Top3ContributorAnalyzer）与 SQLite 分析（SqliteTop3Analyzer）共用
+    子类提供 self.profiler 并实现 analyze_top3_commit_types()
+    """
+    TIME_RANGES = ['all', '5y', '2y']
+    REPORTS_DIR = '../reports'
 
-    def _get_time_filtered_data(self, time_range):
-        """时间范围筛选（全时段/5年/2年）"""
+    def _time_range_start(self, time_range):
+        """时间范围起点（全时段返回 None）"""
         now = datetime.now()
         if time_range == '5y':
-            start_date = now - relativedelta(years=5)
-            return self.df[self.df['date'] >= start_date]
+            return now - relativedelta(years=5)
         elif time_range == '2y':
-            start_date = now - relativedelta(years=2)
-            return self.df[self.df['date'] >= start_date]
-        else:  # all 全时段
-            return self.df.copy()
-
-    def get_top3_contributors(self, time_range='all'):
-        """获取指定时间范围Top3提交者"""
-        filtered_df = self._get_time_filtered_data(time_range)
-        return filtered_df['author'].value_counts().head(3).index.tolist()
+            return now - relativedelta(years=2)
+        return None
 
+    @abstractmethod
     def analyze_top3_commit_types(self, time_range='all'):
-        """分析Top3提交者的提交类型分布"""
-        filtered_df = self._get_time_filtered_data(time_range)
-        top3_authors = self.get_top3_contributors(time_range)
-        results = {}
+        """
+        分析Top3提交者的提交类型分布
+        :return: {作者: {'总提交数': int, '提交类型分布': {类型: 数量}}}，按提交数从多到少
+        """
 
+    def _print_top3(self, time_range, results):
+        """打印结果（清晰易读）"""
         print(f"\n" + "="*60)
         print(f" {time_range.upper()} 时间范围 - Top3贡献者提交类型分析")
         print("="*60)
 
-        for author in top3_authors:
-            author_commits = filtered_df[filtered_df['author'] == author]
-            type_counts = Counter(author_commits['commit_type'])  # 现在有commit_type列了
-            total = len(author_commits)
-            results[author] = {'总提交数': total, '提交类型分布': dict(type_counts)}
-
-            # 打印结果（清晰易读）
+        for author, result in results.items():
+            total = result['总提交数']
             print(f"\n【{author}】")
             print(f"提交总数：{total} 条")
             print("提交类型分布：")
-            for commit_type, count in type_counts.most_common():
+            for commit_type, count in Counter(result['提交类型分布']).most_common():
                 print(f"  - {commit_type}: {count} 条 ({(count/total*100):.1f}%)")
 
-        return results
-
     def run_all_time_ranges(self):
         """一键运行所有时间范围分析+保存结果"""
-        time_ranges = ['all', '5y', '2y']
         all_results = {}
-
-        # 分析所有时间范围
-        for tr in time_ranges:
+        for tr in self.TIME_RANGES:
             all_results[tr] = self.analyze_top3_commit_types(tr)
+        self._save_report(all_results)
+
+    def _report_path(self):
+        """结果CSV路径"""
+        return os.path.join(self.REPORTS_DIR, 'top3_contributor_analysis.csv')
 
-        # 自动创建reports目录并保存结果
-        reports_dir = '../reports'
-        if not os.path.exists(reports_dir):
-            os.makedirs(reports_dir)
-        self._save_results_to_csv(all_results, reports_dir)
-        print(f"\n所有分析结果已保存到：{os.path.join(reports_dir, 'top3_contributor_analysis.csv')}")
+    def _save_report(self, all_results):
+        """自动创建reports目录并保存结果"""
+        if not os.path.exists(self.REPORTS_DIR):
+            os.makedirs(self.REPORTS_DIR)
+        with self.profiler.stage('save_csv'):
+            self._save_results_to_csv(all_results, self.REPORTS_DIR)
+        print(f"\n所有分析结果已保存到：{self._report_path()}")
 
     def _save_results_to_csv(self, all_results, reports_dir):
         """结果保存为CSV"""
@@ -96,9 +97,176 @@ class Top3ContributorAnalyzer(CommitAnalyzer):
             index=False, encoding='utf-8'
         )
 
+class Top3ContributorAnalyzer(Top3Report, CommitAnalyzer):
+    """继承后直接使用'commit_type'列，无KeyError"""
+    def __init__(self, data_path=None, git_repo=None):
+      super().__init__(data_path, git_repo)  # 不传路径时使用父类的默认数据路径
+      # 按时间稳定排序一次：之后任意 [start, end) 时间窗口都是连续的行区间，二分查找即可定位
+      with self.profiler.stage('sort_by_date', rows=len(self.df)):
+          self.df = self.df.sort_values('date', kind='stable').reset_index(drop=True)
+          self._author_index = None  # 行顺序变了，作者行号索引按新顺序重建
+          self._dates = self.df['date'].to_numpy()
+
+    def window_bounds(self, start=None, end=None):
+        """
+        时间窗口 [start, end) 对应的行号区间（self.df 已按时间排序）
+        :param start: 起始时间（含），None 表示不限
+        :param end: 结束时间（不含），None 表示不限
+        :return: (lo, hi)，窗口内的提交为 self.df.iloc[lo:hi]；两次二分查找，O(log N)
+        """
+        lo = 0 if start is None else int(np.searchsorted(self._dates, pd.Timestamp(start).to_datetime64(), 'left'))
+        hi = len(self._dates) if end is None else int(np.searchsorted(self._dates, pd.Timestamp(end).to_datetime64(), 'left'))
+        return lo, max(lo, hi)
+
+    def window(self, start=None, end=None):
+        """时间窗口 [start, end) 内的提交：按行号区间切片，不构造布尔掩码、不复制整表"""
+        lo, hi = self.window_bounds(start, end)
+        return self.df.iloc[lo:hi]
+
+    def _get_time_filtered_data(self, time_range):
+        """时间范围筛选（全时段/5年/2年）"""
+        return self.window(self._time_range_start(time_range))
+
+    def get_top3_contributors(self, time_range='all'):
+        """获取指定时间范围Top3提交者（同数时按作者名排序，与 SQLite 提交库一致）"""
+        filtered_df = self._get_time_filtered_data(time_range)
+        counts = filtered_df['author'].value_counts(sort=False)
+        counts = counts[counts > 0]
+        return sorted(counts.index, key=lambda author: (-counts[author], author))[:3]
+
+    def analyze_top3_commit_types(self, time_range='all'):
+        """分析Top3提交者的提交类型分布"""
+        with self.profiler.stage(f'top3[{time_range}]') as stage:
+            lo, hi = self.window_bounds(self._time_range_start(time_range))
+            stage['rows'] = hi - lo
+            with self.profiler.stage('top3_authors'):
+                top3_authors = self.get_top3_contributors(time_range)
+            results = {}
+
+            with self.profiler.stage('type_counts'):
+                for author in top3_authors:
+                    # 作者行号按升序排列，窗口 [lo, hi) 内的部分同样二分查找截取
+                    rows = self.author_rows(author)
+                    rows = rows[np.searchsorted(rows, lo):np.searchsorted(rows, hi)]
+                    type_counts = self.type_counts_for_rows(rows)
+                    results[author] = {'总提交数': len(rows), '提交类型分布': type_counts}
+
+        self._print_top3(time_range, results)
+        return results
+
+    # -------------------------- 增量模式 --------------------------
+    def run_all_time_ranges(self, incremental=False):
+        """
+        一键运行所有时间范围分析+保存结果
+        :param incremental: 增量模式——报告新增提交数，Top3结果不变时不重写CSV
+        """
+        if not incremental:
+            super().run_all_time_ranges()
+            return
+        with self.profiler.stage('incremental'):
+            all_results, changed = self._run_incremental(self.TIME_RANGES)
+        if not changed and os.path.exists(self._report_path()):
+            print("\n增量模式：Top3结果无变化，保留已有的 top3_contributor_analysis.csv")
+            return
+        self._save_report(all_results)
+
+    def _top3_state_path(self):
+        """增量状态文件：与解析缓存放在同一个 .commit_cache/ 目录下"""
+        return cache_dir_for(self.data_path, 'top3_state') / 'state.json'
+
+    def _top3_state_schema(self):
+        """状态里保存的是合并后的作者名，作者映射变化（如编辑了 .mailmap）时状态同样失效"""
+        return f"top3-v2:{TABLE_CACHE_SCHEMA}:{self.identity_digest}"
+
+    def _run_incremental(self, time_ranges):
+        """
+        增量模式下计算所有时间范围的Top3结果
+        :return: (all_results, 结果是否有变化)
+
+        提交表已在内存中按时间排好序，全量计算三个时间范围只是几次二分查找和计数，
+        比读取、合并任何持久化的聚合表都快，因此结果总是直接计算；
+        状态里只保存上次的结果、提交数和最新一条提交的 commit_id，用于报告新增提交数、
+        发现历史被改写，并在结果不变时跳过CSV写入
+        """
+        state_path = self._top3_state_path()
+        state = None
+        if state_path.exists():
+            try:
+                state = json.loads(state_path.read_text(encoding='utf-8'))
+            except ValueError:
+                state = None
+        newest_ids = self.df['commit_id'].to_numpy()
+        if state is not None and (state.get('schema') != self._top3_state_schema()
+                                  or not (newest_ids == state['newest_id']).any()):
+            print("提示：增量状态已失效（规则、作者映射变化或历史被改写），重新全量统计")
+            state = None
+        if state is not None:
+            print(f"\n增量模式：新增 {len(self.df) - state['rows']} 条提交")
+
+        all_results = {tr: self.analyze_top3_commit_types(tr) for tr in time_ranges}
+        changed = state is None or all_results != state['results']
+        if changed or len(self.df) != state['rows']:
+            state_path.parent.mkdir(parents=True, exist_ok=True)
+            state_path.write_text(json.dumps({
+                'schema': self._top3_state_schema(),
+                'rows': len(self.df),
+                # self.df 已按时间排序，最后一行即最新的提交
+                'newest_id': str(newest_ids[-1]) if len(newest_ids) else None,
+                'results': all_results,
+            }, ensure_ascii=False), encoding='utf-8')
+        return all_results, changed
+
+class SqliteTop3Analyzer(Top3Report):
+    """
+    Top3 统计在 SQLite 提交库中完成（根目录 commit_store.py）：不把提交表读入内存，
+    每个时间范围两条带索引的 GROUP BY；CSV 未变时再次运行直接打开已有的库
+    不继承 CommitAnalyzer（没有 self.df），数据路径与作者合并设置沿用其默认值
+    """
+    MERGE_AUTHOR_ALIASES = CommitAnalyzer.MERGE_AUTHOR_ALIASES
+    MAILMAP_PATH = CommitAnalyzer.MAILMAP_PATH
+
+    def __init__(self, data_path=None):
+        """
+        :param data_path: 提交记录CSV路径，默认 CommitAnalyzer.DEFAULT_DATA_PATH（不支持直接读取git仓库）
+        """
+        self.data_path = data_path or CommitAnalyzer.DEFAULT_DATA_PATH
+        self.profiler = profiler
+        with self.profiler.stage('open_store'):
+            self.store = CommitStore.open(self.data_path, self.MERGE_AUTHOR_ALIASES, self.MAILMAP_PATH)
+        # 日期无法解析等格式错误的行在导入时拒绝，总数与 CommitAnalyzer 读入内存的一致
+        print(f"打开提交库：{self.store.db_path}"
+              f"（共{self.store.count()}条提交记录，拒绝{self.store.rejected}行格式错误的记录）")
+
+    def get_top3_contributors(self, time_range='all'):
+        """获取指定时间范围Top3提交者"""
+        return [author for author, _ in self.store.top_authors(3, since=self._time_range_start(time_range))]
+
+    def analyze_top3_commit_types(self, time_range='all'):
+        """分析Top3提交者的提交类型分布"""
+        with self.profiler.stage(f'top3[{time_range}]'):
+            results = self.store.author_type_breakdown(3, since=self._time_range_start(time_range))
+        self._print_top3(time_range, results)
+        return results
+
+
 if __name__ == "__main__":
-    top3_analyzer = Top3ContributorAnalyzer()
-    top3_analyzer.run_all_time_ranges()
+    # --profile：输出各阶段耗时/内存（同 COMMIT_PROFILE=1）；--profile=flame 额外输出火焰图折叠栈
+    if '--profile' in sys.argv or '--profile=flame' in sys.argv:
+        profiler.enable(flame='--profile=flame' in sys.argv)
+    # --git=<仓库路径>：直接读取本地git仓库，不需要先导出CSV
+    git_repo = next((arg.split('=', 1)[1] for arg in sys.argv if arg.startswith('--git=')), None)
+    # 数据路径可作为位置参数或 --data=<路径> 给出，默认仓库根目录下的 requests_commits.csv
+    data_path = data_path_from_argv()
+    # --incremental：报告新增提交数，Top3结果不变时不重写CSV
+    incremental = '--incremental' in sys.argv
+    # --sqlite：统计在 SQLite 提交库中完成，不把提交表读入内存
+    if '--sqlite' in sys.argv and not git_repo:
+        if incremental:
+            print("提示：--sqlite 不使用增量状态（提交库随CSV变化自动重建），忽略 --incremental，按全量统计")
+        SqliteTop3Analyzer(data_path).run_all_time_ranges()
+    else:
+        Top3ContributorAnalyzer(data_path, git_repo=git_repo).run_all_time_ranges(incremental=incremental)
     print("\n" + "="*50)
     print("所有分析完成")
-    print("="*50)
\ No newline at end of file
+    print("="*50)
+    profiler.report()
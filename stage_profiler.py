@@ -0,0 +1,180 @@
+"""
+分阶段性能记录：耗时、CPU 时间、峰值内存、行数
+
+用法:
+    from stage_profiler import profiler
+    with profiler.stage("classify") as stage:
+        ...
+        stage["rows"] = len(df)
+    profiler.report()          # 未启用时什么都不做
+
+启用方式（默认关闭，关闭时 stage() 只返回一个共享的空上下文，开销可忽略）:
+    环境变量 COMMIT_PROFILE=1        输出 JSON
+    环境变量 COMMIT_PROFILE=flame    额外输出火焰图折叠栈（flamegraph.pl / speedscope 可直接读取）
+    环境变量 COMMIT_PROFILE_OUT      输出文件前缀，默认 commit_profile（生成 .json / .folded）
+    或在脚本中调用 profiler.enable()（各脚本的 --profile 参数即如此）
+
+功能:
+    阶段可以嵌套，记录完整路径（如 top3/all/authors）；
+    峰值内存取自 resource.getrusage（进程级峰值，单调不减），记录阶段结束时的峰值和阶段内的增量，
+    不支持 resource 模块的平台（Windows）记为 None。
+"""
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILE_ENV = "COMMIT_PROFILE"
+PROFILE_OUT_ENV = "COMMIT_PROFILE_OUT"
+DEFAULT_PREFIX = "commit_profile"
+
+
+def peak_rss_mb():
+    """
+    当前进程的峰值常驻内存（MB）
+
+    返回:
+        float | None: 不支持的平台返回 None
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class StageProfiler:
+    """按阶段记录耗时与内存，未启用时不做任何记录"""
+
+    def __init__(self, enabled=False, flame=False, prefix=DEFAULT_PREFIX):
+        """
+        参数:
+            enabled (bool): 是否记录
+            flame (bool): report() 时是否额外输出火焰图折叠栈
+            prefix (str): 输出文件前缀
+        """
+        self.enabled = enabled
+        self.flame = flame
+        self.prefix = prefix
+        self.records = []
+        self._stack = []
+        # 未启用时 stage() 返回的共享上下文：yield 的字典写入后直接丢弃
+        self._disabled = nullcontext({})
+
+    @classmethod
+    def from_env(cls):
+        """按 COMMIT_PROFILE / COMMIT_PROFILE_OUT 环境变量创建"""
+        mode = os.environ.get(PROFILE_ENV, "").strip().lower()
+        return cls(enabled=mode not in ("", "0", "false", "no"),
+                   flame=mode == "flame",
+                   prefix=os.environ.get(PROFILE_OUT_ENV, DEFAULT_PREFIX))
+
+    def enable(self, flame=None):
+        """在运行时启用（如命令行 --profile）"""
+        self.enabled = True
+        if flame is not None:
+            self.flame = flame
+
+    def stage(self, name, rows=None):
+        """
+        记录一个阶段
+
+        参数:
+            name (str): 阶段名，嵌套时拼接为路径
+            rows (int | None): 处理的行数，也可在 with 块中写入 stage["rows"]
+
+        返回:
+            上下文管理器，as 得到的字典可写入 rows 等附加字段
+        """
+        if not self.enabled:
+            return self._disabled
+        return self._record(name, rows)
+
+    @contextmanager
+    def _record(self, name, rows):
+        self._stack.append(name)
+        extra = {"rows": rows}
+        rss_before = peak_rss_mb()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        try:
+            yield extra
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            rss_after = peak_rss_mb()
+            record = {
+                "stage": "/".join(self._stack),
+                "depth": len(self._stack) - 1,
+                "wall_s": round(wall, 6),
+                "cpu_s": round(cpu, 6),
+                "peak_rss_mb": None if rss_after is None else round(rss_after, 1),
+                "rss_growth_mb": None if rss_after is None else round(rss_after - rss_before, 1),
+            }
+            record.update(extra)
+            self.records.append(record)
+            self._stack.pop()
+
+    def to_dict(self):
+        """
+        返回:
+            dict: 可写入 JSON 的结果（阶段按结束顺序排列）
+        """
+        return {
+            "pid": os.getpid(),
+            "argv": sys.argv,
+            "stages": self.records,
+        }
+
+    def folded_stacks(self):
+        """
+        火焰图折叠栈：每行 "父阶段;子阶段 自身耗时(微秒)"，同一路径的多次记录合并为一行
+
+        返回:
+            list: 文本行
+        """
+        # records 按阶段结束顺序排列，子阶段总在父阶段之前：
+        # 按深度暂存已结束、尚未归属的阶段耗时，父阶段结束时取走下一层的累计值，
+        # 这样同一路径多次出现时每条记录只扣除自己的子阶段
+        unclaimed = {}
+        self_times = {}
+        for record in self.records:
+            depth = record["depth"]
+            children = unclaimed.pop(depth + 1, 0.0)
+            unclaimed[depth] = unclaimed.get(depth, 0.0) + record["wall_s"]
+            self_time = max(record["wall_s"] - children, 0.0)
+            self_times[record["stage"]] = self_times.get(record["stage"], 0.0) + self_time
+        return [f"{stage.replace('/', ';')} {int(self_time * 1e6)}" for stage, self_time in self_times.items()]
+
+    def report(self):
+        """
+        输出结果文件（未启用时什么都不做）
+
+        返回:
+            list: 写入的文件路径
+        """
+        if not self.enabled or not self.records:
+            return []
+        paths = [self.prefix + ".json"]
+        with open(paths[0], "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        if self.flame:
+            paths.append(self.prefix + ".folded")
+            with open(paths[1], "w", encoding="utf-8") as f:
+                f.write("\n".join(self.folded_stacks()) + "\n")
+        for record in self.records:
+            print(f"[profile] {record['stage']:<32} wall {record['wall_s']:.4f}s  cpu {record['cpu_s']:.4f}s"
+                  f"  peak {record['peak_rss_mb']} MB  rows {record['rows']}")
+        print("[profile] 已保存:", ", ".join(paths))
+        return paths
+
+
+# 模块级默认实例：各脚本共用，按环境变量决定是否启用
+profiler = StageProfiler.from_env()
@@ -0,0 +1,353 @@
+"""
+pysnooper 追踪日志（usecase1_trace.log / usecase3_trace.log）的流式解析与索引查询
+
+用法:
+    python trace_log_index.py usecase1_trace.log --tree                      调用树
+    python trace_log_index.py usecase1_trace.log --layer Adapter --min-ms 500  查询帧
+    python trace_log_index.py usecase3_trace.log --function adapters.py:send --show
+
+功能:
+    日志每行形如 "[Adapter]     19:50:02.471642 call  36 def traced_adapter_send(...)"：
+    方括号内为层名（snoop 的 prefix），其后每 4 个空格为一层嵌套。
+    一帧从 call 事件开始，到 "Return value:.." 或 "Call ended by exception" 结束，
+    最外层的帧后面还有 "Elapsed time:"（有则以它为准，否则用 return 与 call 的时间戳相减）。
+
+    iter_frames() 逐行读取并维护当前打开的帧栈，帧结束即产出，内存只与嵌套深度有关。
+    build_index() 把每帧写成定长记录的旁路索引（<日志>.idx）：记录按帧开始的顺序编号，
+    帧结束时按编号定位写入，因此索引顺序即调用树的先序，无需在内存中排序。
+    查询只顺序读取索引（每帧几十字节，而日志中每帧有上百行变量记录），
+    命中的帧再按记录中的字节偏移 seek 到日志对应位置读取原文。
+    日志大小或修改时间变化时自动重建索引。
+"""
+
+import argparse
+import json
+import os
+import re
+import struct
+from collections import namedtuple
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"SNOOPIDX1\n"
+# 文件头：魔数 + 尾部字符串表的偏移；记录：
+#   日志起始偏移, 日志结束偏移, 开始时间(微秒, 当天), 耗时(微秒), 父帧编号, 层, 函数, 深度, 标志
+_HEADER = struct.Struct("<10sQ")
+_RECORD = struct.Struct("<QQqqiHHHB")
+READ_RECORDS = 4096
+
+# 标志位
+FLAG_EXCEPTION = 1    # 以异常结束
+FLAG_INCOMPLETE = 2   # 日志结束时仍未返回
+FLAG_ELAPSED = 4      # 耗时取自 pysnooper 的 Elapsed time
+
+_LINE = re.compile(r"\[([^\]]*)\] ( *)(.*)")
+_EVENT = re.compile(r"(\d{2}):(\d{2}):(\d{2})\.(\d{6}) (\w+) +\d+ (.*)")
+_ELAPSED = re.compile(r"Elapsed time: (\d{2}):(\d{2}):(\d{2})\.(\d{6})")
+_DEF = re.compile(r"\s*(?:async\s+)?def\s+(\w+)")
+
+DAY_US = 24 * 3600 * 1_000_000
+
+# 一帧
+#   index       (int): 按开始顺序的编号（即在索引中的位置）
+#   parent      (int): 父帧编号，最外层为 -1
+#   layer       (str): 层名（日志前缀，如 Adapter）
+#   function    (str): "源文件名:函数名"
+#   depth       (int): 嵌套深度（缩进 / 4）
+#   start_us    (int): 开始时间（当天的微秒数）
+#   duration_us (int): 耗时（微秒），未返回的帧为日志中最后一个时间戳减开始时间
+#   flags       (int): FLAG_* 组合
+#   offset / end_offset (int): 该帧在日志中的字节范围（含嵌套帧）
+TraceFrame = namedtuple("TraceFrame", ["index", "parent", "layer", "function", "depth", "start_us",
+                                       "duration_us", "flags", "offset", "end_offset"])
+
+
+def _to_us(h, m, s, us):
+    return ((int(h) * 60 + int(m)) * 60 + int(s)) * 1_000_000 + int(us)
+
+
+def _basename(path):
+    """兼容 Windows 路径的文件名"""
+    return re.split(r"[\\/]", path.strip())[-1]
+
+
+class _OpenFrame:
+    __slots__ = ("index", "parent", "layer", "function", "depth", "start_us", "end_us",
+                 "flags", "offset")
+
+    def __init__(self, index, parent, layer, function, depth, start_us, offset):
+        self.index = index
+        self.parent = parent
+        self.layer = layer
+        self.function = function
+        self.depth = depth
+        self.start_us = start_us
+        self.end_us = None
+        self.flags = 0
+        self.offset = offset
+
+    def close(self, end_offset, end_us=None):
+        if end_us is not None:
+            self.end_us = end_us
+        end = self.end_us if self.end_us is not None else self.start_us
+        if end < self.start_us:  # 跨过午夜
+            end += DAY_US
+        return TraceFrame(self.index, self.parent, self.layer, self.function, self.depth,
+                          self.start_us, end - self.start_us, self.flags, self.offset, end_offset)
+
+
+def iter_frames(path):
+    """
+    流式解析日志
+
+    参数:
+        path (str): pysnooper 日志路径
+
+    返回:
+        generator: 按结束顺序产出 TraceFrame（子帧先于父帧）
+    """
+    stack = []
+    count = 0
+    source = ""
+    # 帧的起点取 call 之前紧邻的 Source path / Starting var 行
+    preamble_offset = None
+    # 刚结束、等待可能紧随其后的 Elapsed time 的帧
+    finished = None
+    last_us = 0
+    offset = 0
+
+    with open(path, "rb") as f:
+        for raw in f:
+            line_offset, offset = offset, offset + len(raw)
+            match = _LINE.match(raw.decode("utf-8", "replace").rstrip("\r\n"))
+            if match is None:
+                continue
+            layer, indent, content = match.groups()
+            depth = len(indent) // 4
+
+            if finished is not None:
+                elapsed = _ELAPSED.match(content)
+                if elapsed and finished.depth == depth:
+                    yield finished._replace(duration_us=_to_us(*elapsed.groups()), end_offset=offset,
+                                            flags=finished.flags | FLAG_ELAPSED)
+                    finished = None
+                    continue
+                yield finished
+                finished = None
+
+            event = _EVENT.match(content)
+            if event is None:
+                if content.startswith("Source path:"):
+                    source = _basename(content.split("...", 1)[-1])
+                    if preamble_offset is None:
+                        preamble_offset = line_offset
+                elif content.startswith("Starting var:"):
+                    if preamble_offset is None:
+                        preamble_offset = line_offset
+                elif stack and stack[-1].depth == depth and (
+                        content.startswith("Return value:") or content.startswith("Call ended by exception")):
+                    frame = stack.pop()
+                    if content.startswith("Call ended"):
+                        frame.flags |= FLAG_EXCEPTION
+                    finished = frame.close(offset)
+                continue
+
+            h, m, s, us, kind, code = event.groups()
+            last_us = _to_us(h, m, s, us)
+            if kind == "call":
+                # 同层或更浅的帧仍未关闭：日志不完整，按未返回处理
+                while stack and stack[-1].depth >= depth:
+                    frame = stack.pop()
+                    frame.flags |= FLAG_INCOMPLETE
+                    yield frame.close(line_offset)
+                name = _DEF.match(code)
+                function = f"{source}:{name.group(1) if name else code.strip()[:40]}"
+                start_offset = line_offset if preamble_offset is None else preamble_offset
+                stack.append(_OpenFrame(count, stack[-1].index if stack else -1, layer, function,
+                                        depth, last_us, start_offset))
+                count += 1
+            elif stack and stack[-1].depth == depth:
+                # line / return / exception：帧内最后一个时间戳即结束时间
+                stack[-1].end_us = last_us
+            preamble_offset = None
+
+    if finished is not None:
+        yield finished
+    while stack:
+        frame = stack.pop()
+        frame.flags |= FLAG_INCOMPLETE
+        yield frame.close(offset, frame.end_us if frame.end_us is not None else last_us)
+
+
+def index_path(log_path):
+    return str(log_path) + INDEX_SUFFIX
+
+
+def build_index(log_path, idx_path=None):
+    """
+    解析日志并写出旁路索引
+
+    参数:
+        log_path (str): 日志路径
+        idx_path (str | None): 索引路径，默认 <日志>.idx
+
+    返回:
+        int: 帧数
+    """
+    idx_path = idx_path or index_path(log_path)
+    layers, functions = {}, {}
+    count = 0
+    stat = os.stat(log_path)
+    with open(idx_path + ".tmp", "wb") as out:
+        out.write(_HEADER.pack(INDEX_MAGIC, 0))
+        for frame in iter_frames(log_path):
+            out.seek(_HEADER.size + frame.index * _RECORD.size)
+            out.write(_RECORD.pack(frame.offset, frame.end_offset, frame.start_us, frame.duration_us,
+                                   frame.parent, layers.setdefault(frame.layer, len(layers)),
+                                   functions.setdefault(frame.function, len(functions)),
+                                   frame.depth, frame.flags))
+            count = max(count, frame.index + 1)
+        footer_offset = _HEADER.size + count * _RECORD.size
+        out.seek(footer_offset)
+        out.truncate()
+        out.write(json.dumps({"log_size": stat.st_size, "log_mtime_ns": stat.st_mtime_ns,
+                              "frames": count, "layers": list(layers),
+                              "functions": list(functions)}, ensure_ascii=False).encode("utf-8"))
+        out.seek(0)
+        out.write(_HEADER.pack(INDEX_MAGIC, footer_offset))
+    os.replace(idx_path + ".tmp", idx_path)
+    return count
+
+
+def _read_footer(f):
+    magic, footer_offset = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != INDEX_MAGIC or footer_offset == 0:
+        return None
+    f.seek(footer_offset)
+    return json.loads(f.read())
+
+
+def open_index(log_path, rebuild=False):
+    """
+    返回最新的索引路径，索引不存在或与日志不一致时重建
+
+    参数:
+        log_path (str): 日志路径
+        rebuild (bool): 强制重建
+
+    返回:
+        str: 索引路径
+    """
+    idx_path = index_path(log_path)
+    if not rebuild and os.path.exists(idx_path):
+        stat = os.stat(log_path)
+        with open(idx_path, "rb") as f:
+            footer = _read_footer(f)
+        if footer and footer["log_size"] == stat.st_size and footer["log_mtime_ns"] == stat.st_mtime_ns:
+            return idx_path
+    build_index(log_path, idx_path)
+    return idx_path
+
+
+def iter_index(idx_path):
+    """
+    按先序（帧开始顺序）读取索引
+
+    返回:
+        generator: TraceFrame
+    """
+    with open(idx_path, "rb") as f:
+        footer = _read_footer(f)
+        if footer is None:
+            raise ValueError(f"索引文件损坏: {idx_path}")
+        layers, functions = footer["layers"], footer["functions"]
+        f.seek(_HEADER.size)
+        for index in range(0, footer["frames"], READ_RECORDS):
+            chunk = f.read(min(READ_RECORDS, footer["frames"] - index) * _RECORD.size)
+            for i, (offset, end_offset, start_us, duration_us, parent, layer, function, depth,
+                    flags) in enumerate(_RECORD.iter_unpack(chunk)):
+                yield TraceFrame(index + i, parent, layers[layer], functions[function], depth,
+                                 start_us, duration_us, flags, offset, end_offset)
+
+
+def query(log_path, layer=None, function=None, min_ms=None, max_depth=None, rebuild=False):
+    """
+    按条件查询帧（只读索引，不扫描日志）
+
+    参数:
+        log_path (str): 日志路径
+        layer (str | None): 层名，如 "Adapter"
+        function (str | None): 函数名子串，如 "adapters.py:send"
+        min_ms (float | None): 最小耗时（毫秒）
+        max_depth (int | None): 最大嵌套深度
+
+    返回:
+        generator: 满足条件的 TraceFrame
+    """
+    min_us = None if min_ms is None else min_ms * 1000
+    for frame in iter_index(open_index(log_path, rebuild)):
+        if layer is not None and frame.layer != layer:
+            continue
+        if function is not None and function not in frame.function:
+            continue
+        if min_us is not None and frame.duration_us < min_us:
+            continue
+        if max_depth is not None and frame.depth > max_depth:
+            continue
+        yield frame
+
+
+def read_frame_text(log_path, frame, max_lines=None):
+    """
+    按索引中的字节偏移读取一帧在日志中的原文
+
+    参数:
+        log_path (str): 日志路径
+        frame (TraceFrame): 索引中的帧
+        max_lines (int | None): 最多读取的行数
+
+    返回:
+        list: 文本行
+    """
+    lines = []
+    with open(log_path, "rb") as f:
+        f.seek(frame.offset)
+        while f.tell() < frame.end_offset and (max_lines is None or len(lines) < max_lines):
+            lines.append(f.readline().decode("utf-8", "replace").rstrip("\r\n"))
+    return lines
+
+
+def format_frame(frame):
+    marks = "".join(mark for flag, mark in ((FLAG_EXCEPTION, " 异常"), (FLAG_INCOMPLETE, " 未返回"))
+                    if frame.flags & flag)
+    return (f"{'  ' * frame.depth}[{frame.layer}] {frame.function} "
+            f"{frame.duration_us / 1000:.3f} ms{marks}  (#{frame.index}, 偏移 {frame.offset})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="pysnooper 追踪日志的调用树与索引查询")
+    parser.add_argument("log", help="pysnooper 日志，如 usecase1_trace.log")
+    parser.add_argument("--tree", action="store_true", help="输出完整调用树")
+    parser.add_argument("--layer", help="只看某一层，如 Adapter")
+    parser.add_argument("--function", help="函数名子串，如 adapters.py:send")
+    parser.add_argument("--min-ms", type=float, help="最小耗时（毫秒）")
+    parser.add_argument("--max-depth", type=int, help="最大嵌套深度")
+    parser.add_argument("--show", action="store_true", help="输出命中帧在日志中的前几行原文")
+    parser.add_argument("--rebuild", action="store_true", help="强制重建索引")
+    args = parser.parse_args()
+
+    if args.tree:
+        frames = query(args.log, max_depth=args.max_depth, rebuild=args.rebuild)
+    else:
+        frames = query(args.log, args.layer, args.function, args.min_ms, args.max_depth, args.rebuild)
+    matched = 0
+    for frame in frames:
+        matched += 1
+        print(format_frame(frame))
+        if args.show:
+            for line in read_frame_text(args.log, frame, max_lines=8):
+                print("      | " + line)
+    print(f"共 {matched} 帧（索引: {index_path(args.log)}）")
+
+
+if __name__ == "__main__":
+    main()